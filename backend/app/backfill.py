@@ -0,0 +1,119 @@
+"""Maintenance backfills.
+
+Usage (from the ``backend`` directory)::
+
+    python -m app.backfill columns
+    python -m app.backfill showtime-seats
+    python -m app.backfill rating-stats
+    python -m app.backfill movie-genres
+    python -m app.backfill indexes
+    python -m app.backfill booking-summaries
+
+``create_all`` only creates missing tables, so ``columns`` and ``indexes``
+add the columns and indexes declared on tables that already existed. Run
+``columns`` first after upgrading an existing database. ``booking-summaries`` writes the
+history rows of bookings made before ``booking_summaries`` existed.
+"""
+from __future__ import annotations
+import argparse
+from sqlalchemy import select, inspect, text
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.orm import Session
+from .db import SessionLocal, Base
+from .models import Booking, BookingSummary, Showtime
+from . import crud
+
+def backfill_showtime_seats(db: Session, batch_size: int = 200) -> int:
+    inserted = 0
+    last_id = 0
+    while True:
+        showtime_ids = db.execute(
+            select(Showtime.id).where(Showtime.id > last_id).order_by(Showtime.id).limit(batch_size)
+        ).scalars().all()
+        if not showtime_ids:
+            return inserted
+        inserted += crud.materialize_showtime_seats(db, showtime_ids)
+        db.commit()
+        last_id = showtime_ids[-1]
+
+def backfill_rating_stats(db: Session) -> int:
+    count = crud.rebuild_rating_stats(db)
+    db.commit()
+    return count
+
+def backfill_movie_genres(db: Session) -> int:
+    count = crud.rebuild_movie_genres(db)
+    db.commit()
+    return count
+
+def backfill_columns(db: Session) -> int:
+    # New columns are added with their server default (e.g. seat versions
+    # start at 0), so NOT NULL holds for the rows already there
+    bind = db.get_bind()
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    added = 0
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=bind.dialect)
+                db.execute(text(f"ALTER TABLE {bind.dialect.identifier_preparer.format_table(table)} ADD COLUMN {ddl}"))
+                added += 1
+    db.commit()
+    return added
+
+def backfill_indexes(db: Session) -> int:
+    bind = db.get_bind()
+    inspector = inspect(bind)
+    created = 0
+    for table in Base.metadata.sorted_tables:
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind)
+                created += 1
+    return created
+
+def backfill_booking_summaries(db: Session, batch_size: int = 500) -> int:
+    written = 0
+    last_id = 0
+    while True:
+        booking_ids = db.execute(
+            select(Booking.id)
+            .outerjoin(BookingSummary, BookingSummary.booking_id == Booking.id)
+            .where(Booking.id > last_id, BookingSummary.booking_id.is_(None))
+            .order_by(Booking.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not booking_ids:
+            return written
+        written += crud.write_booking_summaries(db, booking_ids)
+        db.commit()
+        last_id = booking_ids[-1]
+
+COMMANDS = {
+    "columns": backfill_columns,
+    "showtime-seats": backfill_showtime_seats,
+    "rating-stats": backfill_rating_stats,
+    "movie-genres": backfill_movie_genres,
+    "indexes": backfill_indexes,
+    "booking-summaries": backfill_booking_summaries,
+}
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        count = COMMANDS[args.command](db)
+        print(f"{args.command}: {count} rows written")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
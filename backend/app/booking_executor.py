@@ -0,0 +1,174 @@
+"""Optional single-writer execution of seat writes, partitioned by showtime.
+
+With ``BOOKING_EXECUTOR_ENABLED`` every lock/booking operation for a showtime
+is queued to one worker thread (``showtime_id % partitions``). The worker
+drains its queue, runs each operation in its own SAVEPOINT so a failed claim
+does not undo its neighbours, and commits the whole batch at once. Writers to
+a showtime therefore never wait on each other's row locks.
+
+If the batch commit fails, its operations are run again one at a time, each
+in its own transaction, so one bad write cannot fail its neighbours. A commit
+that still fails reaches the caller as ``RuntimeError`` (a conflict, 409) or
+``SeatWriteUnavailable`` (the database could not take the write, 503).
+"""
+from __future__ import annotations
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, TypeVar
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from .db import SessionLocal
+from .seat_events import pending_event_count, discard_events_since
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_STOP = object()
+
+
+class SeatWriteUnavailable(Exception):
+    pass
+
+
+def _commit_error(e: SQLAlchemyError) -> Exception:
+    if isinstance(e, IntegrityError):
+        return RuntimeError("The seats changed meanwhile; please try again")
+    return SeatWriteUnavailable("The seat change could not be saved; please try again")
+
+
+class BookingExecutor:
+    def __init__(self, partitions: int, batch_size: int, session_factory=SessionLocal):
+        self.partitions = partitions
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+        self._queues: list[queue.Queue] = []
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def submit(self, showtime_id: int, op: Callable[[Session], T]) -> Future:
+        self._ensure_started()
+        future: Future = Future()
+        self._queues[showtime_id % self.partitions].put((op, future))
+        return future
+
+    def run(self, showtime_id: int, op: Callable[[Session], T]) -> T:
+        return self.submit(showtime_id, op).result()
+
+    def stop(self):
+        with self._lock:
+            for q in self._queues:
+                q.put(_STOP)
+            for t in self._threads:
+                t.join()
+            self._queues, self._threads = [], []
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            self._queues = [queue.Queue() for _ in range(self.partitions)]
+            threads = []
+            for i, q in enumerate(self._queues):
+                t = threading.Thread(target=self._work, args=(q,), name=f"booking-writer-{i}", daemon=True)
+                t.start()
+                threads.append(t)
+            # Published last: callers check _threads before touching _queues
+            self._threads = threads
+
+    def _work(self, q: queue.Queue):
+        while True:
+            item = q.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    q.put(_STOP)
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        db = self.session_factory()
+        outcomes = []
+        try:
+            for op, future in batch:
+                mark = pending_event_count(db)
+                try:
+                    with db.begin_nested():
+                        outcomes.append((op, future, op(db), None))
+                except Exception as e:
+                    # Events of a rolled-back claim must not be published
+                    discard_events_since(db, mark)
+                    outcomes.append((op, future, None, e))
+            db.commit()
+        except Exception:
+            logger.warning("Booking batch of %d failed to commit; retrying one at a time", len(batch), exc_info=True)
+            db.rollback()
+            for op, future in batch:
+                self._run_alone(op, future)
+            return
+        finally:
+            db.close()
+
+        for _, future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _run_alone(self, op, future: Future):
+        db = self.session_factory()
+        try:
+            result = op(db)
+        except Exception as e:
+            db.rollback()
+            future.set_exception(e)
+            db.close()
+            return
+        try:
+            db.commit()
+        except SQLAlchemyError as e:
+            logger.exception("Seat write failed to commit")
+            db.rollback()
+            future.set_exception(_commit_error(e))
+        else:
+            future.set_result(result)
+        finally:
+            db.close()
+
+booking_executor = (
+    BookingExecutor(settings.BOOKING_EXECUTOR_PARTITIONS, settings.BOOKING_EXECUTOR_BATCH_SIZE)
+    if settings.BOOKING_EXECUTOR_ENABLED
+    else None
+)
+
+
+def run_seat_write(db: Session, showtime_id: int, op: Callable[[Session], T]) -> T:
+    # Runs and commits `op` on the request session, or on the showtime's
+    # writer partition when the executor is enabled. Errors raised by `op`
+    # propagate after the work has been rolled back.
+    if booking_executor is None:
+        try:
+            result = op(db)
+        except Exception:
+            db.rollback()
+            raise
+        try:
+            db.commit()
+        except SQLAlchemyError as e:
+            logger.exception("Seat write failed to commit")
+            db.rollback()
+            raise _commit_error(e) from e
+        return result
+    return booking_executor.run(showtime_id, op)
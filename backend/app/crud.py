@@ -1,28 +1,121 @@
 from __future__ import annotations
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
-from sqlalchemy import select, and_
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, insert, update, delete, literal, and_, or_, case, func, tuple_
+from sqlalchemy.orm import Session, contains_eager, joinedload, selectinload
 from .models import (
     Movie, Showtime, Screen, Theater, Seat, ShowtimeSeat,
-    ShowtimeSeatStatus, Booking, BookingSeat, User, BookingStatus, Rating
+    ShowtimeSeatStatus, Booking, BookingSeat, BookingSummary, User, BookingStatus, Rating, MovieRatingStats,
+    MovieGenre, RatingChangeCounter, MovieChangeCounter
 )
 from .settings import settings
+from .response_cache import response_cache
+from .schedule import schedule_cache
+from .screen_intervals import Occupied, ScreenIntervals, ShowtimeConflict
+from .seat_events import record_seat_change
+from .search_index import search_index
+from .seat_state import ShowtimeSeatState, seat_state_cache, seat_sort_key
+from .similarity_index import similarity_index, split_values
 from .utils import utcnow
 
 def create_movie(db: Session, **kwargs) -> Movie:
     movie = Movie(**kwargs)
     db.add(movie)
+    db.flush()
+    sync_movie_genres(db, movie.id, movie.genre)
+    changes = bump_movie_changes(db)
     db.commit()
     db.refresh(movie)
+    response_cache.invalidate("movies")
+    similarity_index.upsert_movie(movie.id, movie.genre, movie.language, changes=changes)
+    search_index.upsert_movie(movie.id, movie.title, movie.description, movie.genre, movie.language, changes=changes)
     return movie
 
-def list_movies(db: Session):
-    return db.execute(select(Movie).order_by(Movie.id.desc())).scalars().all()
+def sync_movie_genres(db: Session, movie_id: int, genre: str | None):
+    # no commit here (caller controls transaction)
+    db.execute(delete(MovieGenre).where(MovieGenre.movie_id == movie_id))
+    names = split_values(genre)
+    if names:
+        db.execute(insert(MovieGenre), [{"movie_id": movie_id, "genre": name} for name in names])
+
+def rebuild_movie_genres(db: Session, batch_size: int = 1000) -> int:
+    written = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(Movie.id, Movie.genre).where(Movie.id > last_id).order_by(Movie.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return written
+        for movie_id, genre in rows:
+            sync_movie_genres(db, movie_id, genre)
+            written += len(split_values(genre))
+        last_id = rows[-1].id
+
+def list_movies(
+    db: Session,
+    genre: str | None = None,
+    language: str | None = None,
+    released_from: date | None = None,
+    released_to: date | None = None,
+    showing_within_days: int | None = None,
+    before_id: int | None = None,
+    limit: int | None = None,
+):
+    # Newest first; pages continue from the last id seen (keyset, no OFFSET)
+    stmt = select(Movie)
+    if genre:
+        stmt = stmt.where(
+            select(MovieGenre.movie_id)
+            .where(MovieGenre.genre == genre.strip().lower(), MovieGenre.movie_id == Movie.id)
+            .exists()
+        )
+    if language:
+        stmt = stmt.where(Movie.language == language)
+    if released_from:
+        stmt = stmt.where(Movie.release_date >= released_from)
+    if released_to:
+        stmt = stmt.where(Movie.release_date <= released_to)
+    if showing_within_days is not None:
+        now = utcnow()
+        stmt = stmt.where(
+            select(Showtime.id)
+            .where(
+                Showtime.movie_id == Movie.id,
+                Showtime.start_time >= now,
+                Showtime.start_time < now + timedelta(days=showing_within_days),
+            )
+            .exists()
+        )
+    if before_id is not None:
+        stmt = stmt.where(Movie.id < before_id)
+    stmt = stmt.order_by(Movie.id.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return db.execute(stmt).scalars().all()
+
+def bump_movie_changes(db: Session, count: int = 1) -> int:
+    # Tells every worker's movie indexes to resync; bumped in the writer's
+    # transaction. Returns the new total: the row stays locked until commit,
+    # so it is exactly one past the previous writer's
+    _upsert(
+        db, MovieChangeCounter, [{"id": 1, "changes": count}], ["id"],
+        lambda proposed: {"changes": MovieChangeCounter.changes + proposed.changes},
+    )
+    # no commit here (caller controls transaction)
+    return get_movie_changes(db)
+
+def get_movie_changes(db: Session) -> int:
+    return db.scalar(select(MovieChangeCounter.changes).where(MovieChangeCounter.id == 1)) or 0
 
 def get_movie(db: Session, movie_id: int):
     return db.get(Movie, movie_id)
 
+def get_movies_by_ids(db: Session, movie_ids: list[int]) -> dict[int, Movie]:
+    if not movie_ids:
+        return {}
+    return {m.id: m for m in db.execute(select(Movie).where(Movie.id.in_(movie_ids))).scalars().all()}
+
 def update_movie(db: Session, movie_id: int, **kwargs) -> Movie | None:
     movie = db.get(Movie, movie_id)
     if not movie:
@@ -30,8 +123,14 @@ def update_movie(db: Session, movie_id: int, **kwargs) -> Movie | None:
     for key, value in kwargs.items():
         if value is not None or key in ("description", "language", "genre", "poster_url", "release_date"):
             setattr(movie, key, value)
+    sync_movie_genres(db, movie.id, movie.genre)
+    changes = bump_movie_changes(db)
     db.commit()
     db.refresh(movie)
+    schedule_cache.clear()
+    response_cache.invalidate("movies")
+    similarity_index.upsert_movie(movie.id, movie.genre, movie.language, changes=changes)
+    search_index.upsert_movie(movie.id, movie.title, movie.description, movie.genre, movie.language, changes=changes)
     return movie
 
 def delete_movie(db: Session, movie_id: int) -> bool:
@@ -39,7 +138,12 @@ def delete_movie(db: Session, movie_id: int) -> bool:
     if not movie:
         return False
     db.delete(movie)
+    changes = bump_movie_changes(db)
     db.commit()
+    schedule_cache.clear()
+    response_cache.invalidate("movies", "showtimes")
+    similarity_index.remove_movie(movie_id, changes=changes)
+    search_index.remove_movie(movie_id, changes=changes)
     return True
 
 def list_screens(db: Session):
@@ -47,8 +151,58 @@ def list_screens(db: Session):
         select(Screen).options(joinedload(Screen.theater)).order_by(Screen.id)
     ).scalars().all()
 
+def get_screen_layout(db: Session, screen_id: int):
+    screen = db.execute(
+        select(Screen).options(joinedload(Screen.theater)).where(Screen.id == screen_id)
+    ).scalars().first()
+    if not screen:
+        return None
+    seats = db.execute(select(Seat).where(Seat.screen_id == screen_id)).scalars().all()
+    return screen, sorted(seats, key=seat_sort_key)
+
+def _cleaning_buffer() -> timedelta:
+    return timedelta(minutes=settings.SHOWTIME_CLEANING_BUFFER_MINS)
+
+def _lock_screens(db: Session, screen_ids: list[int]) -> set[int]:
+    # Row locks serialize scheduling on the same screens; returns the ids that exist
+    rows = db.execute(
+        select(Screen.id).where(Screen.id.in_(screen_ids)).order_by(Screen.id).with_for_update()
+    ).scalars().all()
+    return set(rows)
+
+def _screen_intervals(db: Session, screen_ids: list[int], start: datetime, end: datetime) -> dict[int, ScreenIntervals]:
+    # Occupied intervals (end + cleaning buffer) of showtimes that can touch [start, end)
+    buffer = _cleaning_buffer()
+    rows = db.execute(
+        select(Showtime.id, Showtime.screen_id, Showtime.start_time, Showtime.end_time)
+        .where(
+            Showtime.screen_id.in_(screen_ids),
+            Showtime.start_time < end + buffer,
+            Showtime.end_time > start - buffer,
+        )
+    ).all()
+    by_screen: dict[int, list[Occupied]] = {screen_id: [] for screen_id in screen_ids}
+    for row in rows:
+        by_screen[row.screen_id].append(Occupied(row.start_time, row.end_time + buffer, showtime_id=row.id))
+    return {screen_id: ScreenIntervals(items) for screen_id, items in by_screen.items()}
+
+def _conflict(slot: int, screen_id: int, start_time: datetime, other: Occupied) -> dict:
+    return {
+        "slot": slot,
+        "screen_id": screen_id,
+        "start_time": start_time,
+        "conflicting_showtime_id": other.showtime_id,
+        "conflicting_slot": other.slot,
+    }
+
 def create_showtime(db: Session, movie_id: int, screen_id: int, start_time: datetime, price, duration_mins: int) -> Showtime:
     end_time = start_time + timedelta(minutes=duration_mins)
+    if not _lock_screens(db, [screen_id]):
+        raise ValueError("Screen not found")
+    intervals = _screen_intervals(db, [screen_id], start_time, end_time)[screen_id]
+    taken = intervals.conflicts(start_time, end_time + _cleaning_buffer())
+    if taken:
+        raise ShowtimeConflict([_conflict(0, screen_id, start_time, other) for other in taken])
     showtime = Showtime(
         movie_id=movie_id,
         screen_id=screen_id,
@@ -57,10 +211,102 @@ def create_showtime(db: Session, movie_id: int, screen_id: int, start_time: date
         price=price,
     )
     db.add(showtime)
+    db.flush()
+    materialize_showtime_seats(db, [showtime.id])
     db.commit()
     db.refresh(showtime)
+    response_cache.invalidate("showtimes")
+    schedule_cache.invalidate_day(start_time.date())
     return showtime
 
+BULK_SHOWTIME_CHUNK = 500  # showtimes per INSERT ... SELECT of seat inventory
+
+def bulk_create_showtimes(db: Session, slots: list[dict]) -> list[int]:
+    # slots: {movie_id, screen_id, start_time, price}. All or nothing: every
+    # slot is checked against the screens' existing showtimes and the slots
+    # before it, and any conflict rejects the batch (ShowtimeConflict lists
+    # them all). Showtimes and their showtime_seats go in one transaction.
+    if not slots:
+        return []
+    movie_ids = sorted({slot["movie_id"] for slot in slots})
+    durations = dict(db.execute(
+        select(Movie.id, Movie.duration_mins).where(Movie.id.in_(movie_ids))
+    ).all())
+    missing_movies = [mid for mid in movie_ids if mid not in durations]
+    if missing_movies:
+        raise ValueError(f"Movies not found: {missing_movies}")
+    screen_ids = sorted({slot["screen_id"] for slot in slots})
+    missing_screens = sorted(set(screen_ids) - _lock_screens(db, screen_ids))
+    if missing_screens:
+        raise ValueError(f"Screens not found: {missing_screens}")
+
+    buffer = _cleaning_buffer()
+    rows = []
+    for slot in slots:
+        start_time = slot["start_time"]
+        rows.append({
+            "movie_id": slot["movie_id"],
+            "screen_id": slot["screen_id"],
+            "start_time": start_time,
+            "end_time": start_time + timedelta(minutes=durations[slot["movie_id"]]),
+            "price": slot["price"],
+        })
+    intervals = _screen_intervals(
+        db, screen_ids, min(r["start_time"] for r in rows), max(r["end_time"] for r in rows)
+    )
+    conflicts = []
+    for i in sorted(range(len(rows)), key=lambda i: rows[i]["start_time"]):
+        row = rows[i]
+        screen = intervals[row["screen_id"]]
+        occupied_end = row["end_time"] + buffer
+        taken = screen.conflicts(row["start_time"], occupied_end)
+        conflicts.extend(_conflict(i, row["screen_id"], row["start_time"], other) for other in taken)
+        screen.add(Occupied(row["start_time"], occupied_end, slot=i))
+    if conflicts:
+        raise ShowtimeConflict(sorted(conflicts, key=lambda c: c["slot"]))
+
+    # One executemany instead of an INSERT per ORM object (MySQL has no
+    # RETURNING). With overlaps rejected, (screen_id, start_time) identifies
+    # each new row, and the screens stay locked until commit.
+    db.execute(insert(Showtime), rows)
+    showtime_ids = []
+    for chunk_start in range(0, len(rows), BULK_SHOWTIME_CHUNK):
+        chunk = rows[chunk_start:chunk_start + BULK_SHOWTIME_CHUNK]
+        ids = db.execute(
+            select(Showtime.id).where(
+                tuple_(Showtime.screen_id, Showtime.start_time).in_([(r["screen_id"], r["start_time"]) for r in chunk])
+            )
+        ).scalars().all()
+        materialize_showtime_seats(db, ids)
+        showtime_ids.extend(ids)
+    db.commit()
+    response_cache.invalidate("showtimes")
+    for day in {row["start_time"].date() for row in rows}:
+        schedule_cache.invalidate_day(day)
+    return showtime_ids
+
+def materialize_showtime_seats(db: Session, showtime_ids: list[int]) -> int:
+    # Copies each screen's Seat rows into showtime_seats with one
+    # INSERT ... SELECT; seats that already have a row are skipped, so this
+    # also backfills showtimes created before inventory was pre-materialized.
+    if not showtime_ids:
+        return 0
+    already_present = (
+        select(ShowtimeSeat.seat_id)
+        .where(ShowtimeSeat.showtime_id == Showtime.id, ShowtimeSeat.seat_id == Seat.id)
+        .exists()
+    )
+    source = (
+        select(Showtime.id, Seat.id, literal(ShowtimeSeatStatus.AVAILABLE, ShowtimeSeat.status.type))
+        .join(Seat, Seat.screen_id == Showtime.screen_id)
+        .where(Showtime.id.in_(showtime_ids), ~already_present)
+    )
+    result = db.execute(
+        insert(ShowtimeSeat).from_select(["showtime_id", "seat_id", "status"], source)
+    )
+    # no commit here (caller controls transaction)
+    return result.rowcount
+
 def list_showtimes_for_movie(db: Session, movie_id: int, day_start: datetime, day_end: datetime):
     stmt = (
         select(Showtime)
@@ -76,36 +322,139 @@ def list_showtimes_for_movie(db: Session, movie_id: int, day_start: datetime, da
     )
     return db.execute(stmt).scalars().all()
 
-def _cleanup_expired_locks(db: Session, showtime_id: int):
+def list_schedule(db: Session, start: datetime, end: datetime, city: str | None = None, theater_id: int | None = None):
+    # Every showtime starting in [start, end) with its movie, screen and
+    # theater in one query; per screen it is a range scan of ix_showtimes_screen_start
+    stmt = (
+        select(Showtime)
+        .join(Showtime.screen)
+        .join(Screen.theater)
+        .options(contains_eager(Showtime.screen).contains_eager(Screen.theater), joinedload(Showtime.movie))
+        .where(Showtime.start_time >= start, Showtime.start_time < end)
+        .order_by(Showtime.start_time.asc(), Showtime.id.asc())
+    )
+    if theater_id is not None:
+        stmt = stmt.where(Screen.theater_id == theater_id)
+    elif city:
+        stmt = stmt.where(func.lower(Theater.city) == city.strip().lower())
+    return db.execute(stmt).scalars().all()
+
+def _expired_lock_clause(now: datetime):
+    return and_(
+        ShowtimeSeat.status == ShowtimeSeatStatus.LOCKED,
+        ShowtimeSeat.locked_until <= now,
+    )
+
+def get_seat_counts(db: Session, showtime_ids: list[int], now: datetime) -> dict:
+    # Available/locked/booked per showtime in one grouped aggregate (covered
+    # by ix_showtime_seats_status_lock); holds that have expired count as available
+    from .seat_counts import SeatCounts
+
+    expired = case((ShowtimeSeat.locked_until <= now, 1), else_=0)
+    live_expiry = case((ShowtimeSeat.locked_until > now, ShowtimeSeat.locked_until))
+    rows = db.execute(
+        select(
+            ShowtimeSeat.showtime_id, ShowtimeSeat.status, func.count(),
+            func.sum(expired), func.min(live_expiry),
+        )
+        .where(ShowtimeSeat.showtime_id.in_(showtime_ids))
+        .group_by(ShowtimeSeat.showtime_id, ShowtimeSeat.status)
+    ).all()
+    totals: dict[int, dict] = {}
+    for showtime_id, status, count, expired_count, next_expiry in rows:
+        t = totals.setdefault(showtime_id, {"available": 0, "locked": 0, "booked": 0, "next_expiry": None})
+        if status == ShowtimeSeatStatus.LOCKED:
+            t["locked"] += count - (expired_count or 0)
+            t["available"] += expired_count or 0
+            t["next_expiry"] = next_expiry
+        elif status == ShowtimeSeatStatus.BOOKED:
+            t["booked"] += count
+        else:
+            t["available"] += count
+    counts = {showtime_id: SeatCounts(**t) for showtime_id, t in totals.items()}
+    # Showtimes that exist but have no seat inventory yet count as all zeros
+    missing = [showtime_id for showtime_id in showtime_ids if showtime_id not in counts]
+    if missing:
+        for showtime_id in db.execute(select(Showtime.id).where(Showtime.id.in_(missing))).scalars():
+            counts[showtime_id] = SeatCounts(0, 0, 0)
+    return counts
+
+def release_expired_locks(db: Session, limit: int) -> dict[int, list[int]]:
+    # Releases up to `limit` expired holds across all showtimes and returns
+    # the released seat ids grouped by showtime id.
     now = utcnow()
-    stmt = select(ShowtimeSeat).where(ShowtimeSeat.showtime_id == showtime_id)
-    rows = db.execute(stmt).scalars().all()
-    for r in rows:
-        if r.status == ShowtimeSeatStatus.LOCKED and r.locked_until and r.locked_until <= now:
-            r.status = ShowtimeSeatStatus.AVAILABLE
-            r.locked_until = None
-            r.booking_id = None
+    keys = db.execute(
+        select(ShowtimeSeat.showtime_id, ShowtimeSeat.seat_id)
+        .where(_expired_lock_clause(now))
+        .limit(limit)
+    ).all()
+
+    released: dict[int, list[int]] = {}
+    for showtime_id, seat_id in keys:
+        released.setdefault(showtime_id, []).append(seat_id)
+
+    for showtime_id, seat_ids in released.items():
+        result = db.execute(
+            update(ShowtimeSeat)
+            .where(
+                ShowtimeSeat.showtime_id == showtime_id,
+                ShowtimeSeat.seat_id.in_(seat_ids),
+                _expired_lock_clause(now),
+            )
+            .values(status=ShowtimeSeatStatus.AVAILABLE, locked_until=None, booking_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            version = _bump_seat_version(db, showtime_id)
+            # Seats re-claimed since the SELECT are no longer AVAILABLE and
+            # keep the version their new holder stamped.
+            db.execute(
+                update(ShowtimeSeat)
+                .where(
+                    ShowtimeSeat.showtime_id == showtime_id,
+                    ShowtimeSeat.seat_id.in_(seat_ids),
+                    ShowtimeSeat.status == ShowtimeSeatStatus.AVAILABLE,
+                )
+                .values(version=version)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != len(seat_ids):
+                seat_ids[:] = db.execute(
+                    select(ShowtimeSeat.seat_id).where(
+                        ShowtimeSeat.showtime_id == showtime_id,
+                        ShowtimeSeat.version == version,
+                    )
+                ).scalars().all()
+            record_seat_change(db, showtime_id, version, ShowtimeSeatStatus.AVAILABLE, seat_ids)
+        else:
+            seat_ids.clear()
     # no commit here (caller controls transaction)
+    return released
+
+def _bump_seat_version(db: Session, showtime_id: int) -> int:
+    # Writers always lock seat rows before the showtime row, so versions are
+    # handed out in commit order.
+    db.execute(
+        update(Showtime)
+        .where(Showtime.id == showtime_id)
+        .values(seat_version=Showtime.seat_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return db.scalar(select(Showtime.seat_version).where(Showtime.id == showtime_id))
+
+def get_seat_version(db: Session, showtime_id: int) -> int | None:
+    return db.scalar(select(Showtime.seat_version).where(Showtime.id == showtime_id))
 
 def get_seat_map(db: Session, showtime_id: int):
-    showtime = db.get(Showtime, showtime_id)
-    if not showtime:
-        return None
-    screen = db.get(Screen, showtime.screen_id)
-    if not screen:
+    # Showtime, screen and theater in one query; seats in a second
+    showtime = db.execute(
+        select(Showtime)
+        .where(Showtime.id == showtime_id)
+        .options(joinedload(Showtime.screen).joinedload(Screen.theater))
+    ).scalars().first()
+    if not showtime or not showtime.screen:
         return None
 
-    _cleanup_expired_locks(db, showtime_id)
-
-    # Ensure showtime_seats rows exist for each seat
-    seat_rows = db.execute(select(Seat).where(Seat.screen_id == screen.id)).scalars().all()
-    existing = { (ss.seat_id): ss for ss in db.execute(select(ShowtimeSeat).where(ShowtimeSeat.showtime_id == showtime_id)).scalars().all() }
-
-    for seat in seat_rows:
-        if seat.id not in existing:
-            db.add(ShowtimeSeat(showtime_id=showtime_id, seat_id=seat.id, status=ShowtimeSeatStatus.AVAILABLE))
-    db.flush()
-
     ss_rows = (
         db.execute(
             select(ShowtimeSeat)
@@ -115,15 +464,79 @@ def get_seat_map(db: Session, showtime_id: int):
         .scalars()
         .all()
     )
-    return screen, ss_rows
+    return showtime, ss_rows
+
+def get_seat_state(db: Session, showtime_id: int) -> ShowtimeSeatState | None:
+    # Writes made by other workers only reach this worker's cache through the
+    # Redis event backend; a primary-key read of seat_version catches any the
+    # cache missed (in-memory backend, dropped connection) before it is served
+    state = seat_state_cache.peek(showtime_id)
+    if state is not None:
+        version = get_seat_version(db, showtime_id)
+        if version is None or version > state.version:
+            seat_state_cache.invalidate(showtime_id)
+        if version is None:
+            return None
+    return seat_state_cache.get_or_load(showtime_id, lambda: _load_seat_state(db, showtime_id))
+
+def _load_seat_state(db: Session, showtime_id: int) -> ShowtimeSeatState | None:
+    # The version is read with the showtime, before the seat rows: changes
+    # committed meanwhile are replayed, never lost
+    result = get_seat_map(db, showtime_id)
+    if not result:
+        return None
+    showtime, ss_rows = result
+    return ShowtimeSeatState.from_rows(showtime, showtime.screen, ss_rows, showtime.seat_version)
 
 def lock_seats(db: Session, showtime_id: int, seat_ids: list[int]) -> list[int]:
+    # BOOKED is final, so a cached BOOKED seat can be refused without the DB
+    state = seat_state_cache.peek(showtime_id)
+    if state is not None:
+        booked = state.booked_among(seat_ids)
+        if booked:
+            raise RuntimeError(f"Seat {booked[0]} is already booked")
+    if settings.SEAT_LOCK_MODE == "legacy":
+        return _lock_seats_legacy(db, showtime_id, seat_ids)
+    return _lock_seats_cas(db, showtime_id, seat_ids)
+
+def _lock_seats_cas(db: Session, showtime_id: int, seat_ids: list[int]) -> list[int]:
+    now = utcnow()
+    locked_until = now + timedelta(seconds=settings.LOCK_TTL_SECONDS)
+    requested = list(dict.fromkeys(seat_ids))
+
+    # Claim every requested seat that is free (or whose hold expired) in one
+    # statement; success is decided by the affected-row count alone.
+    result = db.execute(
+        update(ShowtimeSeat)
+        .where(
+            ShowtimeSeat.showtime_id == showtime_id,
+            ShowtimeSeat.seat_id.in_(requested),
+            or_(ShowtimeSeat.status == ShowtimeSeatStatus.AVAILABLE, _expired_lock_clause(now)),
+        )
+        .values(status=ShowtimeSeatStatus.LOCKED, locked_until=locked_until, booking_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(requested):
+        # Partial claims are undone by the caller's rollback (all-or-nothing)
+        if db.scalar(select(Showtime.id).where(Showtime.id == showtime_id)) is None:
+            raise ValueError("Showtime not found")
+        raise RuntimeError("One or more selected seats are no longer available")
+
+    version = _bump_seat_version(db, showtime_id)
+    db.execute(
+        update(ShowtimeSeat)
+        .where(ShowtimeSeat.showtime_id == showtime_id, ShowtimeSeat.seat_id.in_(requested))
+        .values(version=version)
+        .execution_options(synchronize_session=False)
+    )
+    record_seat_change(db, showtime_id, version, ShowtimeSeatStatus.LOCKED, requested, locked_until)
+    return seat_ids
+
+def _lock_seats_legacy(db: Session, showtime_id: int, seat_ids: list[int]) -> list[int]:
     showtime = db.get(Showtime, showtime_id)
     if not showtime:
         raise ValueError("Showtime not found")
 
-    _cleanup_expired_locks(db, showtime_id)
-
     now = utcnow()
     locked_until = now + timedelta(seconds=settings.LOCK_TTL_SECONDS)
 
@@ -136,14 +549,8 @@ def lock_seats(db: Session, showtime_id: int, seat_ids: list[int]) -> list[int]:
     )
     rows = db.execute(stmt).scalars().all()
 
-    # If some rows missing (shouldn't after seat map init), create them
-    existing_ids = {r.seat_id for r in rows}
-    missing = [sid for sid in seat_ids if sid not in existing_ids]
-    for sid in missing:
-        db.add(ShowtimeSeat(showtime_id=showtime_id, seat_id=sid, status=ShowtimeSeatStatus.AVAILABLE))
-    db.flush()
-
-    rows = db.execute(stmt).scalars().all()
+    if len(rows) != len(set(seat_ids)):
+        raise RuntimeError("One or more seats not found for this showtime")
 
     # Validate availability
     for r in rows:
@@ -153,10 +560,13 @@ def lock_seats(db: Session, showtime_id: int, seat_ids: list[int]) -> list[int]:
             raise RuntimeError(f"Seat {r.seat_id} is currently locked")
 
     # Lock them
+    version = _bump_seat_version(db, showtime_id)
     for r in rows:
         r.status = ShowtimeSeatStatus.LOCKED
         r.locked_until = locked_until
         r.booking_id = None
+        r.version = version
+    record_seat_change(db, showtime_id, version, ShowtimeSeatStatus.LOCKED, [r.seat_id for r in rows], locked_until)
 
     return seat_ids
 
@@ -165,7 +575,6 @@ def create_booking(db: Session, user_id: int, showtime_id: int, seat_ids: list[i
     if not showtime:
         raise ValueError("Showtime not found")
 
-    _cleanup_expired_locks(db, showtime_id)
     now = utcnow()
 
     # Lock check & update to BOOKED under transaction
@@ -202,26 +611,95 @@ def create_booking(db: Session, user_id: int, showtime_id: int, seat_ids: list[i
         db.add(BookingSeat(booking_id=booking.id, seat_id=sid))
 
     # mark showtime seats BOOKED
+    version = _bump_seat_version(db, showtime_id)
     for r in ss_rows:
         r.status = ShowtimeSeatStatus.BOOKED
         r.locked_until = None
         r.booking_id = booking.id
+        r.version = version
+    record_seat_change(db, showtime_id, version, ShowtimeSeatStatus.BOOKED, [r.seat_id for r in ss_rows])
 
     db.flush()
+    write_booking_summaries(db, [booking.id])
     db.refresh(booking)
     return booking
 
-def list_bookings_for_user(db: Session, user_id: int):
+def list_bookings_for_user(db: Session, user_id: int, before_id: int | None = None, limit: int | None = None):
+    # Seats come from a second query: joining them in would repeat every
+    # booking's showtime/movie/theater columns once per seat
     stmt = (
         select(Booking)
         .where(Booking.user_id == user_id)
         .options(
             joinedload(Booking.showtime).joinedload(Showtime.screen).joinedload(Screen.theater),
-            joinedload(Booking.seats).joinedload(BookingSeat.seat),
+            joinedload(Booking.showtime).joinedload(Showtime.movie),
+            selectinload(Booking.seats).joinedload(BookingSeat.seat),
         )
         .order_by(Booking.id.desc())
     )
-    return db.execute(stmt).unique().scalars().all()
+    if before_id is not None:
+        stmt = stmt.where(Booking.id < before_id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return db.execute(stmt).scalars().all()
+
+def list_booking_summaries(db: Session, user_id: int, before_id: int | None = None, limit: int = 20):
+    # One range scan of ix_booking_summaries_user_booking, no joins
+    stmt = (
+        select(BookingSummary)
+        .where(BookingSummary.user_id == user_id)
+        .order_by(BookingSummary.booking_id.desc())
+        .limit(limit)
+    )
+    if before_id is not None:
+        stmt = stmt.where(BookingSummary.booking_id < before_id)
+    return db.execute(stmt).scalars().all()
+
+def write_booking_summaries(db: Session, booking_ids: list[int]) -> int:
+    # Copies each booking's history row into booking_summaries (insert or
+    # refresh); two reads however many bookings are passed
+    bookings = db.execute(
+        select(Booking)
+        .where(Booking.id.in_(booking_ids))
+        .options(
+            joinedload(Booking.showtime).joinedload(Showtime.screen).joinedload(Screen.theater),
+            joinedload(Booking.showtime).joinedload(Showtime.movie),
+            selectinload(Booking.seats).joinedload(BookingSeat.seat),
+        )
+    ).scalars().all()
+    rows = []
+    for b in bookings:
+        showtime = b.showtime
+        movie, screen = showtime.movie, showtime.screen
+        theater = screen.theater
+        seats = sorted((bs.seat for bs in b.seats), key=seat_sort_key)
+        rows.append({
+            "booking_id": b.id,
+            "user_id": b.user_id,
+            "status": b.status.value if hasattr(b.status, "value") else str(b.status),
+            "created_at": b.created_at,
+            "total_amount": b.total_amount,
+            "showtime_id": showtime.id,
+            "start_time": showtime.start_time,
+            "price": showtime.price,
+            "movie_id": movie.id,
+            "movie_title": movie.title,
+            "poster_url": movie.poster_url,
+            "genre": movie.genre,
+            "language": movie.language,
+            "duration_mins": movie.duration_mins,
+            "screen_name": screen.name,
+            "theater_name": theater.name if theater else None,
+            "theater_city": theater.city if theater else None,
+            "seat_labels": ",".join(f"{s.seat_row}{s.seat_col}" for s in seats),
+            "seat_count": len(seats),
+        })
+    if not rows:
+        return 0
+    columns = [c for c in rows[0] if c != "booking_id"]
+    _upsert(db, BookingSummary, rows, ["booking_id"], lambda new: {c: getattr(new, c) for c in columns})
+    # no commit here (caller controls transaction)
+    return len(rows)
 
 def get_booking(db: Session, booking_id: int, user_id: int):
     stmt = (
@@ -229,26 +707,135 @@ def get_booking(db: Session, booking_id: int, user_id: int):
         .where(and_(Booking.id == booking_id, Booking.user_id == user_id))
         .options(
             joinedload(Booking.showtime).joinedload(Showtime.screen).joinedload(Screen.theater),
+            joinedload(Booking.showtime).joinedload(Showtime.movie),
             joinedload(Booking.seats).joinedload(BookingSeat.seat),
         )
     )
     return db.execute(stmt).unique().scalars().first()
 
+def _upsert(db: Session, model, rows: list[dict], index_elements: list[str], set_):
+    # Multi-row INSERT that updates on a key conflict. `set_` receives the
+    # proposed row (MySQL VALUES() / ON CONFLICT excluded) and returns the
+    # column -> expression map used for the update.
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        stmt = dialect_insert(model).values(rows)
+        stmt = stmt.on_duplicate_key_update(set_(stmt.inserted))
+    elif dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(model).values(rows)
+        stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_(stmt.excluded))
+    else:
+        raise NotImplementedError(f"Upsert is not supported on {dialect}")
+    return db.execute(stmt)
+
+STAT_COLUMNS = ("rating_sum", "rating_count", "count_1", "count_2", "count_3", "count_4", "count_5")
+
+def _stats_delta(old_score: int | None, new_score: int | None) -> dict:
+    delta = dict.fromkeys(STAT_COLUMNS, 0)
+    for score, sign in ((old_score, -1), (new_score, 1)):
+        if score is not None:
+            delta["rating_sum"] += sign * score
+            delta["rating_count"] += sign
+            delta[f"count_{score}"] += sign
+    return delta
+
+def apply_rating_stats_deltas(db: Session, deltas: dict[int, dict]):
+    # Adds per-movie deltas to movie_rating_stats in one statement; the
+    # increments happen in the database, so concurrent writers never lose one
+    rows = [{"movie_id": movie_id, **delta} for movie_id, delta in deltas.items() if any(delta.values())]
+    if not rows:
+        return
+    _upsert(
+        db, MovieRatingStats, rows, ["movie_id"],
+        lambda proposed: {col: getattr(MovieRatingStats, col) + getattr(proposed, col) for col in STAT_COLUMNS},
+    )
+    # no commit here (caller controls transaction)
+
+def bump_rating_changes(db: Session, count: int = 1):
+    # Shared drift signal for the recommender; bumped in the writer's transaction
+    if count:
+        _upsert(
+            db, RatingChangeCounter, [{"id": 1, "changes": count}], ["id"],
+            lambda proposed: {"changes": RatingChangeCounter.changes + proposed.changes},
+        )
+    # no commit here (caller controls transaction)
+
+def get_rating_changes(db: Session) -> int:
+    return db.scalar(select(RatingChangeCounter.changes).where(RatingChangeCounter.id == 1)) or 0
+
 def upsert_rating(db: Session, user_id: int, movie_id: int, score: int) -> Rating:
-    stmt = select(Rating).where(and_(Rating.user_id == user_id, Rating.movie_id == movie_id))
+    # Row lock so a concurrent change of the same rating cannot read the same old score
+    stmt = select(Rating).where(and_(Rating.user_id == user_id, Rating.movie_id == movie_id)).with_for_update()
     existing = db.execute(stmt).scalars().first()
     if existing:
+        apply_rating_stats_deltas(db, {movie_id: _stats_delta(existing.score, score)})
+        bump_rating_changes(db)
         existing.score = score
         db.commit()
         db.refresh(existing)
         return existing
     rating = Rating(user_id=user_id, movie_id=movie_id, score=score)
     db.add(rating)
+    apply_rating_stats_deltas(db, {movie_id: _stats_delta(None, score)})
+    bump_rating_changes(db)
     db.commit()
     db.refresh(rating)
     return rating
 
 
+def bulk_upsert_ratings(db: Session, rows: list[dict]) -> int:
+    # rows: {user_id, movie_id, score}, at most one per (user_id, movie_id).
+    # One SELECT of the scores being replaced, one aggregate delta and one
+    # multi-row upsert, instead of a round trip per rating.
+    if not rows:
+        return 0
+    pairs = [(r["user_id"], r["movie_id"]) for r in rows]
+    old_scores = {
+        (u, m): score for u, m, score in db.execute(
+            select(Rating.user_id, Rating.movie_id, Rating.score)
+            .where(tuple_(Rating.user_id, Rating.movie_id).in_(pairs))
+            .with_for_update()
+        ).all()
+    }
+    deltas: dict[int, dict] = {}
+    for r in rows:
+        delta = _stats_delta(old_scores.get((r["user_id"], r["movie_id"])), r["score"])
+        total = deltas.setdefault(r["movie_id"], dict.fromkeys(STAT_COLUMNS, 0))
+        for col, value in delta.items():
+            total[col] += value
+    apply_rating_stats_deltas(db, deltas)
+    _upsert(db, Rating, rows, ["user_id", "movie_id"], lambda proposed: {"score": proposed.score})
+    # no commit here (caller controls transaction; it also bumps the
+    # rating change counter, once per import rather than per chunk)
+    return len(rows)
+
+
+def get_movie_stats(db: Session, movie_ids: list[int] | None = None) -> list[MovieRatingStats]:
+    stmt = select(MovieRatingStats).where(MovieRatingStats.rating_count > 0)
+    if movie_ids is not None:
+        stmt = stmt.where(MovieRatingStats.movie_id.in_(movie_ids))
+    return db.execute(stmt.order_by(MovieRatingStats.movie_id)).scalars().all()
+
+
+def rebuild_rating_stats(db: Session) -> int:
+    # Recomputes every aggregate from the ratings table (backfill / repair)
+    db.execute(delete(MovieRatingStats))
+    source = select(
+        Rating.movie_id,
+        func.sum(Rating.score),
+        func.count(),
+        *[func.sum(case((Rating.score == n, 1), else_=0)) for n in range(1, 6)],
+    ).group_by(Rating.movie_id)
+    result = db.execute(insert(MovieRatingStats).from_select(["movie_id", *STAT_COLUMNS], source))
+    # no commit here (caller controls transaction)
+    return result.rowcount
+
+
 def get_user_rating(db: Session, user_id: int, movie_id: int) -> Rating | None:
     return db.execute(
         select(Rating).where(and_(Rating.user_id == user_id, Rating.movie_id == movie_id))
@@ -257,26 +844,38 @@ def get_user_rating(db: Session, user_id: int, movie_id: int) -> Rating | None:
 
 def list_user_ratings(db: Session, user_id: int):
     return db.execute(
-        select(Rating).where(Rating.user_id == user_id).order_by(Rating.id.desc())
+        select(Rating)
+        .where(Rating.user_id == user_id)
+        .options(joinedload(Rating.movie))
+        .order_by(Rating.id.desc())
     ).scalars().all()
 
 
 def delete_rating(db: Session, user_id: int, movie_id: int) -> bool:
     rating = db.execute(
-        select(Rating).where(and_(Rating.user_id == user_id, Rating.movie_id == movie_id))
+        select(Rating).where(and_(Rating.user_id == user_id, Rating.movie_id == movie_id)).with_for_update()
     ).scalars().first()
     if not rating:
         return False
+    apply_rating_stats_deltas(db, {movie_id: _stats_delta(rating.score, None)})
+    bump_rating_changes(db)
     db.delete(rating)
     db.commit()
     return True
 
 
-def ensure_demo_user(db: Session) -> User:
-    u = db.execute(select(User).where(User.id == 1)).scalars().first()
-    if u:
-        return u
-    u = User(id=1, email="demo@example.com", name="Demo User")
-    db.add(u)
+# Set once the demo user is known to be committed; users are never deleted
+_demo_user_exists = False
+
+def ensure_demo_user(db: Session) -> None:
+    global _demo_user_exists
+    if _demo_user_exists:
+        return
+    if db.execute(select(User.id).where(User.id == 1)).scalar() is not None:
+        # A row this session added itself may still be rolled back
+        if not db.info.get("demo_user_added"):
+            _demo_user_exists = True
+        return
+    db.add(User(id=1, email="demo@example.com", name="Demo User"))
     db.flush()
-    return u
+    db.info["demo_user_added"] = True
@@ -0,0 +1,42 @@
+"""Content negotiation for compact, cache-friendly responses.
+
+Bodies are JSON by default, msgpack when the client asks for
+``application/x-msgpack`` and the optional ``msgpack`` package is installed,
+and gzip-compressed when large enough and accepted by the client.
+"""
+from __future__ import annotations
+import gzip
+import json
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+GZIP_MIN_SIZE = 512
+
+
+def encoded_response(request: Request, payload, headers: dict | None = None) -> Response:
+    data = jsonable_encoder(payload)
+    if msgpack is not None and MSGPACK_MEDIA_TYPE in request.headers.get("accept", ""):
+        return _finish(request, msgpack.packb(data), MSGPACK_MEDIA_TYPE, headers)
+    return _finish(request, json.dumps(data, separators=(",", ":")).encode(), "application/json", headers)
+
+
+def encoded_json_response(request: Request, body: bytes, headers: dict | None = None) -> Response:
+    # For bodies already serialized to JSON (e.g. cached); re-encoded only for msgpack clients
+    if msgpack is not None and MSGPACK_MEDIA_TYPE in request.headers.get("accept", ""):
+        return _finish(request, msgpack.packb(json.loads(body)), MSGPACK_MEDIA_TYPE, headers)
+    return _finish(request, body, "application/json", headers)
+
+
+def _finish(request: Request, body: bytes, media_type: str, headers: dict | None) -> Response:
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept, Accept-Encoding"
+    if len(body) >= GZIP_MIN_SIZE and "gzip" in request.headers.get("accept-encoding", ""):
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type=media_type, headers=headers)
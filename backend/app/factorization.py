@@ -0,0 +1,80 @@
+"""Sparse truncated SVD for the ratings matrix.
+
+Ratings are kept as COO arrays (user index, movie index, value) and the
+matrix is only ever touched through sparse × dense products, each of which
+is ``rank + oversample`` ``np.bincount`` passes over the ratings. Training
+therefore needs O(ratings + (users + movies) · rank) memory and scales
+linearly with the number of ratings, instead of materialising the dense
+users × movies matrix. Uses the randomized range finder of Halko, Martinsson
+and Tropp with a few power iterations.
+"""
+from __future__ import annotations
+import numpy as np
+
+OVERSAMPLE = 10
+
+
+class RatingMatrix:
+    def __init__(self, user_idx, movie_idx, values, n_users: int, n_movies: int):
+        self.user_idx = np.asarray(user_idx, dtype=np.int32)
+        self.movie_idx = np.asarray(movie_idx, dtype=np.int32)
+        self.values = np.asarray(values, dtype=np.float32)
+        self.shape = (n_users, n_movies)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.values)
+
+    def user_means(self):
+        n_users = self.shape[0]
+        sums = np.bincount(self.user_idx, weights=self.values, minlength=n_users)
+        counts = np.bincount(self.user_idx, minlength=n_users)
+        return (sums / np.maximum(counts, 1)).astype(np.float32)
+
+    def centered(self) -> "RatingMatrix":
+        # Observed ratings minus the user's mean; unobserved cells stay 0
+        values = self.values - self.user_means()[self.user_idx]
+        return RatingMatrix(self.user_idx, self.movie_idx, values, *self.shape)
+
+    def matmul(self, dense):
+        # (users × movies) @ (movies × l) -> users × l
+        return _sparse_product(self.user_idx, self.movie_idx, self.values, self.shape[0], dense)
+
+    def rmatmul(self, dense):
+        # (movies × users) @ (users × l) -> movies × l
+        return _sparse_product(self.movie_idx, self.user_idx, self.values, self.shape[1], dense)
+
+
+def _sparse_product(out_idx, in_idx, values, n_out: int, dense):
+    # Column by column on transposed copies so every gather is contiguous
+    columns = np.ascontiguousarray(dense.T, dtype=np.float32)
+    out = np.empty((dense.shape[1], n_out), dtype=np.float32)
+    for j, column in enumerate(columns):
+        out[j] = np.bincount(out_idx, weights=values * column[in_idx], minlength=n_out)
+    return out.T
+
+
+def _orthonormal(block):
+    q, _ = np.linalg.qr(block)
+    return q.astype(np.float32, copy=False)
+
+
+def randomized_svd(matrix: RatingMatrix, rank: int, n_iter: int = 4, seed: int = 0):
+    """Top-``rank`` singular values and right singular vectors of ``matrix``.
+
+    Returns ``(sigma, item_factors)`` with ``item_factors`` shaped
+    movies × rank, float32. Exact when ``rank + OVERSAMPLE`` covers the
+    smaller dimension of the matrix.
+    """
+    n_users, n_movies = matrix.shape
+    width = min(rank + OVERSAMPLE, n_users, n_movies)
+    rng = np.random.default_rng(seed)
+
+    q = _orthonormal(matrix.matmul(rng.standard_normal((n_movies, width), dtype=np.float32)))
+    for _ in range(n_iter):
+        q = _orthonormal(matrix.matmul(_orthonormal(matrix.rmatmul(q))))
+
+    # B = Qᵀ A is small (width × movies); its SVD gives A's right singular vectors
+    b = matrix.rmatmul(q).T
+    _, sigma, vt = np.linalg.svd(b.astype(np.float64), full_matrices=False)
+    return sigma[:rank], np.ascontiguousarray(vt[:rank].T, dtype=np.float32)
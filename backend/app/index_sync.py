@@ -0,0 +1,44 @@
+"""Keeps each worker's in-memory movie indexes in step with the database.
+
+A worker patches its own indexes as it writes movies, but another worker's
+writes only show up in the shared ``movie_change_counter`` row. This loop
+reads that counter every ``MOVIE_INDEX_SYNC_INTERVAL_SECONDS`` and rebuilds
+an index that is behind, so other workers' changes are visible within one
+interval. Its first pass runs at startup and also trains the recommender
+model, so the similarity index gets co-rating vectors without a request
+ever waiting for an SVD.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+from starlette.concurrency import run_in_threadpool
+from .db import SessionLocal
+from .search_index import search_index
+from .similarity_index import similarity_index
+
+logger = logging.getLogger(__name__)
+
+
+def sync_movie_indexes() -> list[str]:
+    # Names of the indexes that were rebuilt
+    rebuilt = []
+    db = SessionLocal()
+    try:
+        if search_index.sync(db):
+            rebuilt.append("search")
+        if similarity_index.sync(db):
+            rebuilt.append("similarity")
+    finally:
+        db.close()
+    return rebuilt
+
+
+async def run_movie_index_sync(interval_seconds: float):
+    while True:
+        try:
+            rebuilt = await run_in_threadpool(sync_movie_indexes)
+            if rebuilt:
+                logger.info("Rebuilt movie indexes: %s", ", ".join(rebuilt))
+        except Exception:
+            logger.exception("Movie index sync failed")
+        await asyncio.sleep(interval_seconds)
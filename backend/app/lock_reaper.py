@@ -0,0 +1,37 @@
+from __future__ import annotations
+import asyncio
+import logging
+from starlette.concurrency import run_in_threadpool
+from .db import SessionLocal
+from .settings import settings
+from . import crud
+
+logger = logging.getLogger(__name__)
+
+def reap_expired_locks(batch_size: int | None = None) -> int:
+    batch_size = batch_size or settings.LOCK_REAPER_BATCH_SIZE
+    total = 0
+    db = SessionLocal()
+    try:
+        while True:
+            released = crud.release_expired_locks(db, batch_size)
+            db.commit()
+            count = sum(len(seat_ids) for seat_ids in released.values())
+            total += count
+            if count < batch_size:
+                return total
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+async def run_lock_reaper(interval_seconds: float):
+    while True:
+        try:
+            released = await run_in_threadpool(reap_expired_locks)
+            if released:
+                logger.info("Released %d expired seat locks", released)
+        except Exception:
+            logger.exception("Lock reaper pass failed")
+        await asyncio.sleep(interval_seconds)
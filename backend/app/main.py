@@ -1,5 +1,8 @@
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from .settings import settings
@@ -10,8 +13,39 @@ from .routers.bookings import router as bookings_router
 from .routers.admin import router as admin_router
 from .routers.uploads import router as uploads_router
 from .routers.ratings import router as ratings_router
+from .routers.debug import router as debug_router
+from .lock_reaper import run_lock_reaper
+from .booking_executor import booking_executor
+from .recommender import run_model_refresher
+from .index_sync import run_movie_index_sync
+from .query_stats import QueryStatsMiddleware, instrument
+from .response_cache import response_cache
+from .schedule import schedule_cache
+from .search_index import build_search_index, search_index
+from .seat_counts import seat_count_cache
+from .seat_events import broadcaster
+from .seat_state import seat_state_cache
 
-app = FastAPI(title="Movie Ticket Booking API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    broadcaster.start()
+    # Built off the event loop; searches arriving meanwhile wait for it
+    tasks.append(asyncio.create_task(run_in_threadpool(build_search_index)))
+    if settings.LOCK_REAPER_ENABLED:
+        tasks.append(asyncio.create_task(run_lock_reaper(settings.LOCK_REAPER_INTERVAL_SECONDS)))
+    if settings.RECOMMENDER_REFRESH_ENABLED:
+        tasks.append(asyncio.create_task(run_model_refresher(settings.RECOMMENDER_REFRESH_INTERVAL_SECONDS)))
+    if settings.MOVIE_INDEX_SYNC_ENABLED:
+        tasks.append(asyncio.create_task(run_movie_index_sync(settings.MOVIE_INDEX_SYNC_INTERVAL_SECONDS)))
+    yield
+    for task in tasks:
+        task.cancel()
+    if booking_executor is not None:
+        booking_executor.stop()
+    broadcaster.stop()
+
+app = FastAPI(title="Movie Ticket Booking API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,8 +53,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Queries", "X-DB-Time-Ms", "X-DB-Repeated", "X-Cache", "ETag", "Last-Modified", "X-Next-Cursor", "Link"],
 )
 
+if settings.QUERY_STATS_ENABLED:
+    instrument(engine)
+    app.add_middleware(QueryStatsMiddleware)
+
 # Create tables automatically (MVP)
 Base.metadata.create_all(bind=engine)
 
@@ -35,7 +74,20 @@ app.include_router(bookings_router)
 app.include_router(admin_router)
 app.include_router(uploads_router)
 app.include_router(ratings_router)
+if settings.DEBUG_ENDPOINTS_ENABLED:
+    app.include_router(debug_router)
 
 @app.get("/health")
 def health():
     return {"ok": True}
+
+@app.get("/health/caches")
+def cache_metrics():
+    # Hit ratios and memory of the in-process caches
+    return {
+        "responses": response_cache.stats(),
+        "seat_state": seat_state_cache.stats(),
+        "seat_counts": seat_count_cache.stats(),
+        "schedule": schedule_cache.stats(),
+        "search": search_index.stats(),
+    }
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from sqlalchemy import (
     Column, Integer, String, Text, Date, DateTime, ForeignKey, Enum, Numeric,
-    UniqueConstraint, func
+    UniqueConstraint, Index, func
 )
 from sqlalchemy.orm import relationship, Mapped
 from .db import Base
@@ -42,6 +42,22 @@ class Movie(Base):
     showtimes = relationship("Showtime", back_populates="movie")
     ratings = relationship("Rating", back_populates="movie")
 
+    __table_args__ = (
+        # Keyset pages (id desc) within a language / release-date filter
+        Index("ix_movies_language_id", "language", "id"),
+        Index("ix_movies_release_date_id", "release_date", "id"),
+    )
+
+class MovieGenre(Base):
+    # One row per genre in Movie.genre ("Action/Tech" -> action, tech), maintained by crud
+    __tablename__ = "movie_genres"
+    movie_id = Column(Integer, ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True)
+    genre = Column(String(100), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_movie_genres_genre_movie", "genre", "movie_id"),
+    )
+
 class Theater(Base):
     __tablename__ = "theaters"
     id = Column(Integer, primary_key=True)
@@ -85,11 +101,20 @@ class Showtime(Base):
     start_time = Column(DateTime, nullable=False)
     end_time = Column(DateTime, nullable=False)
     price = Column(Numeric(10, 2), nullable=False, default=10.00)
+    # Bumped whenever any seat of this showtime changes status
+    seat_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     movie = relationship("Movie", back_populates="showtimes")
     screen = relationship("Screen", back_populates="showtimes")
     booking = relationship("Booking", back_populates="showtime")
 
+    __table_args__ = (
+        # A movie's showtimes by date, and the "showing in the next N days" filter
+        Index("ix_showtimes_movie_start", "movie_id", "start_time"),
+        # Schedules by theater/city and date
+        Index("ix_showtimes_screen_start", "screen_id", "start_time"),
+    )
+
 class Booking(Base):
     __tablename__ = "bookings"
     id = Column(Integer, primary_key=True)
@@ -103,6 +128,11 @@ class Booking(Base):
     showtime = relationship("Showtime", back_populates="booking")
     seats = relationship("BookingSeat", back_populates="booking", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # A user's booking history, newest first, paged by id
+        Index("ix_bookings_user_id", "user_id", "id"),
+    )
+
 class BookingSeat(Base):
     __tablename__ = "booking_seats"
     booking_id = Column(Integer, ForeignKey("bookings.id"), primary_key=True)
@@ -111,6 +141,35 @@ class BookingSeat(Base):
     booking = relationship("Booking", back_populates="seats")
     seat = relationship("Seat")
 
+class BookingSummary(Base):
+    # What a booking history row shows, copied from the booking, showtime,
+    # movie, screen, theater and seats when the booking is made (a ticket
+    # keeps the title it was sold under)
+    __tablename__ = "booking_summaries"
+    booking_id = Column(Integer, ForeignKey("bookings.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False)
+    created_at = Column(DateTime, nullable=True)
+    total_amount = Column(Numeric(10, 2), nullable=False)
+    showtime_id = Column(Integer, nullable=False)
+    start_time = Column(DateTime, nullable=False)
+    price = Column(Numeric(10, 2), nullable=False)
+    movie_id = Column(Integer, nullable=False)
+    movie_title = Column(String(255), nullable=False)
+    poster_url = Column(String(500), nullable=True)
+    genre = Column(String(100), nullable=True)
+    language = Column(String(100), nullable=True)
+    duration_mins = Column(Integer, nullable=False)
+    screen_name = Column(String(100), nullable=False)
+    theater_name = Column(String(255), nullable=True)
+    theater_city = Column(String(100), nullable=True)
+    seat_labels = Column(String(1000), nullable=False)  # "A1,A2" in seat order
+    seat_count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_booking_summaries_user_booking", "user_id", "booking_id"),
+    )
+
 class ShowtimeSeat(Base):
     __tablename__ = "showtime_seats"
     showtime_id = Column(Integer, ForeignKey("showtimes.id"), primary_key=True)
@@ -118,9 +177,18 @@ class ShowtimeSeat(Base):
     status = Column(Enum(ShowtimeSeatStatus), nullable=False, default=ShowtimeSeatStatus.AVAILABLE)
     locked_until = Column(DateTime, nullable=True)
     booking_id = Column(Integer, ForeignKey("bookings.id"), nullable=True)
+    # Showtime.seat_version at this seat's last status change
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     seat = relationship("Seat")
 
+    __table_args__ = (
+        # Backs the conditional expiry UPDATE for a single showtime
+        Index("ix_showtime_seats_status_lock", "showtime_id", "status", "locked_until"),
+        # Lets the background reaper find expired holds across all showtimes
+        Index("ix_showtime_seats_lock_expiry", "status", "locked_until"),
+    )
+
 class Rating(Base):
     __tablename__ = "ratings"
     id = Column(Integer, primary_key=True)
@@ -135,3 +203,31 @@ class Rating(Base):
     __table_args__ = (
         UniqueConstraint("user_id", "movie_id", name="uq_user_movie_rating"),
     )
+
+class MovieRatingStats(Base):
+    # Running aggregate of ratings per movie, maintained by every rating write
+    __tablename__ = "movie_rating_stats"
+    movie_id = Column(Integer, ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    count_1 = Column(Integer, nullable=False, default=0)
+    count_2 = Column(Integer, nullable=False, default=0)
+    count_3 = Column(Integer, nullable=False, default=0)
+    count_4 = Column(Integer, nullable=False, default=0)
+    count_5 = Column(Integer, nullable=False, default=0)
+
+class RatingChangeCounter(Base):
+    # Single row (id 1) counting every rating written, changed or deleted by
+    # any worker or the import CLI; the recommender compares it with the
+    # value its model was trained at
+    __tablename__ = "rating_change_counter"
+    id = Column(Integer, primary_key=True)
+    changes = Column(Integer, nullable=False, default=0)
+
+class MovieChangeCounter(Base):
+    # Single row (id 1) counting every movie created, edited or deleted by any
+    # worker; each worker's in-memory movie indexes rebuild when it moves
+    # past the value they were built at
+    __tablename__ = "movie_change_counter"
+    id = Column(Integer, primary_key=True)
+    changes = Column(Integer, nullable=False, default=0)
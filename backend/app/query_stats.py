@@ -0,0 +1,203 @@
+"""Per-request SQL instrumentation.
+
+Engine events time every statement and attribute it to the request that
+issued it (a context variable set by ``QueryStatsMiddleware``; Starlette
+copies the context into the threadpool that runs sync endpoints). Each
+response carries::
+
+    X-DB-Queries: 7
+    X-DB-Time-Ms: 3.2
+    X-DB-Repeated: 4      statements whose fingerprint was already seen
+
+and per-route totals plus the most repeated fingerprints are kept for
+``GET /debug/query-stats``. Statements run on the booking executor's
+threads belong to no request and are not attributed.
+
+Off by default (``QUERY_STATS_ENABLED``). Tests call ``instrument`` on
+the engine themselves, and ``query_budget`` turns an N+1 regression into a
+failure (see ``tests/test_query_budgets.py``)::
+
+    with query_budget(max_queries=3, max_repeats=0):
+        client.get("/ratings/me")
+"""
+from __future__ import annotations
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+TOP_FINGERPRINTS = 10
+_FINGERPRINT_LENGTH = 240
+
+_WHITESPACE = re.compile(r"\s+")
+# Expanded IN lists and multi-row VALUES differ only in placeholder count
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def fingerprint(statement: str) -> str:
+    text = _WHITESPACE.sub(" ", statement).strip()
+    text = _PLACEHOLDER_LIST.sub("(?, ...)", text)
+    text = _LITERAL.sub("?", text)
+    return text[:_FINGERPRINT_LENGTH]
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints: Counter[str] = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.fingerprints[fingerprint(statement)] += 1
+
+    @property
+    def repeated(self) -> int:
+        return sum(n - 1 for n in self.fingerprints.values() if n > 1)
+
+    def top_repeated(self, limit: int = TOP_FINGERPRINTS) -> list[dict]:
+        return [
+            {"fingerprint": fp, "count": n}
+            for fp, n in self.fingerprints.most_common(limit) if n > 1
+        ]
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+# Active query_budget blocks; global because the test client runs the app on another thread
+_budgets: list[QueryStats] = []
+
+
+class RouteStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.seconds = 0.0
+        self.repeated = 0
+        self.fingerprints: Counter[str] = Counter()
+
+    def add(self, stats: QueryStats):
+        self.requests += 1
+        self.queries += stats.count
+        self.max_queries = max(self.max_queries, stats.count)
+        self.seconds += stats.seconds
+        self.repeated += stats.repeated
+        for fp, n in stats.fingerprints.items():
+            if n > 1:
+                self.fingerprints[fp] += n
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "avg_queries": round(self.queries / self.requests, 2),
+            "max_queries": self.max_queries,
+            "avg_db_ms": round(self.seconds * 1000 / self.requests, 3),
+            "repeated_statements": self.repeated,
+            "top_repeated": [
+                {"fingerprint": fp, "count": n} for fp, n in self.fingerprints.most_common(TOP_FINGERPRINTS)
+            ],
+        }
+
+
+class QueryStatsRegistry:
+    def __init__(self):
+        self._routes: dict[str, RouteStats] = {}
+        self._lock = threading.Lock()
+
+    def add(self, route: str, stats: QueryStats):
+        with self._lock:
+            self._routes.setdefault(route, RouteStats()).add(stats)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {route: stats.as_dict() for route, stats in sorted(self._routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+registry = QueryStatsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context: a statement that raises never reaches
+    # after_cursor_execute, and its start time goes away with the context
+    if context is not None:
+        context._query_stats_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_stats_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    for budget in _budgets:
+        budget.record(statement, elapsed)
+
+
+def instrument(engine: Engine):
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers += [
+                    (b"x-db-queries", str(stats.count).encode()),
+                    (b"x-db-time-ms", f"{stats.seconds * 1000:.1f}".encode()),
+                    (b"x-db-repeated", str(stats.repeated).encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                registry.add(f"{scope['method']} {route.path}", stats)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(max_queries: int, max_repeats: int | None = None):
+    stats = QueryStats()
+    _budgets.append(stats)
+    try:
+        yield stats
+    finally:
+        _budgets.remove(stats)
+    problems = []
+    if stats.count > max_queries:
+        problems.append(f"{stats.count} queries (budget {max_queries})")
+    if max_repeats is not None and stats.repeated > max_repeats:
+        problems.append(f"{stats.repeated} repeated statements (budget {max_repeats})")
+    if problems:
+        detail = "\n".join(f"  {r['count']}x {r['fingerprint']}" for r in stats.top_repeated())
+        raise QueryBudgetExceeded("; ".join(problems) + ("\n" + detail if detail else ""))
@@ -0,0 +1,215 @@
+"""Bulk rating import from NDJSON or CSV streams.
+
+Each record is ``(user_id, movie_id, score)``: an NDJSON object with those
+keys, or a CSV row in that order (a header line naming the columns is
+also accepted). Records are validated and written in chunks, each chunk
+one transaction with a multi-row upsert. If a chunk fails to write, the
+import stops there: the chunks before it stay committed, and the report's
+``chunks`` lists every chunk's line range with its outcome (``failed`` says
+why the import stopped). The recommender's shared change counter is bumped
+once at the end, by the number of ratings written. Used by
+``POST /ratings/bulk`` and, from the ``backend`` directory::
+
+    python -m app.rating_import ratings.ndjson
+    python -m app.rating_import kiosk_export.csv --chunk-size 10000
+"""
+from __future__ import annotations
+import argparse
+import csv
+import json
+import logging
+import sys
+import time
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .db import SessionLocal
+from .models import User, Movie
+from . import crud
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 50
+FIELDS = ("user_id", "movie_id", "score")
+
+
+def _whole_number(value, field: str) -> int:
+    # 4 and "4" (and 4.0) are accepted in both formats; 4.7 and "4.7" are not
+    if isinstance(value, bool) or value is None or str(value).strip() == "":
+        raise ValueError(f"missing or invalid {field}")
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        pass
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"missing or invalid {field}")
+    if not number.is_integer():
+        raise ValueError(f"{field} must be a whole number")
+    return int(number)
+
+
+class RatingImport:
+    def __init__(self, db: Session, fmt: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if fmt not in ("ndjson", "csv"):
+            raise ValueError(f"Unsupported format: {fmt}")
+        self.db = db
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.received = 0
+        self.written = 0
+        self.rejected = 0
+        self.errors: list[str] = []
+        self.chunks: list[dict] = []
+        self.failed: str | None = None
+        self._columns: tuple[str, ...] | None = None if fmt == "csv" else FIELDS
+        self._pending: list[tuple[int, dict]] = []
+        self._line_no = 0
+        self._started = time.perf_counter()
+
+    def feed(self, lines):
+        if self.failed:
+            return
+        for line in lines:
+            self._line_no += 1
+            if isinstance(line, bytes):
+                line = line.decode("utf-8", errors="replace")
+            line = line.strip()
+            if not line:
+                continue
+            record = self._parse(line)
+            if record is None:
+                continue
+            self.received += 1
+            self._pending.append((self._line_no, record))
+            if len(self._pending) >= self.chunk_size:
+                self.flush()
+                if self.failed:
+                    return
+
+    def _parse(self, line: str) -> dict | None:
+        try:
+            if self.fmt == "ndjson":
+                raw = json.loads(line)
+                if not isinstance(raw, dict):
+                    raise ValueError("expected a JSON object")
+            else:
+                values = next(csv.reader([line]))
+                if self._columns is None:
+                    self._columns = FIELDS
+                    if not values[0].strip().lstrip("-").isdigit():
+                        # Header line: remember the column order
+                        names = tuple(v.strip().lower() for v in values)
+                        if set(FIELDS) - set(names):
+                            raise ValueError(f"header must name {', '.join(FIELDS)}")
+                        self._columns = names
+                        return None
+                raw = dict(zip(self._columns, values))
+            record = {field: _whole_number(raw.get(field), field) for field in FIELDS}
+            if not 1 <= record["score"] <= 5:
+                raise ValueError("score must be between 1 and 5")
+            return record
+        except (ValueError, TypeError, StopIteration) as e:
+            self.received += 1
+            self._reject(self._line_no, str(e))
+            return None
+
+    def _reject(self, line_no: int, message: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"line {line_no}: {message}")
+
+    def flush(self):
+        if not self._pending or self.failed:
+            return
+        pending, self._pending = self._pending, []
+
+        # Later lines win when a chunk rates the same movie twice
+        latest: dict[tuple[int, int], tuple[int, dict]] = {}
+        for line_no, record in pending:
+            latest[(record["user_id"], record["movie_id"])] = (line_no, record)
+
+        user_ids = {r["user_id"] for _, r in latest.values()}
+        movie_ids = {r["movie_id"] for _, r in latest.values()}
+        known_users = set(self.db.execute(select(User.id).where(User.id.in_(user_ids))).scalars())
+        known_movies = set(self.db.execute(select(Movie.id).where(Movie.id.in_(movie_ids))).scalars())
+
+        rows = []
+        for line_no, record in latest.values():
+            if record["user_id"] not in known_users:
+                self._reject(line_no, f"unknown user_id {record['user_id']}")
+            elif record["movie_id"] not in known_movies:
+                self._reject(line_no, f"unknown movie_id {record['movie_id']}")
+            else:
+                rows.append(record)
+        chunk = {"first_line": pending[0][0], "last_line": pending[-1][0], "written": 0, "error": None}
+        self.chunks.append(chunk)
+        try:
+            written = crud.bulk_upsert_ratings(self.db, rows)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.exception("Rating import chunk failed")
+            chunk["error"] = type(e).__name__
+            self.failed = f"lines {chunk['first_line']}-{chunk['last_line']} could not be written: {chunk['error']}"
+            return
+        chunk["written"] = written
+        self.written += written
+
+    def finish(self) -> dict:
+        self.flush()
+        self._count_changes()
+        seconds = time.perf_counter() - self._started
+        return {
+            "received": self.received,
+            "written": self.written,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "chunks": self.chunks,
+            "failed": self.failed,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.written / seconds, 1) if seconds > 0 else 0.0,
+        }
+
+    def _count_changes(self):
+        # One bump for the whole import, after its last chunk committed
+        if not self.written:
+            return
+        try:
+            crud.bump_rating_changes(self.db, self.written)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            logger.exception("Rating import could not bump the change counter")
+            self.failed = self.failed or "ratings were written but the recommender change counter was not updated"
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Bulk rating import")
+    parser.add_argument("path", help="NDJSON or CSV file, or - for stdin")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="Default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    db = SessionLocal()
+    try:
+        job = RatingImport(db, fmt, args.chunk_size)
+        if args.path == "-":
+            job.feed(sys.stdin)
+        else:
+            with open(args.path, encoding="utf-8") as f:
+                job.feed(f)
+        report = job.finish()
+    finally:
+        db.close()
+    print(json.dumps(report, indent=2))
+    if report["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Precomputed per-user top-N recommendations.
+
+A batch job scores every user against the current model in blocks, masks
+the movies each user has already rated, keeps the best ``TOP_N`` with
+``argpartition`` and writes the result as ``.npy`` arrays::
+
+    <RECOMMENDATION_STORE_DIR>/v<model version>-<timestamp>/
+        user_ids.npy   sorted user ids (int64)
+        movie_ids.npy  users × TOP_N movie ids, best first, -1 padded (int32)
+        scores.npy     users × TOP_N predicted scores (float32)
+    <RECOMMENDATION_STORE_DIR>/CURRENT   name of the live snapshot
+
+API workers memory-map the live snapshot, so a lookup is a binary search
+plus an O(limit) slice and the pages are shared between workers. Build it
+from the ``backend`` directory with::
+
+    python -m app.recommendation_store build
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+import numpy as np
+from sqlalchemy.orm import Session
+from .db import SessionLocal
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+BLOCK_USERS = 1024
+RELOAD_CHECK_SECONDS = 30
+KEEP_SNAPSHOTS = 2
+
+
+def store_dir() -> Path:
+    path = Path(settings.RECOMMENDATION_STORE_DIR)
+    if not path.is_absolute():
+        path = Path(__file__).resolve().parent.parent / path
+    return path
+
+
+def compute_top_n(model, rows, top_n: int):
+    """Top-``top_n`` unrated movies for every user in ``rows``.
+
+    ``rows`` is the (user_id, movie_id, score) array the API reads; ratings
+    of movies the model does not know are ignored, exactly as in
+    ``RecommenderModel.predict``.
+    """
+    model_movie_ids = np.asarray(model.movie_ids, dtype=np.int64)
+    mi = np.searchsorted(model_movie_ids, rows[:, 1])
+    known = (mi < len(model_movie_ids)) & (model_movie_ids[np.minimum(mi, len(model_movie_ids) - 1)] == rows[:, 1])
+    rows, mi = rows[known], mi[known]
+
+    user_ids, ui = np.unique(rows[:, 0], return_inverse=True)
+    order = np.argsort(ui, kind="stable")
+    ui, mi, scores = ui[order], mi[order], rows[order, 2].astype(np.float32)
+    indptr = np.searchsorted(ui, np.arange(len(user_ids) + 1))
+
+    # Fold every user in at once: (centred ratings) · V
+    means = (np.bincount(ui, weights=scores, minlength=len(user_ids)) / np.diff(indptr)).astype(np.float32)
+    centered = scores - means[ui]
+    factors = model.item_factors
+    k = factors.shape[1]
+    user_vectors = np.zeros((len(user_ids), k), dtype=np.float32)
+    for j in range(k):
+        user_vectors[:, j] = np.bincount(ui, weights=centered * factors[mi, j], minlength=len(user_ids))
+
+    n_movies = len(model_movie_ids)
+    top_n = min(top_n, n_movies)
+    out_movies = np.full((len(user_ids), top_n), -1, dtype=np.int32)
+    out_scores = np.zeros((len(user_ids), top_n), dtype=np.float32)
+    for lo in range(0, len(user_ids), BLOCK_USERS):
+        hi = min(lo + BLOCK_USERS, len(user_ids))
+        block = user_vectors[lo:hi] @ factors.T
+        block += means[lo:hi, None]
+        block[ui[indptr[lo]:indptr[hi]] - lo, mi[indptr[lo]:indptr[hi]]] = -np.inf
+
+        if top_n < n_movies:
+            idx = np.argpartition(-block, top_n - 1, axis=1)[:, :top_n]
+        else:
+            idx = np.broadcast_to(np.arange(n_movies), block.shape).copy()
+        vals = np.take_along_axis(block, idx, axis=1)
+        ranked = np.argsort(-vals, axis=1, kind="stable")
+        idx = np.take_along_axis(idx, ranked, axis=1)
+        vals = np.take_along_axis(vals, ranked, axis=1)
+
+        out_movies[lo:hi] = np.where(np.isfinite(vals), model_movie_ids[idx], -1)
+        out_scores[lo:hi] = np.where(np.isfinite(vals), vals, 0)
+    return user_ids.astype(np.int64), out_movies, out_scores
+
+
+def write_snapshot(model, user_ids, movie_ids, scores) -> Path:
+    root = store_dir()
+    root.mkdir(parents=True, exist_ok=True)
+    name = f"v{model.version}-{time.time_ns()}"
+    tmp = root / f".{name}.tmp"
+    tmp.mkdir()
+    np.save(tmp / "user_ids.npy", user_ids)
+    np.save(tmp / "movie_ids.npy", movie_ids)
+    np.save(tmp / "scores.npy", scores)
+    (tmp / "meta.json").write_text(json.dumps({
+        "model_version": model.version,
+        "rating_count": model.rating_count,
+        "users": len(user_ids),
+        "top_n": movie_ids.shape[1],
+        "built_at": time.time(),
+    }))
+    tmp.rename(root / name)
+
+    # Swap the pointer atomically; readers see either the old or the new snapshot
+    pointer_tmp = root / ".CURRENT.tmp"
+    pointer_tmp.write_text(name)
+    os.replace(pointer_tmp, root / "CURRENT")
+
+    snapshots = sorted((p for p in root.iterdir() if p.is_dir() and not p.name.startswith(".")),
+                       key=lambda p: p.stat().st_mtime)
+    for old in snapshots[:-KEEP_SNAPSHOTS]:
+        shutil.rmtree(old, ignore_errors=True)
+    return root / name
+
+
+def build_store(db: Session, model=None) -> Path | None:
+    from .recommender import load_rating_arrays, train_model
+
+    rows = load_rating_arrays(db)
+    if model is None:
+        model = train_model(db, version=1, rows=rows)
+    if model is None:
+        return None
+    user_ids, movie_ids, scores = compute_top_n(model, rows, settings.RECOMMENDATION_STORE_TOP_N)
+    return write_snapshot(model, user_ids, movie_ids, scores)
+
+
+class Snapshot:
+    def __init__(self, path: Path):
+        self.path = path
+        self.user_ids = np.load(path / "user_ids.npy", mmap_mode="r")
+        self.movie_ids = np.load(path / "movie_ids.npy", mmap_mode="r")
+        self.scores = np.load(path / "scores.npy", mmap_mode="r")
+
+    def lookup(self, user_id: int, count: int) -> list[tuple[int, float]] | None:
+        pos = int(np.searchsorted(self.user_ids, user_id))
+        if pos >= len(self.user_ids) or self.user_ids[pos] != user_id:
+            return None
+        movie_ids = self.movie_ids[pos, :count]
+        scores = self.scores[pos, :count]
+        return [(int(mid), float(score)) for mid, score in zip(movie_ids, scores) if mid >= 0]
+
+
+class RecommendationStore:
+    """Tracks the live snapshot, re-reading ``CURRENT`` every few seconds."""
+
+    def __init__(self):
+        self._snapshot: Snapshot | None = None
+        self._name: str | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> Snapshot | None:
+        if not settings.RECOMMENDATION_STORE_ENABLED:
+            return None
+        if time.monotonic() - self._checked_at >= RELOAD_CHECK_SECONDS:
+            with self._lock:
+                if time.monotonic() - self._checked_at >= RELOAD_CHECK_SECONDS:
+                    self._reload()
+        return self._snapshot
+
+    def _reload(self):
+        self._checked_at = time.monotonic()
+        root = store_dir()
+        try:
+            name = (root / "CURRENT").read_text().strip()
+        except FileNotFoundError:
+            self._snapshot, self._name = None, None
+            return
+        if name == self._name:
+            return
+        try:
+            self._snapshot, self._name = Snapshot(root / name), name
+        except (OSError, ValueError):
+            logger.exception("Could not load recommendation snapshot %s", name)
+
+
+recommendation_store = RecommendationStore()
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Precomputed top-N recommendations")
+    parser.add_argument("command", choices=["build"])
+    parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        path = build_store(db)
+    finally:
+        db.close()
+    if path is None:
+        print("build: not enough ratings to train a model; nothing written")
+    else:
+        print(f"build: wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
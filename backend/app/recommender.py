@@ -1,69 +1,236 @@
 from __future__ import annotations
+import asyncio
+import logging
+import threading
+import time
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-from .models import Rating, Movie
+from .db import SessionLocal
+from .models import Rating, Movie, MovieRatingStats
+from .settings import settings
+
+logger = logging.getLogger(__name__)
 
 MIN_RATINGS_FOR_SVD = 5
+LOAD_CHUNK_SIZE = 50_000
 
 
-def get_recommendations(db: Session, user_id: int, limit: int = 10) -> list[dict]:
-    all_ratings = db.execute(select(Rating)).scalars().all()
+class RecommenderModel:
+    """Item factors from one training run.
 
-    if len(all_ratings) < MIN_RATINGS_FOR_SVD:
-        return _popularity_fallback(db, user_id, limit)
+    Only the movie side is kept: a user's row of U·Σ equals their centred
+    rating row projected onto V, so any user (including one who rated after
+    training) is scored by folding in their current ratings at request time.
+    """
 
-    user_ids = sorted({r.user_id for r in all_ratings})
-    movie_ids = sorted({r.movie_id for r in all_ratings})
+    def __init__(self, version: int, movie_ids: list[int], item_factors, rating_count: int, sigma=None):
+        self.version = version
+        self.movie_ids = movie_ids
+        self.movie_idx = {mid: i for i, mid in enumerate(movie_ids)}
+        self.item_factors = item_factors  # movies × k, float32
+        self.sigma = sigma  # singular values, k
+        self.rating_count = rating_count
+        self.trained_at = time.monotonic()
+
+    def predict(self, user_ratings: dict[int, int]):
+        import numpy as np
 
-    if user_id not in user_ids:
-        return _genre_popularity_fallback(db, user_id, limit)
+        known = [(self.movie_idx[mid], score) for mid, score in user_ratings.items() if mid in self.movie_idx]
+        if not known:
+            return None
+        cols = np.fromiter((i for i, _ in known), dtype=np.intp, count=len(known))
+        scores = np.fromiter((score for _, score in known), dtype=float, count=len(known))
+        mean = scores.mean()
+        user_vector = (scores - mean) @ self.item_factors[cols]
+        return self.item_factors @ user_vector + mean
 
-    user_idx = {uid: i for i, uid in enumerate(user_ids)}
-    movie_idx = {mid: i for i, mid in enumerate(movie_ids)}
 
+def load_rating_arrays(db: Session):
+    import numpy as np
+
+    # Streamed in chunks so the ORM never holds every rating as Python objects
+    result = db.execute(
+        select(Rating.user_id, Rating.movie_id, Rating.score).execution_options(yield_per=LOAD_CHUNK_SIZE)
+    )
+    chunks = [np.array(part, dtype=np.int64).reshape(-1, 3) for part in result.partitions()]
+    if not chunks:
+        return np.empty((0, 3), dtype=np.int64)
+    return np.concatenate(chunks)
+
+
+def train_model(db: Session, version: int, rows=None) -> RecommenderModel | None:
     try:
         import numpy as np
+        from .factorization import RatingMatrix, randomized_svd
     except ImportError:
-        return _popularity_fallback(db, user_id, limit)
+        return None
 
-    n_users = len(user_ids)
-    n_movies = len(movie_ids)
-    matrix = np.zeros((n_users, n_movies))
+    if rows is None:
+        rows = load_rating_arrays(db)
+    if len(rows) < MIN_RATINGS_FOR_SVD:
+        return None
 
-    for r in all_ratings:
-        matrix[user_idx[r.user_id], movie_idx[r.movie_id]] = r.score
+    user_ids, ui = np.unique(rows[:, 0], return_inverse=True)
+    movie_ids, mi = np.unique(rows[:, 1], return_inverse=True)
+    k = min(settings.RECOMMENDER_RANK, min(len(user_ids), len(movie_ids)) - 1)
+    if k < 1:
+        return None
 
-    row_means = np.where(
-        (matrix > 0).sum(axis=1, keepdims=True) > 0,
-        matrix.sum(axis=1, keepdims=True) / np.maximum((matrix > 0).sum(axis=1, keepdims=True), 1),
-        0,
-    )
-    centered = matrix.copy()
-    centered[matrix > 0] -= np.broadcast_to(row_means, matrix.shape)[matrix > 0]
+    matrix = RatingMatrix(ui, mi, rows[:, 2], len(user_ids), len(movie_ids)).centered()
+    sigma, item_factors = randomized_svd(matrix, k, n_iter=settings.RECOMMENDER_SVD_ITERATIONS)
+    return RecommenderModel(version, movie_ids.tolist(), item_factors, len(rows), sigma.astype(np.float32))
 
-    k = min(10, min(n_users, n_movies) - 1)
-    if k < 1:
-        return _popularity_fallback(db, user_id, limit)
 
-    U, sigma, Vt = np.linalg.svd(centered, full_matrices=False)
-    U_k = U[:, :k]
-    sigma_k = np.diag(sigma[:k])
-    Vt_k = Vt[:k, :]
+class ModelCache:
+    """Holds the current model and decides when a full retrain is due.
+
+    Rating writes only bump the shared ``rating_change_counter`` row: the
+    writer's own predictions already reflect them through fold-in. Every
+    worker compares the counter with the value its model was trained at, so
+    each one sees all workers' writes. The model is retrained when the share
+    of changed ratings crosses ``RECOMMENDER_DRIFT_THRESHOLD`` or it is older
+    than ``RECOMMENDER_RETRAIN_SECONDS``.
+    """
+
+    def __init__(self):
+        self._model: RecommenderModel | None = None
+        self._trained = False
+        self._version = 0
+        # rating_change_counter when the current model was trained
+        self._trained_at_changes = 0
+        self._lock = threading.Lock()
 
-    predicted = U_k @ sigma_k @ Vt_k + row_means
+    @property
+    def model(self) -> RecommenderModel | None:
+        return self._model
 
-    ui = user_idx[user_id]
-    user_rated_movie_ids = {r.movie_id for r in all_ratings if r.user_id == user_id}
+    def get(self, db: Session) -> RecommenderModel | None:
+        if not self._trained:
+            with self._lock:
+                if not self._trained:
+                    self._train(db)
+        return self._model
 
-    candidates = []
-    for mid, mi in movie_idx.items():
-        if mid not in user_rated_movie_ids:
-            candidates.append((mid, float(predicted[ui, mi])))
+    def needs_retrain(self, total_changes: int) -> bool:
+        # total_changes: the current rating_change_counter
+        with self._lock:
+            if not self._trained:
+                return False  # trained lazily by the first request
+            changes = max(0, total_changes - self._trained_at_changes)
+            model = self._model
+        baseline = model.rating_count if model else 0
+        if changes and changes / max(baseline, MIN_RATINGS_FOR_SVD) >= settings.RECOMMENDER_DRIFT_THRESHOLD:
+            return True
+        if model is None:
+            # Too few ratings last time; try again once some arrive
+            return changes > 0
+        return changes > 0 and time.monotonic() - model.trained_at >= settings.RECOMMENDER_RETRAIN_SECONDS
 
-    candidates.sort(key=lambda x: x[1], reverse=True)
-    top = candidates[:limit]
+    def retrain(self, db: Session) -> RecommenderModel | None:
+        with self._lock:
+            self._train(db)
+        return self._model
 
-    movies_map = {m.id: m for m in db.execute(select(Movie)).scalars().all()}
+    def _train(self, db: Session):
+        # Changes made while training are picked up by the next retrain
+        from .crud import get_rating_changes
+
+        trained_at_changes = get_rating_changes(db)
+        model = train_model(db, self._version + 1)
+        if model is not None:
+            self._version = model.version
+        self._model = model
+        self._trained = True
+        self._trained_at_changes = trained_at_changes
+
+
+model_cache = ModelCache()
+
+
+def refresh_model_if_stale() -> RecommenderModel | None:
+    db = SessionLocal()
+    try:
+        # Ratings written by other workers or processes (e.g. the bulk import
+        # CLI) show up in the shared change counter
+        from .crud import get_rating_changes
+
+        if not model_cache.needs_retrain(get_rating_changes(db)):
+            return None
+        model = model_cache.retrain(db)
+        if model is not None and settings.RECOMMENDATION_STORE_ENABLED:
+            from .recommendation_store import build_store
+            build_store(db, model)
+        return model
+    finally:
+        db.close()
+
+
+async def run_model_refresher(interval_seconds: float):
+    while True:
+        try:
+            model = await run_in_threadpool(refresh_model_if_stale)
+            if model is not None:
+                logger.info("Retrained recommender model v%d on %d ratings", model.version, model.rating_count)
+        except Exception:
+            logger.exception("Recommender refresh failed")
+        await asyncio.sleep(interval_seconds)
+
+
+def get_recommendations(db: Session, user_id: int, limit: int = 10) -> list[dict]:
+    user_ratings = dict(db.execute(
+        select(Rating.movie_id, Rating.score).where(Rating.user_id == user_id)
+    ).all())
+
+    # Over-fetch a little: movies rated or deleted since the top-N was computed are skipped
+    top = _top_from_store(user_id, user_ratings, limit * 2)
+    if top is not None:
+        results = _with_movies(db, top, limit)
+        if len(results) == limit:
+            return results
+
+    model = model_cache.get(db)
+    if model is None:
+        return _genre_popularity_fallback(db, user_ratings, limit)
+    top = _top_from_model(model, user_ratings, limit * 2)
+    if top is None:
+        return _genre_popularity_fallback(db, user_ratings, limit)
+    return _with_movies(db, top, limit)
+
+
+def _top_from_store(user_id: int, user_ratings: dict[int, int], count: int) -> list[tuple[int, float]] | None:
+    from .recommendation_store import recommendation_store
+
+    snapshot = recommendation_store.current()
+    if snapshot is None:
+        return None
+    top = snapshot.lookup(user_id, count + len(user_ratings))
+    if top is None:
+        return None
+    return [(mid, score) for mid, score in top if mid not in user_ratings][:count]
+
+
+def _top_from_model(model: RecommenderModel, user_ratings: dict[int, int], count: int) -> list[tuple[int, float]] | None:
+    import numpy as np
+
+    predicted = model.predict(user_ratings)
+    if predicted is None:
+        return None
+    order = np.argsort(-predicted, kind="stable")
+    top = []
+    for mi in order:
+        mid = model.movie_ids[mi]
+        if mid not in user_ratings:
+            top.append((mid, float(predicted[mi])))
+            if len(top) >= count:
+                break
+    return top
+
+
+def _with_movies(db: Session, top: list[tuple[int, float]], limit: int) -> list[dict]:
+    movies_map = {
+        m.id: m for m in db.execute(select(Movie).where(Movie.id.in_([mid for mid, _ in top]))).scalars().all()
+    }
     results = []
     for mid, score in top:
         movie = movies_map.get(mid)
@@ -73,36 +240,32 @@ def get_recommendations(db: Session, user_id: int, limit: int = 10) -> list[dict
             "movie": movie,
             "predicted_score": round(max(1.0, min(5.0, score)), 2),
         })
+        if len(results) >= limit:
+            break
     return results
 
 
-def _popularity_fallback(db: Session, user_id: int, limit: int) -> list[dict]:
-    from sqlalchemy import func as sqlfunc
-
-    user_rated = set(db.execute(
-        select(Rating.movie_id).where(Rating.user_id == user_id)
-    ).scalars().all())
+def _popularity_fallback(db: Session, user_ratings: dict[int, int], limit: int, exclude: set[int] | None = None) -> list[dict]:
+    skip = set(user_ratings) | (exclude or set())
 
+    # Read from the maintained aggregates instead of grouping the ratings table
+    avg = (MovieRatingStats.rating_sum * 1.0 / MovieRatingStats.rating_count).label("avg")
     rows = db.execute(
-        select(Rating.movie_id, sqlfunc.avg(Rating.score).label("avg"), sqlfunc.count().label("cnt"))
-        .group_by(Rating.movie_id)
-        .order_by(sqlfunc.avg(Rating.score).desc(), sqlfunc.count().desc())
+        select(MovieRatingStats.movie_id, avg)
+        .where(MovieRatingStats.rating_count > 0)
+        .order_by(avg.desc(), MovieRatingStats.rating_count.desc())
+        .limit(limit + len(skip))
     ).all()
-
-    movies_map = {m.id: m for m in db.execute(select(Movie)).scalars().all()}
-    results = []
-    for row in rows:
-        if row.movie_id in user_rated:
-            continue
-        movie = movies_map.get(row.movie_id)
-        if movie:
-            results.append({"movie": movie, "predicted_score": round(float(row.avg), 2)})
-        if len(results) >= limit:
-            break
+    top = [(row.movie_id, float(row.avg)) for row in rows if row.movie_id not in skip]
+    results = _with_movies(db, top, limit)
 
     if len(results) < limit:
-        for movie in db.execute(select(Movie).order_by(Movie.id.desc())).scalars().all():
-            if movie.id not in user_rated and not any(r["movie"].id == movie.id for r in results):
+        seen = skip | {r["movie"].id for r in results}
+        newest = db.execute(
+            select(Movie).order_by(Movie.id.desc()).limit(limit - len(results) + len(seen))
+        ).scalars().all()
+        for movie in newest:
+            if movie.id not in seen:
                 results.append({"movie": movie, "predicted_score": 3.0})
             if len(results) >= limit:
                 break
@@ -110,5 +273,29 @@ def _popularity_fallback(db: Session, user_id: int, limit: int) -> list[dict]:
     return results
 
 
-def _genre_popularity_fallback(db: Session, user_id: int, limit: int) -> list[dict]:
-    return _popularity_fallback(db, user_id, limit)
+def _genre_popularity_fallback(db: Session, user_ratings: dict[int, int], limit: int) -> list[dict]:
+    from .similarity_index import similarity_index
+
+    # Cold start: neighbours of the movies the user liked, weighted by similarity
+    results = []
+    if user_ratings:
+        index = similarity_index.ensure(db)
+        mean = sum(user_ratings.values()) / len(user_ratings)
+        weight: dict[int, float] = {}
+        weighted_score: dict[int, float] = {}
+        for movie_id, score in user_ratings.items():
+            if score < mean and len(user_ratings) > 1:
+                continue
+            for neighbor_id, similarity in index.neighbors(movie_id):
+                if neighbor_id in user_ratings:
+                    continue
+                weight[neighbor_id] = weight.get(neighbor_id, 0.0) + similarity
+                weighted_score[neighbor_id] = weighted_score.get(neighbor_id, 0.0) + similarity * score
+        ranked = sorted(weight, key=weight.get, reverse=True)[:limit * 2]
+        results = _with_movies(db, [(mid, weighted_score[mid] / weight[mid]) for mid in ranked], limit)
+
+    if len(results) < limit:
+        results += _popularity_fallback(
+            db, user_ratings, limit - len(results), exclude={r["movie"].id for r in results}
+        )
+    return results
@@ -0,0 +1,247 @@
+"""Response cache for the read-heavy catalogue endpoints.
+
+``GET /movies``, ``/movies/{id}``, ``/movies/{id}/showtimes`` and
+``/showtimes/screens`` keep their encoded JSON bodies here. Every entry
+belongs to a tag (``movies``, ``showtimes``, ``screens``) and its key embeds
+the tag's current generation; after committing a write, crud bumps the
+generation, so entries built before the write are never served again.
+``RESPONSE_CACHE_TTL_SECONDS`` bounds staleness for writes that bypass crud.
+
+Backends:
+
+* ``memory`` (default): per-process LRU bounded by entries and bytes. Each
+  uvicorn worker has its own generations, so another worker's write is
+  seen only once the TTL expires.
+* ``redis``: entries and generations shared by all workers (needs the
+  ``redis`` package and ``REDIS_URL``).
+* ``none``: every request is built from the database (ETags still apply).
+
+Entries carry a content-hash ETag and a Last-Modified time; conditional
+requests get a 304 without touching the database.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from .encoding import encoded_json_response
+from .settings import settings
+
+TAGS = ("movies", "showtimes", "screens")
+# Per-entry bookkeeping on top of the body, for the memory budget
+ENTRY_OVERHEAD_BYTES = 200
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    last_modified: int  # epoch seconds
+    headers: dict[str, str] = field(default_factory=dict)  # e.g. pagination links
+
+    @classmethod
+    def build(cls, payload, headers: dict[str, str] | None = None) -> "CachedResponse":
+        body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+        return cls(body, f'"{hashlib.sha1(body).hexdigest()[:20]}"', int(time.time()), headers or {})
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.etag) + ENTRY_OVERHEAD_BYTES + sum(map(len, self.headers.values()))
+
+
+class InMemoryResponseCacheBackend:
+    name = "memory"
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[float, CachedResponse]] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def generation(self, tag: str) -> int:
+        return self._generations.get(tag, 0)
+
+    def bump(self, tag: str):
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            # Unreachable now; free the memory instead of waiting for LRU
+            # (a stray match in a query string only costs a rebuild)
+            prefix, inner = f"{tag}:", f":{tag}:"
+            for key in [k for k in self._entries if k.startswith(prefix) or inner in k]:
+                self._drop(key)
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, entry: CachedResponse, ttl: float):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, entry)
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def _drop(self, key: str):
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self._bytes -= item[1].size
+
+
+class RedisResponseCacheBackend:
+    name = "redis"
+    PREFIX = "response-cache:"
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+
+    def generation(self, tag: str) -> int:
+        return int(self._client.get(f"{self.PREFIX}gen:{tag}") or 0)
+
+    def bump(self, tag: str):
+        # Old entries are left to expire through their TTL
+        self._client.incr(f"{self.PREFIX}gen:{tag}")
+
+    def get(self, key: str) -> CachedResponse | None:
+        raw = self._client.hgetall(f"{self.PREFIX}{key}")
+        if not raw:
+            return None
+        return CachedResponse(
+            raw[b"body"], raw[b"etag"].decode(), int(raw[b"last_modified"]), json.loads(raw[b"headers"])
+        )
+
+    def set(self, key: str, entry: CachedResponse, ttl: float):
+        name = f"{self.PREFIX}{key}"
+        pipe = self._client.pipeline()
+        pipe.hset(name, mapping={
+            "body": entry.body,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "headers": json.dumps(entry.headers),
+        })
+        pipe.expire(name, max(int(ttl), 1))
+        pipe.execute()
+
+    def stats(self) -> dict:
+        info = self._client.info("memory")
+        return {"redis_used_memory_bytes": info.get("used_memory")}
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl_seconds: float):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def get_or_build(self, tag: str | tuple[str, ...], key: str, build, headers_for=None) -> tuple[CachedResponse, bool]:
+        # build() returns the response payload; exceptions (e.g. a 404) are not
+        # cached. headers_for(payload) adds headers stored with the entry.
+        if self.backend is None:
+            return self._build(build, headers_for), False
+        # A write that commits while this builds bumps the generation, so a
+        # stale body is stored under a key nobody reads any more. An entry
+        # that depends on several tags embeds all their generations.
+        tags = (tag,) if isinstance(tag, str) else tag
+        full_key = "".join(f"{t}:{self.backend.generation(t)}:" for t in tags) + key
+        entry = self.backend.get(full_key)
+        if entry is not None:
+            self.hits += 1
+            return entry, True
+        self.misses += 1
+        entry = self._build(build, headers_for)
+        self.backend.set(full_key, entry, self.ttl_seconds)
+        return entry, False
+
+    @staticmethod
+    def _build(build, headers_for) -> CachedResponse:
+        payload = build()
+        return CachedResponse.build(payload, headers_for(payload) if headers_for else None)
+
+    def serve(self, request: Request, tag: str | tuple[str, ...], key: str, build, headers_for=None) -> Response:
+        entry, hit = self.get_or_build(tag, key, build, headers_for)
+        headers = {
+            **entry.headers,
+            "ETag": entry.etag,
+            "Last-Modified": formatdate(entry.last_modified, usegmt=True),
+            "Cache-Control": "no-cache",
+            "X-Cache": "HIT" if hit else "MISS",
+        }
+        if _not_modified(request, entry):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return encoded_json_response(request, entry.body, headers)
+
+    def invalidate(self, *tags: str):
+        if self.backend is None:
+            return
+        for tag in tags or TAGS:
+            self.backend.bump(tag)
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name if self.backend is not None else "none",
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+            **(self.backend.stats() if self.backend is not None else {}),
+        }
+
+
+def _not_modified(request: Request, entry: CachedResponse) -> bool:
+    # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2). The date
+    # has one-second resolution, so only the ETag is exact for a write that
+    # lands in the same second as the cached build
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return "*" in tags or entry.etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return entry.last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _make_backend():
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        return RedisResponseCacheBackend(settings.REDIS_URL)
+    if settings.RESPONSE_CACHE_BACKEND == "none":
+        return None
+    return InMemoryResponseCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_MAX_BYTES)
+
+
+response_cache = ResponseCache(_make_backend(), settings.RESPONSE_CACHE_TTL_SECONDS)
@@ -1,10 +1,14 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from ..db import get_db
 from ..models import Movie, Theater, Screen, Seat, Showtime
-from ..crud import ensure_demo_user
+from ..crud import bump_movie_changes, ensure_demo_user, materialize_showtime_seats, sync_movie_genres
+from ..response_cache import response_cache
+from ..schedule import schedule_cache
+from ..search_index import search_index
+from ..utils import utcnow
 import string
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -52,12 +56,16 @@ def seed(db: Session = Depends(get_db)):
     )
     db.add_all([movie1, movie2])
     db.flush()
+    for movie in (movie1, movie2):
+        sync_movie_genres(db, movie.id, movie.genre)
+    bump_movie_changes(db, 2)
 
-    now = datetime.now()
+    now = utcnow()
     showtimes = []
     for i, movie in enumerate([movie1, movie2], start=0):
         for j in range(3):
-            start = (now + timedelta(hours=2 + j*3)).replace(minute=0, second=0, microsecond=0)
+            # One screen: the two movies take turns, 3 hours apart
+            start = (now + timedelta(hours=2 + (i*3 + j)*3)).replace(minute=0, second=0, microsecond=0)
             end = start + timedelta(minutes=movie.duration_mins)
             st = Showtime(
                 movie_id=movie.id,
@@ -69,5 +77,11 @@ def seed(db: Session = Depends(get_db)):
             showtimes.append(st)
 
     db.add_all(showtimes)
+    db.flush()
+    materialize_showtime_seats(db, [st.id for st in showtimes])
     db.commit()
+    response_cache.invalidate()
+    schedule_cache.clear()
+    for movie in (movie1, movie2):
+        search_index.upsert_movie(movie.id, movie.title, movie.description, movie.genre, movie.language)
     return {"ok": True, "message": "Seeded demo data"}
@@ -1,21 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException
+import base64
+import binascii
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from ..db import get_db
 from .. import crud
-from ..schemas import CreateBookingIn, BookingOut
+from ..booking_executor import SeatWriteUnavailable, run_seat_write
+from ..schemas import CreateBookingIn, BookingOut, BookingSummaryOut
 
 router = APIRouter(prefix="/bookings", tags=["bookings"])
 
 DEMO_USER_ID = 1
+SUMMARY_PAGE_SIZE = 20
+
+def _encode_cursor(booking_id: int) -> str:
+    return base64.urlsafe_b64encode(f"b{booking_id}".encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        if not raw.startswith("b"):
+            raise ValueError(cursor)
+        return int(raw[1:])
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _set_page_headers(request: Request, response: Response, ids: list[int], limit: int | None):
+    if limit is None or len(ids) < limit:
+        return
+    next_cursor = _encode_cursor(ids[-1])
+    next_url = request.url.include_query_params(cursor=next_cursor)
+    response.headers["X-Next-Cursor"] = next_cursor
+    response.headers["Link"] = f'<{next_url.path}?{next_url.query}>; rel="next"'
 
 @router.post("", response_model=BookingOut)
 def create_booking(body: CreateBookingIn, db: Session = Depends(get_db)):
+    def write(s: Session) -> int:
+        # The demo user is created in the same transaction as the booking
+        crud.ensure_demo_user(s)
+        return crud.create_booking(s, DEMO_USER_ID, body.showtime_id, body.seat_ids).id
+
     try:
-        crud.ensure_demo_user(db)
-        booking = crud.create_booking(db, DEMO_USER_ID, body.showtime_id, body.seat_ids)
-        db.commit()
+        booking_id = run_seat_write(db, body.showtime_id, write)
         # reload with relationships for response
-        booking_full = crud.get_booking(db, booking.id, DEMO_USER_ID)
+        booking_full = crud.get_booking(db, booking_id, DEMO_USER_ID)
         return _to_booking_out(booking_full)
     except ValueError as e:
         db.rollback()
@@ -23,13 +51,43 @@ def create_booking(body: CreateBookingIn, db: Session = Depends(get_db)):
     except RuntimeError as e:
         db.rollback()
         raise HTTPException(status_code=409, detail=str(e))
+    except SeatWriteUnavailable as e:
+        db.rollback()
+        raise HTTPException(status_code=503, detail=str(e))
 
 @router.get("/me", response_model=list[BookingOut])
-def my_bookings(db: Session = Depends(get_db)):
+def my_bookings(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(default=None, ge=1, le=200, description="Page size; omit (and cursor) for the full list"),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor of the previous page"),
+    db: Session = Depends(get_db),
+):
+    # Newest first. Without limit/cursor every booking is returned, as before;
+    # paged responses carry the next page's cursor in X-Next-Cursor and a Link header.
+    before_id = _decode_cursor(cursor) if cursor else None
+    if before_id is not None and limit is None:
+        limit = SUMMARY_PAGE_SIZE
     crud.ensure_demo_user(db)
-    bookings = crud.list_bookings_for_user(db, DEMO_USER_ID)
+    bookings = crud.list_bookings_for_user(db, DEMO_USER_ID, before_id=before_id, limit=limit)
+    _set_page_headers(request, response, [b.id for b in bookings], limit)
     return [_to_booking_out(b) for b in bookings]
 
+@router.get("/me/summary", response_model=list[BookingSummaryOut])
+def my_booking_summaries(
+    request: Request,
+    response: Response,
+    limit: int = Query(default=SUMMARY_PAGE_SIZE, ge=1, le=200),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor of the previous page"),
+    db: Session = Depends(get_db),
+):
+    # Booking history from booking_summaries: one indexed query per page
+    before_id = _decode_cursor(cursor) if cursor else None
+    crud.ensure_demo_user(db)
+    summaries = crud.list_booking_summaries(db, DEMO_USER_ID, before_id=before_id, limit=limit)
+    _set_page_headers(request, response, [s.booking_id for s in summaries], limit)
+    return [_to_summary_out(s) for s in summaries]
+
 @router.get("/{booking_id}", response_model=BookingOut)
 def get_booking(booking_id: int, db: Session = Depends(get_db)):
     crud.ensure_demo_user(db)
@@ -38,6 +96,27 @@ def get_booking(booking_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Booking not found")
     return _to_booking_out(booking)
 
+def _to_summary_out(s):
+    return {
+        "id": s.booking_id,
+        "status": s.status,
+        "created_at": s.created_at,
+        "total_amount": s.total_amount,
+        "showtime_id": s.showtime_id,
+        "start_time": s.start_time,
+        "price": s.price,
+        "movie_id": s.movie_id,
+        "movie_title": s.movie_title,
+        "poster_url": s.poster_url,
+        "genre": s.genre,
+        "language": s.language,
+        "duration_mins": s.duration_mins,
+        "screen_name": s.screen_name,
+        "theater_name": s.theater_name,
+        "theater_city": s.theater_city,
+        "seats": s.seat_labels.split(",") if s.seat_labels else [],
+    }
+
 def _to_booking_out(b):
     movie = b.showtime.movie
     return {
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from ..query_stats import registry
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+@router.get("/query-stats")
+def query_stats():
+    # Per route: average/max statements, DB time and the most repeated fingerprints
+    return registry.snapshot()
+
+@router.post("/query-stats/reset")
+def reset_query_stats():
+    registry.reset()
+    return {"ok": True}
@@ -1,9 +1,15 @@
-from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, Query, HTTPException
+import base64
+import binascii
+from datetime import date, datetime, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
 from sqlalchemy.orm import Session
 from ..db import get_db
 from .. import crud
-from ..schemas import MovieIn, MovieOut, ShowtimeOut
+from ..schemas import MovieIn, MovieOut, MovieSearchOut, ShowtimeOut, SimilarMovieOut
+from ..search_index import search_index
+from ..similarity_index import similarity_index, TOP_K
+from ..response_cache import response_cache
 
 router = APIRouter(prefix="/movies", tags=["movies"])
 
@@ -11,16 +17,85 @@ router = APIRouter(prefix="/movies", tags=["movies"])
 def create_movie(payload: MovieIn, db: Session = Depends(get_db)):
     return crud.create_movie(db, **payload.model_dump())
 
+DEFAULT_PAGE_SIZE = 50
+
+def _encode_cursor(movie_id: int) -> str:
+    return base64.urlsafe_b64encode(f"m{movie_id}".encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        if not raw.startswith("m"):
+            raise ValueError(cursor)
+        return int(raw[1:])
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("", response_model=list[MovieOut])
-def get_movies(db: Session = Depends(get_db)):
-    return crud.list_movies(db)
+def get_movies(
+    request: Request,
+    genre: Optional[str] = Query(default=None, max_length=100, description="One genre, e.g. action (matches Action/Tech)"),
+    language: Optional[str] = Query(default=None, max_length=100),
+    released_from: Optional[date] = None,
+    released_to: Optional[date] = None,
+    showing_within_days: Optional[int] = Query(default=None, ge=1, le=90, description="Only movies with a showtime in the next N days"),
+    limit: Optional[int] = Query(default=None, ge=1, le=200, description="Page size; omit (and cursor) for the full list"),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor of the previous page"),
+    db: Session = Depends(get_db),
+):
+    # Without limit/cursor the whole (filtered) list is returned, as before.
+    # Paged responses carry the next page's cursor in X-Next-Cursor and a Link header.
+    before_id = _decode_cursor(cursor) if cursor else None
+    if before_id is not None and limit is None:
+        limit = DEFAULT_PAGE_SIZE
+
+    def build():
+        movies = crud.list_movies(
+            db, genre=genre, language=language, released_from=released_from, released_to=released_to,
+            showing_within_days=showing_within_days, before_id=before_id, limit=limit,
+        )
+        return [MovieOut.model_validate(m, from_attributes=True) for m in movies]
+
+    def page_headers(items):
+        if limit is None or len(items) < limit:
+            return {}
+        next_cursor = _encode_cursor(items[-1].id)
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        return {"X-Next-Cursor": next_cursor, "Link": f'<{next_url.path}?{next_url.query}>; rel="next"'}
+
+    # The showtime filter also goes stale when showtimes are added
+    tags = ("movies", "showtimes") if showing_within_days is not None else "movies"
+    return response_cache.serve(request, tags, f"list:{request.url.query}", build, page_headers)
+
+@router.get("/search", response_model=list[MovieSearchOut])
+def search_movies(
+    q: str = Query(..., min_length=1, max_length=200, description="Words; the last one is a prefix unless q ends in a space"),
+    limit: int = Query(default=10, ge=1, le=50),
+    db: Session = Depends(get_db),
+):
+    index = search_index.ensure(db)
+    hits = index.search(q, limit)
+    movies = crud.get_movies_by_ids(db, [mid for mid, _ in hits])
+    missing = sum(mid not in movies for mid, _ in hits)
+    if missing and len(hits) == limit:
+        # Deleted by another worker since this index last synced: fill the
+        # page from further down the ranking
+        hits = index.search(q, limit + missing)
+        movies.update(crud.get_movies_by_ids(db, [mid for mid, _ in hits if mid not in movies]))
+    return [
+        {"movie": movies[mid], "score": round(score, 4)}
+        for mid, score in hits
+        if mid in movies
+    ][:limit]
 
 @router.get("/{movie_id}", response_model=MovieOut)
-def get_movie(movie_id: int, db: Session = Depends(get_db)):
-    movie = crud.get_movie(db, movie_id)
-    if not movie:
-        raise HTTPException(status_code=404, detail="Movie not found")
-    return movie
+def get_movie(movie_id: int, request: Request, db: Session = Depends(get_db)):
+    def build():
+        movie = crud.get_movie(db, movie_id)
+        if not movie:
+            raise HTTPException(status_code=404, detail="Movie not found")
+        return MovieOut.model_validate(movie, from_attributes=True)
+    return response_cache.serve(request, "movies", f"id:{movie_id}", build)
 
 @router.put("/{movie_id}", response_model=MovieOut)
 def update_movie(movie_id: int, payload: MovieIn, db: Session = Depends(get_db)):
@@ -35,10 +110,27 @@ def delete_movie(movie_id: int, db: Session = Depends(get_db)):
     if not deleted:
         raise HTTPException(status_code=404, detail="Movie not found")
 
+@router.get("/{movie_id}/similar", response_model=list[SimilarMovieOut])
+def get_similar_movies(
+    movie_id: int,
+    limit: int = Query(default=10, ge=1, le=TOP_K),
+    db: Session = Depends(get_db),
+):
+    if not crud.get_movie(db, movie_id):
+        raise HTTPException(status_code=404, detail="Movie not found")
+    neighbors = similarity_index.ensure(db).neighbors(movie_id, limit)
+    movies = crud.get_movies_by_ids(db, [mid for mid, _ in neighbors])
+    return [
+        {"movie": movies[mid], "similarity": round(similarity, 4)}
+        for mid, similarity in neighbors
+        if mid in movies
+    ]
+
 @router.get("/{movie_id}/showtimes", response_model=list[ShowtimeOut])
 def get_showtimes_for_movie(
     movie_id: int,
-    date: str = Query(..., description="YYYY-MM-DD"),
+    request: Request,
+    date: str = Query(..., description="YYYY-MM-DD, a UTC day"),
     db: Session = Depends(get_db),
 ):
     try:
@@ -47,4 +139,10 @@ def get_showtimes_for_movie(
         raise HTTPException(status_code=400, detail="Invalid date format (expected YYYY-MM-DD)")
     day_start = day
     day_end = day + timedelta(days=1)
-    return crud.list_showtimes_for_movie(db, movie_id, day_start, day_end)
+    return response_cache.serve(
+        request, "showtimes", f"movie:{movie_id}:{day.date()}",
+        lambda: [
+            ShowtimeOut.model_validate(s, from_attributes=True)
+            for s in crud.list_showtimes_for_movie(db, movie_id, day_start, day_end)
+        ],
+    )
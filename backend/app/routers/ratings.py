@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func as sqlfunc
-from ..db import get_db
+from ..db import get_db, SessionLocal
 from .. import crud
-from ..models import Rating, Movie
-from ..schemas import RatingIn, RatingOut, RatingWithMovieOut, MovieStatsOut, RecommendationOut
+from ..rating_import import RatingImport
+from ..schemas import (
+    RatingIn, RatingOut, RatingWithMovieOut, MovieStatsOut, RecommendationOut, BulkRatingImportOut,
+)
 
 router = APIRouter(prefix="/ratings", tags=["ratings"])
 
@@ -21,22 +24,59 @@ def rate_movie(body: RatingIn, db: Session = Depends(get_db)):
     return rating
 
 
+_IMPORT_CONTENT_TYPES = {
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+
+@router.post("/bulk", response_model=BulkRatingImportOut)
+async def bulk_import_ratings(
+    request: Request,
+    response: Response,
+    format: Optional[str] = Query(default=None, pattern="^(ndjson|csv)$", description="Overrides Content-Type"),
+):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = format or _IMPORT_CONTENT_TYPES.get(content_type)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send application/x-ndjson or text/csv")
+
+    # The body is streamed: only one chunk of lines is held in memory at a time
+    db = SessionLocal()
+    try:
+        job = RatingImport(db, fmt)
+        buffer = b""
+        lines: list[bytes] = []
+        async for chunk in request.stream():
+            *complete, buffer = (buffer + chunk).split(b"\n")
+            lines.extend(complete)
+            if len(lines) >= job.chunk_size:
+                await run_in_threadpool(job.feed, lines)
+                lines = []
+        lines.append(buffer)
+        await run_in_threadpool(job.feed, lines)
+        report = await run_in_threadpool(job.finish)
+        if report["failed"]:
+            # Partial progress: the committed chunks stay, and the report
+            # lists which line ranges were and were not written
+            response.status_code = 207
+        return report
+    finally:
+        db.close()
+
+
 @router.get("/me", response_model=list[RatingWithMovieOut])
 def my_ratings(db: Session = Depends(get_db)):
     crud.ensure_demo_user(db)
     ratings = crud.list_user_ratings(db, DEMO_USER_ID)
-    results = []
-    for r in ratings:
-        movie = crud.get_movie(db, r.movie_id)
-        if movie:
-            results.append({
-                "id": r.id,
-                "user_id": r.user_id,
-                "movie_id": r.movie_id,
-                "score": r.score,
-                "movie": movie,
-            })
-    return results
+    # Movies come joined in; no per-rating lookup
+    return [
+        {"id": r.id, "user_id": r.user_id, "movie_id": r.movie_id, "score": r.score, "movie": r.movie}
+        for r in ratings
+        if r.movie
+    ]
 
 
 @router.get("/movie/{movie_id}", response_model=RatingOut)
@@ -48,21 +88,34 @@ def my_rating_for_movie(movie_id: int, db: Session = Depends(get_db)):
     return rating
 
 
-@router.get("/movie/{movie_id}/stats", response_model=MovieStatsOut)
-def movie_stats(movie_id: int, db: Session = Depends(get_db)):
-    row = db.execute(
-        select(
-            sqlfunc.avg(Rating.score).label("avg_score"),
-            sqlfunc.count(Rating.id).label("count"),
-        ).where(Rating.movie_id == movie_id)
-    ).first()
+def _stats_out(movie_id: int, stats) -> dict:
+    if stats is None:
+        return {"movie_id": movie_id, "avg_score": 0.0, "count": 0, "histogram": [0, 0, 0, 0, 0]}
     return {
         "movie_id": movie_id,
-        "avg_score": float(row.avg_score) if row.avg_score else 0.0,
-        "count": row.count or 0,
+        "avg_score": stats.rating_sum / stats.rating_count,
+        "count": stats.rating_count,
+        "histogram": [stats.count_1, stats.count_2, stats.count_3, stats.count_4, stats.count_5],
     }
 
 
+@router.get("/stats", response_model=list[MovieStatsOut])
+def movies_stats(
+    movie_ids: Optional[list[int]] = Query(default=None, max_length=500, description="Omit for every rated movie"),
+    db: Session = Depends(get_db),
+):
+    rows = {s.movie_id: s for s in crud.get_movie_stats(db, movie_ids)}
+    if movie_ids is None:
+        return [_stats_out(movie_id, stats) for movie_id, stats in rows.items()]
+    return [_stats_out(movie_id, rows.get(movie_id)) for movie_id in dict.fromkeys(movie_ids)]
+
+
+@router.get("/movie/{movie_id}/stats", response_model=MovieStatsOut)
+def movie_stats(movie_id: int, db: Session = Depends(get_db)):
+    stats = crud.get_movie_stats(db, [movie_id])
+    return _stats_out(movie_id, stats[0] if stats else None)
+
+
 @router.delete("/movie/{movie_id}")
 def remove_rating(movie_id: int, db: Session = Depends(get_db)):
     crud.ensure_demo_user(db)
@@ -1,9 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import hashlib
+import json
+from datetime import date, timedelta
+from typing import Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from ..db import get_db
+from ..db import get_db, SessionLocal
 from .. import crud
-from ..schemas import ShowtimeIn, ShowtimeOut, ScreenOut, SeatMapOut, LockSeatsIn, LockSeatsOut
+from ..booking_executor import SeatWriteUnavailable, run_seat_write
+from ..encoding import encoded_json_response, encoded_response
+from ..response_cache import response_cache
+from ..schedule import MAX_DAYS, build_schedule, load_days, schedule_cache, schedule_scope
+from ..seat_events import broadcaster
+from ..seat_state import encode_statuses_rle, layout_digest
+from ..schemas import (
+    MovieOut, ShowtimeIn, ShowtimeOut, ScreenOut, SeatMapOut, SeatMapDeltaOut, LockSeatsIn, LockSeatsOut,
+    ScreenLayoutOut, SeatStatusCompactOut, BestAvailableIn, BestAvailableOut, ScheduleOut,
+    BulkShowtimesIn, BulkShowtimesOut, SeatAvailabilityOut,
+)
+from ..seat_counts import seat_count_cache
+from ..screen_intervals import ShowtimeConflict, expand_recurrence
+from ..seat_allocator import find_best_blocks
 from ..settings import settings
+from ..utils import utcnow
 
 router = APIRouter(prefix="/showtimes", tags=["showtimes"])
 
@@ -12,81 +34,239 @@ def create_showtime(payload: ShowtimeIn, db: Session = Depends(get_db)):
     movie = crud.get_movie(db, payload.movie_id)
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
-    showtime = crud.create_showtime(
-        db,
-        movie_id=payload.movie_id,
-        screen_id=payload.screen_id,
-        start_time=payload.start_time,
-        price=payload.price,
-        duration_mins=movie.duration_mins,
-    )
+    try:
+        showtime = crud.create_showtime(
+            db,
+            movie_id=payload.movie_id,
+            screen_id=payload.screen_id,
+            start_time=payload.start_time,
+            price=payload.price,
+            duration_mins=movie.duration_mins,
+        )
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=404, detail=str(e))
+    except ShowtimeConflict as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail={"message": str(e), "conflicts": jsonable_encoder(e.conflicts)})
     return showtime
 
+@router.post("/bulk", response_model=BulkShowtimesOut, status_code=201)
+def bulk_create_showtimes(payload: BulkShowtimesIn, db: Session = Depends(get_db)):
+    # Explicit slots and recurrence rules are expanded into one batch; slot
+    # numbers in a 409's conflicts count explicit slots first, then each
+    # rule's expansion (by date, time, then screen)
+    slots = [slot.model_dump() for slot in payload.slots]
+    for rule in payload.recurrences:
+        if rule.end_date < rule.start_date:
+            raise HTTPException(status_code=400, detail="Recurrence end_date is before start_date")
+        if rule.weekdays is not None and any(not 0 <= d <= 6 for d in rule.weekdays):
+            raise HTTPException(status_code=400, detail="weekdays must be 0 (Monday) to 6 (Sunday)")
+        for start_time in expand_recurrence(rule.start_date, rule.end_date, rule.times, rule.weekdays):
+            slots.extend(
+                {"movie_id": rule.movie_id, "screen_id": screen_id, "start_time": start_time, "price": rule.price}
+                for screen_id in rule.screen_ids
+            )
+            if len(slots) > settings.MAX_BULK_SHOWTIMES:
+                raise HTTPException(status_code=400, detail=f"At most {settings.MAX_BULK_SHOWTIMES} showtimes per request")
+    if not slots:
+        raise HTTPException(status_code=400, detail="No slots or recurrences given")
+    if len(slots) > settings.MAX_BULK_SHOWTIMES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.MAX_BULK_SHOWTIMES} showtimes per request")
+    try:
+        showtime_ids = crud.bulk_create_showtimes(db, slots)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=404, detail=str(e))
+    except ShowtimeConflict as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail={"message": str(e), "conflicts": jsonable_encoder(e.conflicts)})
+    return {"created": len(showtime_ids), "showtime_ids": showtime_ids}
+
 @router.get("/screens", response_model=list[ScreenOut])
-def get_screens(db: Session = Depends(get_db)):
-    return crud.list_screens(db)
+def get_screens(request: Request, db: Session = Depends(get_db)):
+    return response_cache.serve(
+        request, "screens", "list",
+        lambda: [ScreenOut.model_validate(s, from_attributes=True) for s in crud.list_screens(db)],
+    )
+
+@router.get("/schedule", response_model=ScheduleOut)
+def get_schedule(
+    request: Request,
+    city: Optional[str] = Query(default=None, max_length=100),
+    theater_id: Optional[int] = Query(default=None, description="Takes precedence over city"),
+    date_from: Optional[date] = Query(default=None, description="UTC day, like start times; defaults to today in UTC"),
+    date_to: Optional[date] = Query(default=None, description="Inclusive; defaults to date_from"),
+    db: Session = Depends(get_db),
+):
+    # What's on: every showtime in the range grouped by movie, plus how many
+    # shows each day has (for a date picker)
+    date_from = date_from or utcnow().date()
+    date_to = date_to or date_from
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to is before date_from")
+    if (date_to - date_from).days >= MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_DAYS} days per request")
+    days = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    snapshots, cached = schedule_cache.get_days(
+        schedule_scope(city, theater_id), days,
+        lambda missing: load_days(db, missing, city, theater_id),
+    )
+    # Snapshots hold JSON-ready dicts already
+    body = json.dumps(build_schedule(date_from, date_to, snapshots), separators=(",", ":")).encode()
+    return encoded_json_response(request, body, {"X-Cache": "HIT" if cached else "MISS"})
+
+MAX_AVAILABILITY_IDS = 200
 
-@router.get("/{showtime_id}/seats", response_model=SeatMapOut)
-def get_seats(showtime_id: int, db: Session = Depends(get_db)):
-    result = crud.get_seat_map(db, showtime_id)
-    if not result:
+@router.get("/availability", response_model=list[SeatAvailabilityOut])
+def get_availability(
+    ids: list[int] = Query(..., description="Showtime ids, repeated: ?ids=1&ids=2"),
+    db: Session = Depends(get_db),
+):
+    # Seat counts for a listing page in one call; unknown ids are left out
+    if len(ids) > MAX_AVAILABILITY_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_AVAILABILITY_IDS} showtimes per request")
+    showtime_ids = list(dict.fromkeys(ids))
+    counts = seat_count_cache.get_many(db, showtime_ids)
+    return [counts[showtime_id].as_dict(showtime_id) for showtime_id in showtime_ids if showtime_id in counts]
+
+@router.get("/screens/{screen_id}/layout", response_model=ScreenLayoutOut)
+def get_screen_layout(screen_id: int, request: Request, db: Session = Depends(get_db)):
+    # In the response cache under "screens", so it is bounded and dropped by the seed
+    def build():
+        result = crud.get_screen_layout(db, screen_id)
+        if not result:
+            raise HTTPException(status_code=404, detail="Screen not found")
+        screen, seats = result
+        return ScreenLayoutOut(
+            screen=ScreenOut.model_validate(screen, from_attributes=True),
+            seat_count=len(seats),
+            layout_digest=layout_digest(s.id for s in seats),
+            seats=[(s.id, s.seat_row, s.seat_col, s.seat_type) for s in seats],
+        )
+
+    return response_cache.serve(request, "screens", f"layout:{screen_id}", build)
+
+@router.get("/{showtime_id}/seats/compact", response_model=SeatStatusCompactOut)
+def get_seat_status_compact(showtime_id: int, request: Request, db: Session = Depends(get_db)):
+    state = crud.get_seat_state(db, showtime_id)
+    if state is None:
         raise HTTPException(status_code=404, detail="Showtime not found")
-    screen, ss_rows = result
-    db.commit()  # commit cleanup/init changes
 
-    from ..models import Showtime as ShowtimeModel
-    showtime = db.query(ShowtimeModel).filter(ShowtimeModel.id == showtime_id).first()
-    movie = showtime.movie
+    etag = f'W/"seat-status-{showtime_id}-v{state.version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
 
-    return {
+    version, codes = state.statuses(utcnow())
+    payload = {
         "showtime_id": showtime_id,
-        "price": showtime.price,
-        "start_time": showtime.start_time,
-        "end_time": showtime.end_time,
-        "movie": {
-            "id": movie.id,
-            "title": movie.title,
-            "description": movie.description,
-            "duration_mins": movie.duration_mins,
-            "language": movie.language,
-            "genre": movie.genre,
-            "poster_url": movie.poster_url,
-            "release_date": movie.release_date,
-        },
-        "screen": {
-            "id": screen.id,
-            "theater_id": screen.theater_id,
-            "name": screen.name,
-            "total_rows": screen.total_rows,
-            "total_cols": screen.total_cols,
-            "theater": {
-                "id": screen.theater.id if screen.theater else None,
-                "name": screen.theater.name if screen.theater else "",
-                "city": screen.theater.city if screen.theater else "",
-                "address": screen.theater.address if screen.theater else None,
-            } if screen.theater else None
-        },
-        "seats": [
-            {
-                "seat": {
-                    "id": r.seat.id,
-                    "screen_id": r.seat.screen_id,
-                    "seat_row": r.seat.seat_row,
-                    "seat_col": r.seat.seat_col,
-                    "seat_type": r.seat.seat_type,
-                },
-                "status": r.status.value,
-                "locked_until": r.locked_until,
-            }
-            for r in ss_rows
-        ],
+        "screen_id": state.info["screen"]["id"],
+        "version": version,
+        "seat_count": len(codes),
+        "layout_digest": state.layout_digest,
+        "encoding": "rle",
+        "statuses": encode_statuses_rle(codes),
     }
+    headers = {"ETag": f'W/"seat-status-{showtime_id}-v{version}"', "Cache-Control": "no-cache"}
+    return encoded_response(request, payload, headers)
+
+@router.get("/{showtime_id}/seats", response_model=Union[SeatMapOut, SeatMapDeltaOut])
+def get_seats(
+    showtime_id: int,
+    request: Request,
+    response: Response,
+    since_version: Optional[int] = Query(default=None, ge=0, description="Only return seats changed after this version"),
+    db: Session = Depends(get_db),
+):
+    state = crud.get_seat_state(db, showtime_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Showtime not found")
+
+    movie = None
+    if since_version is None:
+        # The movie is editable, so it is joined here rather than cached with
+        # the seats; its digest keeps the ETag from outliving an edit
+        movie = crud.get_movie(db, state.info["movie_id"])
+        if movie is None:
+            raise HTTPException(status_code=404, detail="Movie not found")
+        movie = MovieOut.model_validate(movie, from_attributes=True).model_dump()
+        movie_digest = hashlib.sha1(json.dumps(movie, default=str, sort_keys=True).encode()).hexdigest()[:12]
+
+    def etag_for(version: int) -> str:
+        if since_version is None:
+            return f'W/"seats-{showtime_id}-v{version}-m{movie_digest}"'
+        return f'W/"seats-{showtime_id}-v{version}-since{since_version}"'
+
+    if request.headers.get("if-none-match") == etag_for(state.version):
+        return Response(status_code=304, headers={"ETag": etag_for(state.version), "Cache-Control": "no-cache"})
+
+    if since_version is not None:
+        version, seats = state.changes_since(since_version, utcnow())
+        payload = {"showtime_id": showtime_id, "version": version, "since_version": since_version, "seats": seats}
+    else:
+        payload = {**state.seat_map(utcnow()), "movie": movie}
+    response.headers["ETag"] = etag_for(payload["version"])
+    response.headers["Cache-Control"] = "no-cache"
+    return payload
+
+SSE_KEEPALIVE_SECONDS = 15
+
+def _current_seat_version(showtime_id: int):
+    # Short-lived session: a stream must not pin a pooled connection
+    db = SessionLocal()
+    try:
+        return crud.get_seat_version(db, showtime_id)
+    finally:
+        db.close()
+
+def _sse(event: str, data: dict, event_id: int | None = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+@router.get("/{showtime_id}/seats/events")
+async def stream_seat_events(showtime_id: int, request: Request):
+    if await run_in_threadpool(_current_seat_version, showtime_id) is None:
+        raise HTTPException(status_code=404, detail="Showtime not found")
+
+    async def stream():
+        # Subscribed before the version is read, so a change committed in
+        # between is queued (and skipped below if hello already covers it);
+        # the finally also covers a response that is never iterated further
+        sub = broadcaster.subscribe(showtime_id)
+        try:
+            version = await run_in_threadpool(_current_seat_version, showtime_id)
+            if version is None:
+                return
+            yield "retry: 3000\n\n"
+            yield _sse("hello", {"showtime_id": showtime_id, "version": version}, version)
+            while not await request.is_disconnected():
+                if sub.overflowed:
+                    yield _sse("resync", {"showtime_id": showtime_id})
+                    break
+                try:
+                    seat_event = await asyncio.wait_for(sub.queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if seat_event["version"] <= version:
+                    continue
+                yield _sse(seat_event["event"], seat_event, seat_event["version"])
+        finally:
+            broadcaster.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.post("/{showtime_id}/lock-seats", response_model=LockSeatsOut)
 def lock_seats(showtime_id: int, body: LockSeatsIn, db: Session = Depends(get_db)):
     try:
-        locked = crud.lock_seats(db, showtime_id, body.seat_ids)
-        db.commit()
+        locked = run_seat_write(db, showtime_id, lambda s: crud.lock_seats(s, showtime_id, body.seat_ids))
         return {
             "showtime_id": showtime_id,
             "locked_seat_ids": locked,
@@ -98,3 +278,32 @@ def lock_seats(showtime_id: int, body: LockSeatsIn, db: Session = Depends(get_db
     except RuntimeError as e:
         db.rollback()
         raise HTTPException(status_code=409, detail=str(e))
+    except SeatWriteUnavailable as e:
+        db.rollback()
+        raise HTTPException(status_code=503, detail=str(e))
+
+# Candidate blocks tried before giving up when others claim them first
+BEST_AVAILABLE_ATTEMPTS = 5
+
+@router.post("/{showtime_id}/best-available", response_model=BestAvailableOut)
+def lock_best_available(showtime_id: int, body: BestAvailableIn, db: Session = Depends(get_db)):
+    state = crud.get_seat_state(db, showtime_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Showtime not found")
+
+    blocks = find_best_blocks(state, body.party_size, utcnow(), body.seat_type, limit=BEST_AVAILABLE_ATTEMPTS)
+    for seat_ids in blocks:
+        try:
+            run_seat_write(db, showtime_id, lambda s: crud.lock_seats(s, showtime_id, seat_ids))
+        except RuntimeError:
+            continue
+        except SeatWriteUnavailable as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        seats_by_id = {seat["id"]: seat for seat in state.layout}
+        return {
+            "showtime_id": showtime_id,
+            "locked_seat_ids": seat_ids,
+            "seats": [seats_by_id[sid] for sid in seat_ids],
+            "lock_ttl_seconds": settings.LOCK_TTL_SECONDS,
+        }
+    raise HTTPException(status_code=409, detail=f"No block of {body.party_size} adjacent seats is available")
@@ -0,0 +1,149 @@
+"""Cached daily snapshots behind ``GET /showtimes/schedule``.
+
+A snapshot holds one UTC day's showtimes (start times are stored in UTC)
+for one scope (every theater, one city or one theater) already shaped for
+the response: ``ShowtimeOut``
+dicts in start order plus the ``MovieOut`` of every movie they show. A
+request for a date range stitches the days together, loading the missing
+ones with a single query.
+
+``create_showtime`` and ``bulk_create_showtimes`` drop the snapshots of the
+days they add to; movie edits, deletes and the admin seed drop everything.
+Every uvicorn worker has its own snapshots, so another worker's write shows
+up once ``SCHEDULE_CACHE_TTL_SECONDS`` expires.
+"""
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from .schemas import MovieOut, ShowtimeOut
+from .settings import settings
+
+MAX_DAYS = 14  # longest range one request may ask for
+
+
+@dataclass
+class DaySnapshot:
+    day: date
+    showtimes: list[dict] = field(default_factory=list)  # ShowtimeOut, by start time
+    movies: dict[int, dict] = field(default_factory=dict)  # MovieOut by id
+
+
+def schedule_scope(city: str | None, theater_id: int | None) -> str:
+    if theater_id is not None:
+        return f"theater:{theater_id}"
+    if city:
+        return f"city:{city.strip().lower()}"
+    return "all"
+
+
+def load_days(db: Session, days: list[date], city: str | None, theater_id: int | None) -> dict[date, DaySnapshot]:
+    from . import crud
+
+    # One query over the whole span; days in between that are already
+    # cached are loaded again, which is cheaper than a query per gap
+    snapshots = {day: DaySnapshot(day) for day in days}
+    start = datetime.combine(min(days), datetime.min.time())
+    end = datetime.combine(max(days) + timedelta(days=1), datetime.min.time())
+    for showtime in crud.list_schedule(db, start, end, city=city, theater_id=theater_id):
+        snapshot = snapshots.get(showtime.start_time.date())
+        if snapshot is None:
+            continue
+        snapshot.showtimes.append(jsonable_encoder(ShowtimeOut.model_validate(showtime, from_attributes=True)))
+        if showtime.movie_id not in snapshot.movies:
+            snapshot.movies[showtime.movie_id] = jsonable_encoder(
+                MovieOut.model_validate(showtime.movie, from_attributes=True)
+            )
+    return snapshots
+
+
+def build_schedule(date_from: date, date_to: date, snapshots: list[DaySnapshot]) -> dict:
+    # Movies in order of their first showtime in the range
+    movies: dict[int, dict] = {}
+    days = []
+    for snapshot in snapshots:
+        for showtime in snapshot.showtimes:
+            entry = movies.get(showtime["movie_id"])
+            if entry is None:
+                entry = movies[showtime["movie_id"]] = {
+                    "movie": snapshot.movies[showtime["movie_id"]],
+                    "showtimes": [],
+                }
+            entry["showtimes"].append(showtime)
+        days.append({
+            "date": snapshot.day.isoformat(),
+            "showtimes": len(snapshot.showtimes),
+            "movies": len(snapshot.movies),
+        })
+    return {
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "days": days,
+        "movies": list(movies.values()),
+    }
+
+
+class ScheduleCache:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple[str, date], tuple[float, DaySnapshot]] = OrderedDict()
+        # Bumped by every invalidation; a load that started before one is not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_days(self, scope: str, days: list[date], loader) -> tuple[list[DaySnapshot], bool]:
+        # loader(missing_days) -> {day: DaySnapshot}; returns (snapshots, all cached)
+        now = time.monotonic()
+        found: dict[date, DaySnapshot] = {}
+        with self._lock:
+            generation = self._generation
+            for day in days:
+                item = self._entries.get((scope, day))
+                if item is not None and item[0] > now:
+                    self._entries.move_to_end((scope, day))
+                    found[day] = item[1]
+            missing = [day for day in days if day not in found]
+            self.hits += len(found)
+            self.misses += len(missing)
+        if missing:
+            loaded = loader(missing)
+            found.update(loaded)
+            if self.max_entries > 0:
+                with self._lock:
+                    if generation == self._generation:
+                        expires = time.monotonic() + self.ttl_seconds
+                        for day, snapshot in loaded.items():
+                            self._entries[scope, day] = (expires, snapshot)
+                        while len(self._entries) > self.max_entries:
+                            self._entries.popitem(last=False)
+        return [found[day] for day in days], not missing
+
+    def invalidate_day(self, day: date):
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._entries if key[1] == day]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+schedule_cache = ScheduleCache(settings.SCHEDULE_CACHE_SIZE, settings.SCHEDULE_CACHE_TTL_SECONDS)
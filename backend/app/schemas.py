@@ -1,8 +1,9 @@
 from __future__ import annotations
-from datetime import date, datetime
+from datetime import date, datetime, time
 from decimal import Decimal
-from typing import List, Optional, Literal
-from pydantic import BaseModel, Field
+from typing import List, Optional, Literal, Tuple
+from pydantic import BaseModel, Field, field_validator
+from .utils import to_naive_utc
 
 class MovieIn(BaseModel):
     title: str = Field(min_length=1, max_length=255)
@@ -43,6 +44,25 @@ class ShowtimeIn(BaseModel):
     start_time: datetime
     price: Decimal = Field(ge=0)
 
+    _naive_start = field_validator("start_time")(to_naive_utc)
+
+class ShowtimeRecurrenceIn(BaseModel):
+    movie_id: int
+    screen_ids: List[int] = Field(min_length=1)
+    start_date: date
+    end_date: date
+    times: List[time] = Field(min_length=1)  # start times on each day
+    weekdays: Optional[List[int]] = Field(default=None, description="0 = Monday; omit for every day")
+    price: Decimal = Field(ge=0)
+
+class BulkShowtimesIn(BaseModel):
+    slots: List[ShowtimeIn] = []
+    recurrences: List[ShowtimeRecurrenceIn] = []
+
+class BulkShowtimesOut(BaseModel):
+    created: int
+    showtime_ids: List[int]
+
 class ShowtimeOut(BaseModel):
     id: int
     movie_id: int
@@ -52,6 +72,28 @@ class ShowtimeOut(BaseModel):
     price: Decimal
     screen: Optional[ScreenOut] = None
 
+class ScheduleDayOut(BaseModel):
+    date: date
+    showtimes: int
+    movies: int
+
+class ScheduleMovieOut(BaseModel):
+    movie: MovieOut
+    showtimes: list[ShowtimeOut]
+
+class ScheduleOut(BaseModel):
+    date_from: date
+    date_to: date
+    days: list[ScheduleDayOut]
+    movies: list[ScheduleMovieOut]
+
+class SeatAvailabilityOut(BaseModel):
+    showtime_id: int
+    total: int
+    available: int
+    locked: int
+    booked: int
+
 class SeatOut(BaseModel):
     id: int
     screen_id: int
@@ -66,6 +108,7 @@ class ShowtimeSeatOut(BaseModel):
 
 class SeatMapOut(BaseModel):
     showtime_id: int
+    version: int = 0
     screen: ScreenOut
     seats: List[ShowtimeSeatOut]
     price: Decimal
@@ -73,6 +116,36 @@ class SeatMapOut(BaseModel):
     end_time: datetime
     movie: MovieOut
 
+class SeatStateOut(BaseModel):
+    seat_id: int
+    status: Literal["AVAILABLE", "LOCKED", "BOOKED"]
+    locked_until: Optional[datetime] = None
+
+class SeatMapDeltaOut(BaseModel):
+    showtime_id: int
+    version: int
+    since_version: int
+    seats: List[SeatStateOut]
+
+class ScreenLayoutOut(BaseModel):
+    screen: ScreenOut
+    seat_count: int
+    layout_digest: str
+    # [seat_id, seat_row, seat_col, seat_type] in seat position order
+    seats: List[Tuple[int, str, int, str]]
+
+class SeatStatusCompactOut(BaseModel):
+    showtime_id: int
+    screen_id: int
+    version: int
+    seat_count: int
+    # Must equal the layout's layout_digest; otherwise this showtime's seat
+    # inventory differs from the screen's seats and the full seat map is needed
+    layout_digest: str
+    encoding: Literal["rle"] = "rle"
+    # Run-length encoded statuses in layout order, e.g. "A12L2B3"
+    statuses: str
+
 class LockSeatsIn(BaseModel):
     seat_ids: List[int] = Field(min_length=1)
 
@@ -81,6 +154,16 @@ class LockSeatsOut(BaseModel):
     locked_seat_ids: List[int]
     lock_ttl_seconds: int
 
+class BestAvailableIn(BaseModel):
+    party_size: int = Field(ge=1, le=10)
+    seat_type: Optional[str] = None
+
+class BestAvailableOut(BaseModel):
+    showtime_id: int
+    locked_seat_ids: List[int]
+    seats: List[SeatOut]
+    lock_ttl_seconds: int
+
 class CreateBookingIn(BaseModel):
     showtime_id: int
     seat_ids: List[int] = Field(min_length=1)
@@ -98,6 +181,25 @@ class BookingOut(BaseModel):
     created_at: datetime
     seats: List[BookingSeatOut]
 
+class BookingSummaryOut(BaseModel):
+    id: int
+    status: str
+    created_at: Optional[datetime] = None
+    total_amount: Decimal
+    showtime_id: int
+    start_time: datetime
+    price: Decimal
+    movie_id: int
+    movie_title: str
+    poster_url: Optional[str] = None
+    genre: Optional[str] = None
+    language: Optional[str] = None
+    duration_mins: int
+    screen_name: str
+    theater_name: Optional[str] = None
+    theater_city: Optional[str] = None
+    seats: List[str]  # labels in seat order, e.g. ["A1", "A2"]
+
 class RatingIn(BaseModel):
     movie_id: int
     score: int = Field(ge=1, le=5)
@@ -119,7 +221,32 @@ class MovieStatsOut(BaseModel):
     movie_id: int
     avg_score: float
     count: int
+    histogram: list[int] = [0, 0, 0, 0, 0]  # ratings with 1..5 stars
+
+class RatingImportChunkOut(BaseModel):
+    first_line: int
+    last_line: int
+    written: int
+    error: Optional[str] = None  # set on the chunk that could not be written
+
+class BulkRatingImportOut(BaseModel):
+    received: int
+    written: int
+    rejected: int
+    errors: list[str]
+    chunks: list[RatingImportChunkOut]  # in order; all but a failed last one are committed
+    failed: Optional[str] = None  # why the import stopped early
+    seconds: float
+    rows_per_second: float
 
 class RecommendationOut(BaseModel):
     movie: MovieOut
     predicted_score: float
+
+class SimilarMovieOut(BaseModel):
+    movie: MovieOut
+    similarity: float
+
+class MovieSearchOut(BaseModel):
+    movie: MovieOut
+    score: float
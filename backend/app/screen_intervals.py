@@ -0,0 +1,78 @@
+"""Per-screen interval index for showtime overlap checks.
+
+A screen is occupied from a showtime's start until its end plus
+``SHOWTIME_CLEANING_BUFFER_MINS``. ``ScreenIntervals`` keeps one screen's
+occupied intervals sorted by start, with the running maximum of their ends:
+everything that can overlap ``[start, end)`` starts before ``end``, and the
+scan back from there stops as soon as the running maximum falls to
+``start``. That holds even if the table already has overlapping rows from
+before the check existed.
+
+``bulk_create_showtimes`` loads every affected screen's showtimes with one
+query, checks the whole batch against them and against each other, and
+reports every conflict at once.
+"""
+from __future__ import annotations
+import bisect
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from .utils import to_naive_utc
+
+
+@dataclass(frozen=True)
+class Occupied:
+    start: datetime
+    end: datetime  # including the cleaning buffer
+    showtime_id: int | None = None  # existing showtime
+    slot: int | None = None  # position in the batch being scheduled
+
+
+class ScreenIntervals:
+    def __init__(self, intervals: list[Occupied] = ()):
+        self._items = sorted(intervals, key=lambda o: o.start)
+        self._starts = [o.start for o in self._items]
+        self._max_end: list[datetime] = []
+        self._reindex(0)
+
+    def conflicts(self, start: datetime, end: datetime) -> list[Occupied]:
+        found = []
+        i = bisect.bisect_left(self._starts, end) - 1
+        while i >= 0 and self._max_end[i] > start:
+            if self._items[i].end > start:
+                found.append(self._items[i])
+            i -= 1
+        return found
+
+    def add(self, occupied: Occupied):
+        i = bisect.bisect_right(self._starts, occupied.start)
+        self._items.insert(i, occupied)
+        self._starts.insert(i, occupied.start)
+        self._reindex(i)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _reindex(self, i: int):
+        del self._max_end[i:]
+        running = self._max_end[-1] if self._max_end else None
+        for item in self._items[i:]:
+            running = item.end if running is None or item.end > running else running
+            self._max_end.append(running)
+
+
+class ShowtimeConflict(RuntimeError):
+    def __init__(self, conflicts: list[dict]):
+        super().__init__(f"{len(conflicts)} showtime(s) overlap an occupied screen")
+        self.conflicts = conflicts
+
+
+def expand_recurrence(start_date: date, end_date: date, times: list[time], weekdays: list[int] | None) -> list[datetime]:
+    # Start times of a rule: every listed time on each matching day (Monday = 0);
+    # times with an offset are converted to naive UTC per day
+    starts = []
+    day = start_date
+    while day <= end_date:
+        if weekdays is None or day.weekday() in weekdays:
+            starts.extend(sorted(to_naive_utc(datetime.combine(day, t)) for t in times))
+        day += timedelta(days=1)
+    return starts
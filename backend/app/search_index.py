@@ -0,0 +1,406 @@
+"""In-memory full-text and prefix search over the movie catalogue.
+
+Terms come from the title, genre, language and the first
+``DESCRIPTION_TERMS`` distinct words of the description. A term's weight in
+a movie is its field weight divided by the square root of the field's
+length, so "Up" outranks a long title that merely contains "up". Lookups
+go through:
+
+* postings: term -> {movie_id: weight}, plus a lazily sorted
+  highest-weight-first copy used to pick candidates
+* a sorted vocabulary, for prefix expansion with ``bisect``
+* a one-deletion index (``"matrix"`` is filed under ``"atrix"``,
+  ``"mtrix"``, ... ``"matri"``) over title/genre/language terms, for near-miss
+  spellings ("matirx" -> "matrix") when a word matches nothing exactly or
+  by prefix. Description words are left out to keep it small. A half-typed
+  word with a typo ("mtar") completes the heads one edit away instead.
+
+The last word of a query is a prefix (autocomplete) unless the query ends
+in a space. Movies matching every word rank first, then by summed weight.
+The index is built at startup and patched by crud's movie writes; each
+uvicorn worker keeps its own copy, and ``index_sync`` rebuilds it when the
+shared movie change counter shows writes made by another worker.
+"""
+from __future__ import annotations
+import bisect
+import heapq
+import logging
+import math
+import re
+import sys
+import threading
+import unicodedata
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .models import Movie
+
+logger = logging.getLogger(__name__)
+
+TITLE_WEIGHT = 3.0
+GENRE_WEIGHT = 1.5
+LANGUAGE_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.5
+DESCRIPTION_TERMS = 24  # bounds postings per movie on long synopses
+
+PREFIX_FACTOR = 0.8
+FUZZY_FACTOR = 0.6
+MIN_PREFIX_LENGTH = 2
+PREFIX_SCAN = 512  # vocabulary entries looked at per prefix
+MAX_PREFIX_TERMS = 16  # most frequent of those are searched
+PREFIX_CACHE_SIZE = 20_000  # remembered prefix expansions
+MIN_FUZZY_LENGTH = 4
+MAX_FUZZY_TERMS = 8
+MAX_CANDIDATES = 400  # movies scored per query
+
+_WORD = re.compile(r"[^\W_]+")
+_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789"
+# Weights take few distinct values; sharing the float objects saves memory
+_weights: dict[float, float] = {}
+
+
+def tokenize(text: str | None) -> list[str]:
+    # Lowercase, accents stripped: "Amélie" -> ["amelie"]
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return _WORD.findall("".join(c for c in decomposed if not unicodedata.combining(c)).lower())
+
+
+def deletions(word: str) -> set[str]:
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def transpositions(word: str) -> set[str]:
+    return {word[:i] + word[i + 1] + word[i] + word[i + 2:] for i in range(len(word) - 1)}
+
+
+def insertions(word: str) -> set[str]:
+    return {word[:i] + c + word[i:] for i in range(1, len(word)) for c in _ALPHABET}
+
+
+def typo_distance(a: str, b: str, limit: int) -> int:
+    # Optimal string alignment distance (a swap of neighbours counts once);
+    # returns limit + 1 as soon as the distance must exceed limit
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], prev2[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+        prev2, prev = prev, row
+    return prev[-1]
+
+
+def movie_terms(title: str | None, description: str | None, genre: str | None,
+                language: str | None) -> tuple[dict[str, float], set[str]]:
+    # (term -> weight, terms that also appear outside the description)
+    terms: dict[str, float] = {}
+    names: set[str] = set()
+    description_words = list(dict.fromkeys(tokenize(description)))[:DESCRIPTION_TERMS]
+    for words, weight, is_name in (
+        (tokenize(title), TITLE_WEIGHT, True),
+        (tokenize(genre), GENRE_WEIGHT, True),
+        (tokenize(language), LANGUAGE_WEIGHT, True),
+        (description_words, DESCRIPTION_WEIGHT, False),
+    ):
+        if not words:
+            continue
+        value = weight / math.sqrt(len(words))
+        value = _weights.setdefault(value, value)
+        for word in words:
+            word = sys.intern(word)
+            if value > terms.get(word, 0.0):
+                terms[word] = value
+            if is_name:
+                names.add(word)
+    return terms, names
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        # movie_change_counter the index reflects; None until known
+        self._movie_changes: int | None = None
+        self._postings: dict[str, dict[int, float]] = {}
+        self._ranked: dict[str, list[int]] = {}
+        self._movies: dict[int, tuple[tuple[str, ...], tuple[str, ...]]] = {}  # id -> (terms, name terms)
+        self._vocab: list[str] = []
+        self._prefix_cache: dict[tuple[str, int], list[str]] = {}
+        self._name_refs: dict[str, int] = {}
+        self._deletes: dict[str, str | list[str]] = {}
+
+    # -- building -------------------------------------------------------
+
+    def ensure(self, db: Session) -> "SearchIndex":
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self._rebuild(db)
+        return self
+
+    def sync(self, db: Session) -> bool:
+        # Rebuilds when the movies changed in ways this worker did not patch in
+        from .crud import get_movie_changes
+
+        if not self._built or get_movie_changes(db) == self._movie_changes:
+            return False
+        with self._lock:
+            self._rebuild(db)
+        return True
+
+    def _rebuild(self, db: Session):
+        from .crud import get_movie_changes
+
+        # Read under the lock: a write committed meanwhile waits here and is
+        # applied on top of this snapshot. Counter first: a write landing
+        # between the two reads only costs one extra rebuild
+        changes = get_movie_changes(db)
+        rows = db.execute(
+            select(Movie.id, Movie.title, Movie.description, Movie.genre, Movie.language)
+            .execution_options(yield_per=10_000)
+        )
+        self.build(rows, changes)
+
+    def build(self, movies, changes: int | None = None):
+        # movies: iterable of (id, title, description, genre, language);
+        # changes: the movie_change_counter they were read at
+        with self._lock:
+            self._movie_changes = changes
+            self._postings = {}
+            self._ranked = {}
+            self._movies = {}
+            self._name_refs = {}
+            self._deletes = {}
+            for movie_id, title, description, genre, language in movies:
+                self._add(movie_id, *movie_terms(title, description, genre, language), new_terms=None)
+            self._vocab = sorted(self._postings)
+            self._prefix_cache = {}
+            for term in self._name_refs:
+                self._file_deletions(term)
+            self._built = True
+
+    # -- incremental updates ---------------------------------------------
+
+    def upsert_movie(self, movie_id: int, title: str | None, description: str | None,
+                     genre: str | None, language: str | None, changes: int | None = None):
+        with self._lock:
+            if not self._built:
+                return
+            self._note_change(changes)
+            self._remove(movie_id)
+            new_terms: list[str] = []
+            self._add(movie_id, *movie_terms(title, description, genre, language), new_terms=new_terms)
+            for term in new_terms:
+                bisect.insort(self._vocab, term)
+            if new_terms:
+                self._prefix_cache.clear()
+
+    def remove_movie(self, movie_id: int, changes: int | None = None):
+        with self._lock:
+            if self._built:
+                self._note_change(changes)
+                self._remove(movie_id)
+
+    def _note_change(self, changes: int | None):
+        # changes: the counter value this worker's own write committed at;
+        # one past the known value means the patch leaves nothing to resync
+        if changes is not None and self._movie_changes is not None and changes == self._movie_changes + 1:
+            self._movie_changes = changes
+
+    def _add(self, movie_id: int, terms: dict[str, float], names: set[str], new_terms: list[str] | None):
+        self._movies[movie_id] = (tuple(terms), tuple(names))
+        for term, weight in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                if new_terms is not None:
+                    new_terms.append(term)
+            postings[movie_id] = weight
+            self._ranked.pop(term, None)
+        for term in names:
+            refs = self._name_refs.get(term, 0)
+            self._name_refs[term] = refs + 1
+            if not refs and new_terms is not None:
+                self._file_deletions(term)
+
+    def _remove(self, movie_id: int):
+        terms, names = self._movies.pop(movie_id, ((), ()))
+        for term in terms:
+            postings = self._postings[term]
+            del postings[movie_id]
+            self._ranked.pop(term, None)
+            if not postings:
+                del self._postings[term]
+                del self._vocab[bisect.bisect_left(self._vocab, term)]
+                self._prefix_cache.clear()
+        for term in names:
+            self._name_refs[term] -= 1
+            if not self._name_refs[term]:
+                del self._name_refs[term]
+                self._unfile_deletions(term)
+
+    def _file_deletions(self, term: str):
+        if len(term) < MIN_FUZZY_LENGTH:
+            return
+        for key in deletions(term) | {term}:
+            filed = self._deletes.get(key)
+            if filed is None:
+                self._deletes[key] = term  # most keys name a single term
+            elif isinstance(filed, str):
+                self._deletes[key] = [filed, term]
+            else:
+                filed.append(term)
+
+    def _unfile_deletions(self, term: str):
+        if len(term) < MIN_FUZZY_LENGTH:
+            return
+        for key in deletions(term) | {term}:
+            filed = self._deletes.get(key)
+            if filed == term:
+                del self._deletes[key]
+            elif isinstance(filed, list):
+                filed.remove(term)
+                if len(filed) == 1:
+                    self._deletes[key] = filed[0]
+
+    # -- lookups --------------------------------------------------------
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[int, float]]:
+        words = tokenize(query)[:8]
+        if not words:
+            return []
+        prefix_last = not query[-1:].isspace()
+        with self._lock:
+            expansions = [
+                self._expand(word, prefix_last and i == len(words) - 1)
+                for i, word in enumerate(words)
+            ]
+            expansions = [e for e in expansions if e]
+            if not expansions:
+                return []
+            # Candidates come from the most selective word; the others only score them
+            expansions.sort(key=lambda e: sum(len(self._postings[t]) for t, _ in e))
+            scores: dict[int, float] = {}
+            for term, factor in expansions[0]:
+                postings = self._postings[term]
+                budget = MAX_CANDIDATES - len(scores)
+                # Only long posting lists need the highest-weight-first order
+                ranked = postings if len(postings) <= budget else self._ranked_postings(term)[:budget]
+                for movie_id in ranked:
+                    score = factor * postings[movie_id]
+                    if score > scores.get(movie_id, 0.0):
+                        scores[movie_id] = score
+                if len(scores) >= MAX_CANDIDATES:
+                    break
+            matched = dict.fromkeys(scores, 1)
+            for expansion in expansions[1:]:
+                best: dict[int, float] = {}
+                for term, factor in expansion:
+                    postings = self._postings[term]
+                    for movie_id in scores.keys() & postings.keys():
+                        score = factor * postings[movie_id]
+                        if score > best.get(movie_id, 0.0):
+                            best[movie_id] = score
+                for movie_id, score in best.items():
+                    scores[movie_id] += score
+                    matched[movie_id] += 1
+        top = heapq.nlargest(limit, scores, key=lambda m: (matched[m], scores[m], m))
+        return [(movie_id, round(scores[movie_id], 4)) for movie_id in top]
+
+    def _expand(self, word: str, prefix: bool) -> list[tuple[str, float]]:
+        # (term, factor) pairs a query word stands for
+        found: dict[str, float] = {}
+        if word in self._postings:
+            found[word] = 1.0
+        if prefix and len(word) >= MIN_PREFIX_LENGTH:
+            for term in self._prefixed(word, MAX_PREFIX_TERMS):
+                found.setdefault(term, PREFIX_FACTOR)
+        if not found and len(word) >= MIN_FUZZY_LENGTH:
+            found.update(self._fuzzy(word, prefix))
+        return list(found.items())
+
+    def _prefixed(self, prefix: str, count: int) -> list[str]:
+        # The most frequent vocabulary terms starting with prefix. Cached until
+        # a term enters or leaves the vocabulary; frequencies drifting in the
+        # meantime only reorder near-ties
+        cached = self._prefix_cache.get((prefix, count))
+        if cached is not None:
+            return cached
+        vocab = self._vocab
+        start = bisect.bisect_left(vocab, prefix)
+        end = min(start + PREFIX_SCAN, len(vocab))
+        terms = []
+        for i in range(start, end):
+            if not vocab[i].startswith(prefix):
+                break
+            terms.append(vocab[i])
+        if len(terms) > count:
+            terms = heapq.nlargest(count, terms, key=lambda t: len(self._postings[t]))
+        if len(self._prefix_cache) >= PREFIX_CACHE_SIZE:
+            self._prefix_cache.clear()
+        self._prefix_cache[prefix, count] = terms
+        return terms
+
+    def _fuzzy(self, word: str, prefix: bool) -> dict[str, float]:
+        # Terms one typo away: a shared deletion covers a changed, missing,
+        # extra or swapped letter
+        candidates: set[str] = set()
+        for key in deletions(word) | {word}:
+            filed = self._deletes.get(key)
+            if filed is not None:
+                candidates.update((filed,) if isinstance(filed, str) else filed)
+        matches = {
+            term for term in candidates
+            if term in self._postings and typo_distance(word, term, 1) <= 1
+        }
+        if prefix:
+            # Typo inside a word still being typed: complete every head one
+            # edit away that some term starts with
+            vocab, size = self._vocab, len(self._vocab)
+            for head in deletions(word) | transpositions(word) | insertions(word):
+                i = bisect.bisect_left(vocab, head)
+                if i < size and vocab[i].startswith(head):
+                    matches.update(t for t in self._prefixed(head, MAX_FUZZY_TERMS) if t in self._name_refs)
+        best = heapq.nlargest(MAX_FUZZY_TERMS, matches, key=lambda t: len(self._postings[t]))
+        return {term: FUZZY_FACTOR for term in best}
+
+    def _ranked_postings(self, term: str) -> list[int]:
+        ranked = self._ranked.get(term)
+        if ranked is None:
+            postings = self._postings[term]
+            ranked = self._ranked[term] = sorted(postings, key=postings.__getitem__, reverse=True)
+        return ranked
+
+    def stats(self) -> dict:
+        if not self._built:
+            return {"built": False}  # don't wait behind a build holding the lock
+        with self._lock:
+            return {
+                "built": self._built,
+                "movies": len(self._movies),
+                "terms": len(self._postings),
+                "postings": sum(len(p) for p in self._postings.values()),
+                "fuzzy_keys": len(self._deletes),
+                "cached_prefixes": len(self._prefix_cache),
+            }
+
+
+search_index = SearchIndex()
+
+
+def build_search_index():
+    # Startup warm-up; a failure leaves the index to be built on first search
+    from .db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        search_index.ensure(db)
+    except Exception:
+        logger.exception("Search index build failed")
+    finally:
+        db.close()
@@ -0,0 +1,80 @@
+"""Best-available block search over per-row seat availability bitmaps.
+
+Rows are ordered front (closest to the screen) to back by ``seat_sort_key``;
+within a row, bit ``i`` of the bitmap is column ``first_col + i``, so a gap
+in the column numbering (an aisle) naturally breaks a block.
+"""
+from __future__ import annotations
+import heapq
+from datetime import datetime
+from .seat_state import ShowtimeSeatState, AVAILABLE
+
+# Preferred distance from the screen as a fraction of the rows, front = 0
+IDEAL_ROW_FRACTION = 0.6
+CENTRE_WEIGHT = 1.0
+ROW_WEIGHT = 1.0
+
+
+def _row_bitmaps(state: ShowtimeSeatState, now: datetime, seat_type: str | None):
+    _, codes = state.statuses(now)
+    layout = state.layout
+    bitmaps = []
+    for _, min_col, max_col, cols in state.row_index:
+        mask = 0
+        for col, pos in cols:
+            if codes[pos] == AVAILABLE and (not seat_type or layout[pos]["seat_type"] == seat_type):
+                mask |= 1 << (col - min_col)
+        bitmaps.append((min_col, max_col, mask))
+    return bitmaps
+
+
+def score_block(row_idx: int, n_rows: int, block_centre: float, min_col: int, max_col: int) -> float:
+    # Lower is better: penalise distance from the row centre and from the ideal row
+    half_width = max((max_col - min_col) / 2, 1)
+    centre_penalty = abs(block_centre - (min_col + max_col) / 2) / half_width
+    ideal_row = (n_rows - 1) * IDEAL_ROW_FRACTION
+    row_penalty = abs(row_idx - ideal_row) / max(n_rows - 1, 1)
+    return CENTRE_WEIGHT * centre_penalty + ROW_WEIGHT * row_penalty
+
+
+def find_best_blocks(
+    state: ShowtimeSeatState,
+    party_size: int,
+    now: datetime,
+    seat_type: str | None = None,
+    limit: int = 5,
+) -> list[list[int]]:
+    # Returns up to `limit` candidate blocks (seat id lists), best first
+    bitmaps = _row_bitmaps(state, now, seat_type)
+    n_rows = len(bitmaps)
+    candidates = []
+    for row_idx, (min_col, max_col, mask) in enumerate(bitmaps):
+        # Bit i of `starts` is set when columns i .. i+party_size-1 are all free
+        starts = mask
+        for k in range(1, party_size):
+            starts &= mask >> k
+        if not starts:
+            continue
+        # Within a row the score only depends on the distance from the centre,
+        # so probe start columns outward from the ideal one and stop once the
+        # row has contributed `limit` candidates.
+        ideal = (max_col - min_col - (party_size - 1)) / 2
+        found = 0
+        for offset in range(max_col - min_col + 1):
+            for bit in {int(ideal - offset), int(ideal + offset + 0.5)}:
+                if bit < 0 or not (starts >> bit) & 1:
+                    continue
+                starts &= ~(1 << bit)
+                start_col = min_col + bit
+                score = score_block(row_idx, n_rows, start_col + (party_size - 1) / 2, min_col, max_col)
+                candidates.append((score, row_idx, start_col))
+                found += 1
+            if found >= limit or not starts:
+                break
+
+    best = heapq.nsmallest(limit, candidates)
+    blocks = []
+    for _, row_idx, start_col in best:
+        positions = dict(state.row_index[row_idx][3])
+        blocks.append([state.seat_ids[positions[col]] for col in range(start_col, start_col + party_size)])
+    return blocks
@@ -0,0 +1,113 @@
+"""Seats-left counts for many showtimes at once.
+
+``GET /showtimes/availability`` answers each showtime from a short-lived
+entry here (``SEAT_COUNTS_TTL_SECONDS``) or, for all the rest, one grouped
+aggregate over ``showtime_seats``. The per-worker seat state is not used:
+it is only checked against the database when a seat map is read.
+
+Expired holds count as available; a showtime without seat inventory counts
+as all zeros. A seat event drops the showtime's entry, so this worker's own
+locks and bookings show at once, and an entry also ends when its earliest
+hold expires. Other workers' writes show within the TTL (at once with the
+Redis seat event backend).
+"""
+from __future__ import annotations
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy.orm import Session
+from .seat_events import broadcaster
+from .settings import settings
+from .utils import utcnow
+
+MAX_ENTRIES = 20_000
+
+
+@dataclass(frozen=True)
+class SeatCounts:
+    available: int
+    locked: int
+    booked: int
+    next_expiry: datetime | None = None  # earliest live hold
+
+    def as_dict(self, showtime_id: int) -> dict:
+        return {
+            "showtime_id": showtime_id,
+            "total": self.available + self.locked + self.booked,
+            "available": self.available,
+            "locked": self.locked,
+            "booked": self.booked,
+        }
+
+
+class SeatCountCache:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict[int, tuple[float, SeatCounts]] = {}
+        # Seat events seen per showtime; a load that raced one is not stored
+        self._changes: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, db: Session, showtime_ids: list[int]) -> dict[int, SeatCounts]:
+        from . import crud
+
+        now = time.monotonic()
+        found: dict[int, SeatCounts] = {}
+        with self._lock:
+            for showtime_id in showtime_ids:
+                item = self._entries.get(showtime_id)
+                if item is not None and item[0] > now:
+                    found[showtime_id] = item[1]
+            missing = [showtime_id for showtime_id in showtime_ids if showtime_id not in found]
+            seen = {showtime_id: self._changes.get(showtime_id, 0) for showtime_id in missing}
+            self.hits += len(found)
+            self.misses += len(missing)
+        if not missing:
+            return found
+
+        wall_now = utcnow()
+        loaded = crud.get_seat_counts(db, missing, wall_now)
+        found.update(loaded)
+
+        if self.ttl_seconds > 0:
+            with self._lock:
+                if len(self._entries) + len(loaded) > MAX_ENTRIES:
+                    self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                    if len(self._entries) + len(loaded) > MAX_ENTRIES:
+                        self._entries.clear()
+                for showtime_id, counts in loaded.items():
+                    if self._changes.get(showtime_id, 0) != seen[showtime_id]:
+                        continue
+                    ttl = self.ttl_seconds
+                    if counts.next_expiry is not None:
+                        ttl = min(ttl, (counts.next_expiry - wall_now).total_seconds())
+                    self._entries[showtime_id] = (time.monotonic() + ttl, counts)
+        return found
+
+    def apply_event(self, seat_event: dict):
+        showtime_id = seat_event["showtime_id"]
+        with self._lock:
+            self._entries.pop(showtime_id, None)
+            if len(self._changes) >= MAX_ENTRIES:
+                self._changes.clear()
+            self._changes[showtime_id] = self._changes.get(showtime_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+seat_count_cache = SeatCountCache(settings.SEAT_COUNTS_TTL_SECONDS)
+broadcaster.add_listener(seat_count_cache.apply_event, reset=seat_count_cache.clear)
@@ -0,0 +1,256 @@
+"""Fan-out of seat status transitions to live subscribers.
+
+crud records transitions on the session while a transaction is open; they
+are published only once that transaction commits. Publishing goes through a
+pluggable backend: the in-memory default delivers to subscribers in this
+process, the Redis backend relays events between uvicorn workers.
+
+The Redis subscription is opened by ``broadcaster.start()`` in the app
+lifespan and reopened with backoff whenever the connection drops. Events
+published meanwhile are lost to this worker, so after a reconnect the
+listeners' reset callbacks drop what they cached and SSE clients are told
+to resync.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .models import ShowtimeSeatStatus
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+EVENT_NAMES = {
+    ShowtimeSeatStatus.LOCKED: "locked",
+    ShowtimeSeatStatus.BOOKED: "booked",
+    ShowtimeSeatStatus.AVAILABLE: "released",
+}
+
+SUBSCRIBER_QUEUE_SIZE = 256
+RECONNECT_MIN_SECONDS = 0.5
+RECONNECT_MAX_SECONDS = 30.0
+
+
+def record_seat_change(
+    db: Session,
+    showtime_id: int,
+    version: int,
+    status: ShowtimeSeatStatus,
+    seat_ids: list[int],
+    locked_until: datetime | None = None,
+):
+    db.info.setdefault("seat_events", []).append({
+        "event": EVENT_NAMES[status],
+        "showtime_id": showtime_id,
+        "version": version,
+        "status": status.value,
+        "seat_ids": list(seat_ids),
+        "locked_until": locked_until.isoformat() if locked_until else None,
+    })
+
+
+def pending_event_count(db: Session) -> int:
+    return len(db.info.get("seat_events", ()))
+
+
+def discard_events_since(db: Session, mark: int):
+    del db.info.get("seat_events", [])[mark:]
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session):
+    for seat_event in session.info.pop("seat_events", []):
+        try:
+            broadcaster.publish(seat_event)
+        except Exception:
+            logger.exception("Failed to publish seat event")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session):
+    session.info.pop("seat_events", None)
+
+
+class Subscription:
+    def __init__(self, showtime_id: int, loop: asyncio.AbstractEventLoop):
+        self.showtime_id = showtime_id
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+        self._loop = loop
+
+    def push(self, seat_event: dict):
+        self._loop.call_soon_threadsafe(self._put, seat_event)
+
+    def _put(self, seat_event: dict):
+        try:
+            self.queue.put_nowait(seat_event)
+        except asyncio.QueueFull:
+            # A slow client lost events; it is told to resync instead
+            self.overflowed = True
+
+
+class InMemorySeatEventBackend:
+    def __init__(self, deliver, reset):
+        self._deliver = deliver
+
+    def start(self):
+        pass
+
+    def publish(self, seat_event: dict):
+        self._deliver(seat_event)
+
+    def stop(self):
+        pass
+
+
+class RedisSeatEventBackend:
+    CHANNEL_PREFIX = "seat-events:"
+
+    def __init__(self, url: str, deliver, reset):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SEAT_EVENTS_BACKEND=redis requires the 'redis' package")
+        # Connections are opened lazily, by the first publish or by start()
+        self._client = redis.Redis.from_url(url)
+        self._deliver = deliver
+        self._reset = reset
+        self._pubsub = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._listen, name="seat-events", daemon=True)
+        self._thread.start()
+
+    def _listen(self):
+        delay = RECONNECT_MIN_SECONDS
+        connected_before = False
+        while not self._stopping.is_set():
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(f"{self.CHANNEL_PREFIX}*")
+                self._pubsub = pubsub
+                if connected_before:
+                    logger.info("Seat event subscription restored")
+                    self._reset()
+                connected_before = True
+                delay = RECONNECT_MIN_SECONDS
+                for message in pubsub.listen():
+                    try:
+                        self._deliver(json.loads(message["data"]))
+                    except Exception:
+                        logger.exception("Dropping malformed seat event")
+            except Exception:
+                if self._stopping.is_set():
+                    return
+                logger.warning("Seat event subscription lost; retrying in %.1fs", delay, exc_info=True)
+            finally:
+                self._pubsub = None
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+            self._stopping.wait(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    def publish(self, seat_event: dict):
+        self._client.publish(f"{self.CHANNEL_PREFIX}{seat_event['showtime_id']}", json.dumps(seat_event))
+
+    def stop(self):
+        self._stopping.set()
+        pubsub = self._pubsub
+        if pubsub is not None:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+class SeatEventBroadcaster:
+    def __init__(self, make_backend):
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._listeners = []
+        self._resets = []
+        self._lock = threading.Lock()
+        self.backend = make_backend(self._deliver, self._reset)
+
+    def start(self):
+        self.backend.start()
+
+    def stop(self):
+        self.backend.stop()
+
+    def publish(self, seat_event: dict):
+        self.backend.publish(seat_event)
+
+    def add_listener(self, listener, reset=None):
+        # Synchronous callbacks that see every event, e.g. in-process caches;
+        # reset() is called when events may have been missed
+        self._listeners.append(listener)
+        if reset is not None:
+            self._resets.append(reset)
+
+    def subscribe(self, showtime_id: int) -> Subscription:
+        sub = Subscription(showtime_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(showtime_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subscribers.get(sub.showtime_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.showtime_id]
+
+    def subscriber_count(self, showtime_id: int) -> int:
+        with self._lock:
+            return len(self._subscribers.get(showtime_id, ()))
+
+    def _reset(self):
+        for reset in self._resets:
+            try:
+                reset()
+            except Exception:
+                logger.exception("Seat event reset failed")
+        with self._lock:
+            subs = [sub for subs in self._subscribers.values() for sub in subs]
+        for sub in subs:
+            sub.overflowed = True
+
+    def _deliver(self, seat_event: dict):
+        for listener in self._listeners:
+            try:
+                listener(seat_event)
+            except Exception:
+                logger.exception("Seat event listener failed")
+        with self._lock:
+            subs = list(self._subscribers.get(seat_event["showtime_id"], ()))
+        for sub in subs:
+            try:
+                sub.push(seat_event)
+            except RuntimeError:
+                # The subscriber's event loop has already shut down
+                self.unsubscribe(sub)
+
+
+def _make_backend(deliver, reset):
+    if settings.SEAT_EVENTS_BACKEND == "redis":
+        return RedisSeatEventBackend(settings.REDIS_URL, deliver, reset)
+    return InMemorySeatEventBackend(deliver, reset)
+
+
+broadcaster = SeatEventBroadcaster(_make_backend)
@@ -0,0 +1,302 @@
+"""Write-through, in-memory seat state per showtime.
+
+Each cached showtime keeps its seats in a fixed position order with compact
+arrays for status, lock expiry and per-seat version, plus the static payload
+(showtime, screen, layout) of the seat map. The movie is editable, so it is
+not cached here: seat map responses join it at serve time. Entries are rebuilt from the
+database on a miss, kept current by the committed seat events from
+``seat_events`` and evicted least-recently-used or when idle.
+
+Every read first compares the entry's version with ``Showtime.seat_version``
+(see ``crud.get_seat_state``) and rebuilds it when another worker's write
+was missed, so seat maps and ETags never run behind the database. With
+several workers the Redis seat event backend keeps entries current, so
+those rebuilds stay rare.
+"""
+from __future__ import annotations
+import hashlib
+import threading
+import time
+from functools import cached_property
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from .models import ShowtimeSeatStatus
+from .seat_events import broadcaster
+from .settings import settings
+
+STATUSES = [ShowtimeSeatStatus.AVAILABLE, ShowtimeSeatStatus.LOCKED, ShowtimeSeatStatus.BOOKED]
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+AVAILABLE, LOCKED, BOOKED = range(3)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _to_ts(dt: datetime | None) -> float:
+    return (dt - _EPOCH).total_seconds() if dt else 0.0
+
+
+def _from_ts(ts: float) -> datetime | None:
+    return _EPOCH + timedelta(seconds=ts) if ts else None
+
+
+def seat_sort_key(seat) -> tuple:
+    # Row "AA" sorts after row "Z"
+    return (len(seat.seat_row), seat.seat_row, seat.seat_col)
+
+
+def layout_digest(seat_ids) -> str:
+    # Identifies a seat order: a compact status string only lines up with a
+    # screen layout that has the same digest
+    return hashlib.sha1(",".join(map(str, seat_ids)).encode()).hexdigest()[:16]
+
+
+class ShowtimeSeatState:
+    def __init__(self, showtime_id: int, version: int, info: dict, layout: list[dict]):
+        self.showtime_id = showtime_id
+        self.version = version
+        self.info = info
+        self.layout = layout
+        n = len(layout)
+        self.seat_ids = array("q", (seat["id"] for seat in layout))
+        self.position = {seat_id: pos for pos, seat_id in enumerate(self.seat_ids)}
+        self.status = bytearray(n)
+        self.locked_until = array("d", bytes(8 * n))
+        self.seat_versions = array("q", bytes(8 * n))
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_rows(cls, showtime, screen, ss_rows, version: int) -> "ShowtimeSeatState":
+        ss_rows = sorted(ss_rows, key=lambda r: seat_sort_key(r.seat))
+        theater = screen.theater
+        info = {
+            "showtime_id": showtime.id,
+            "price": showtime.price,
+            "start_time": showtime.start_time,
+            "end_time": showtime.end_time,
+            "movie_id": showtime.movie_id,
+            "screen": {
+                "id": screen.id,
+                "theater_id": screen.theater_id,
+                "name": screen.name,
+                "total_rows": screen.total_rows,
+                "total_cols": screen.total_cols,
+                "theater": {
+                    "id": theater.id,
+                    "name": theater.name,
+                    "city": theater.city,
+                    "address": theater.address,
+                } if theater else None,
+            },
+        }
+        layout = [
+            {
+                "id": r.seat.id,
+                "screen_id": r.seat.screen_id,
+                "seat_row": r.seat.seat_row,
+                "seat_col": r.seat.seat_col,
+                "seat_type": r.seat.seat_type,
+            }
+            for r in ss_rows
+        ]
+        state = cls(showtime.id, version, info, layout)
+        for pos, r in enumerate(ss_rows):
+            state.status[pos] = STATUS_CODES[r.status]
+            state.locked_until[pos] = _to_ts(r.locked_until)
+            state.seat_versions[pos] = r.version or 0
+        return state
+
+    @cached_property
+    def layout_digest(self) -> str:
+        return layout_digest(self.seat_ids)
+
+    @cached_property
+    def row_index(self) -> list[tuple[str, int, int, list[tuple[int, int]]]]:
+        # (seat_row, min_col, max_col, [(seat_col, position), ...]) front to back
+        rows: dict[str, list[tuple[int, int]]] = {}
+        for pos, seat in enumerate(self.layout):
+            rows.setdefault(seat["seat_row"], []).append((seat["seat_col"], pos))
+        return [
+            (label, min(c for c, _ in cols), max(c for c, _ in cols), cols)
+            for label, cols in rows.items()
+        ]
+
+    def apply(self, seat_event: dict) -> bool:
+        # Returns False when events were missed and the entry must be rebuilt
+        with self._lock:
+            version = seat_event["version"]
+            if version <= self.version:
+                return True
+            if version != self.version + 1:
+                return False
+            code = STATUS_CODES[ShowtimeSeatStatus(seat_event["status"])]
+            locked_until = seat_event.get("locked_until")
+            ts = _to_ts(datetime.fromisoformat(locked_until)) if locked_until else 0.0
+            for seat_id in seat_event["seat_ids"]:
+                pos = self.position.get(seat_id)
+                if pos is None:
+                    continue
+                self.status[pos] = code
+                self.locked_until[pos] = ts
+                self.seat_versions[pos] = version
+            self.version = version
+            return True
+
+    def _effective(self, pos: int, now_ts: float) -> tuple[int, float]:
+        code = self.status[pos]
+        ts = self.locked_until[pos]
+        if code == LOCKED and ts <= now_ts:
+            return AVAILABLE, 0.0
+        return code, ts
+
+    def statuses(self, now: datetime) -> tuple[int, bytearray]:
+        # Effective status codes in position order, with the version they belong to
+        now_ts = _to_ts(now)
+        with self._lock:
+            codes = bytearray(self.status)
+            for pos, code in enumerate(codes):
+                if code == LOCKED and self.locked_until[pos] <= now_ts:
+                    codes[pos] = AVAILABLE
+            return self.version, codes
+
+    def seat_map(self, now: datetime) -> dict:
+        now_ts = _to_ts(now)
+        with self._lock:
+            seats = []
+            for pos, seat in enumerate(self.layout):
+                code, ts = self._effective(pos, now_ts)
+                seats.append({"seat": seat, "status": STATUSES[code].value, "locked_until": _from_ts(ts)})
+            return {**self.info, "version": self.version, "seats": seats}
+
+    def changes_since(self, since_version: int, now: datetime) -> tuple[int, list[dict]]:
+        now_ts = _to_ts(now)
+        with self._lock:
+            changes = []
+            for pos, seat_version in enumerate(self.seat_versions):
+                if seat_version > since_version:
+                    code, ts = self._effective(pos, now_ts)
+                    changes.append({
+                        "seat_id": self.seat_ids[pos],
+                        "status": STATUSES[code].value,
+                        "locked_until": _from_ts(ts),
+                    })
+            return self.version, changes
+
+    def booked_among(self, seat_ids: list[int]) -> list[int]:
+        return [
+            seat_id for seat_id in seat_ids
+            if (pos := self.position.get(seat_id)) is not None and self.status[pos] == BOOKED
+        ]
+
+
+STATUS_LETTERS = "ALB"
+
+
+def encode_statuses_rle(codes: bytes) -> str:
+    # "A12L2B3" = 12 available, 2 locked, 3 booked, in layout position order
+    out = []
+    run_code, run_len = None, 0
+    for code in codes:
+        if code == run_code:
+            run_len += 1
+            continue
+        if run_len:
+            out.append(f"{STATUS_LETTERS[run_code]}{run_len}")
+        run_code, run_len = code, 1
+    if run_len:
+        out.append(f"{STATUS_LETTERS[run_code]}{run_len}")
+    return "".join(out)
+
+
+class SeatStateCache:
+    def __init__(self, max_entries: int, idle_seconds: float):
+        self.max_entries = max_entries
+        self.idle_seconds = idle_seconds
+        self._entries: OrderedDict[int, ShowtimeSeatState] = OrderedDict()
+        self._last_used: dict[int, float] = {}
+        # Events that arrive while an entry is being loaded are replayed onto it
+        self._loading: dict[int, list[dict]] = {}
+        self._loaders: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, showtime_id: int) -> ShowtimeSeatState | None:
+        with self._lock:
+            return self._entries.get(showtime_id)
+
+    def get_or_load(self, showtime_id: int, loader) -> ShowtimeSeatState | None:
+        if self.max_entries <= 0:
+            return loader()
+        now = time.monotonic()
+        with self._lock:
+            state = self._entries.get(showtime_id)
+            if state is not None:
+                self._entries.move_to_end(showtime_id)
+                self._last_used[showtime_id] = now
+                self.hits += 1
+                return state
+            self.misses += 1
+            self._loading.setdefault(showtime_id, [])
+            self._loaders[showtime_id] = self._loaders.get(showtime_id, 0) + 1
+
+        state = None
+        try:
+            state = loader()
+        finally:
+            with self._lock:
+                buffered = self._loading.get(showtime_id, [])
+                self._loaders[showtime_id] -= 1
+                if not self._loaders[showtime_id]:
+                    del self._loaders[showtime_id]
+                    self._loading.pop(showtime_id, None)
+                if state is not None and all(state.apply(e) for e in buffered):
+                    self._entries[showtime_id] = state
+                    self._last_used[showtime_id] = time.monotonic()
+                    self._evict(now)
+        return state
+
+    def apply_event(self, seat_event: dict):
+        showtime_id = seat_event["showtime_id"]
+        with self._lock:
+            if showtime_id in self._loading:
+                self._loading[showtime_id].append(seat_event)
+            state = self._entries.get(showtime_id)
+            if state is not None and not state.apply(seat_event):
+                self._drop(showtime_id)
+
+    def invalidate(self, showtime_id: int):
+        with self._lock:
+            self._drop(showtime_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._last_used.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _drop(self, showtime_id: int):
+        self._entries.pop(showtime_id, None)
+        self._last_used.pop(showtime_id, None)
+
+    def _evict(self, now: float):
+        while len(self._entries) > self.max_entries:
+            oldest, _ = self._entries.popitem(last=False)
+            self._last_used.pop(oldest, None)
+        while self._entries:
+            oldest = next(iter(self._entries))
+            if now - self._last_used[oldest] < self.idle_seconds:
+                break
+            self._drop(oldest)
+
+
+seat_state_cache = SeatStateCache(settings.SEAT_STATE_CACHE_SIZE, settings.SEAT_STATE_IDLE_SECONDS)
+broadcaster.add_listener(seat_state_cache.apply_event, reset=seat_state_cache.clear)
@@ -8,12 +8,59 @@ class Settings(BaseSettings):
     DB_NAME: str = "movietickets"
     DB_USER: str = "app"
     DB_PASSWORD: str = "app"
+    # Full SQLAlchemy URL; overrides the DB_* fields (e.g. sqlite:///./bench.db)
+    DATABASE_URL: str | None = None
 
     FRONTEND_ORIGIN: str = "http://localhost:5173"
     LOCK_TTL_SECONDS: int = 300
+    SEAT_LOCK_MODE: str = "cas"  # "cas" (single conditional UPDATE) or "legacy" (SELECT ... FOR UPDATE)
+    LOCK_REAPER_ENABLED: bool = True
+    LOCK_REAPER_INTERVAL_SECONDS: int = 15
+    LOCK_REAPER_BATCH_SIZE: int = 500
+
+    BOOKING_EXECUTOR_ENABLED: bool = False
+    BOOKING_EXECUTOR_PARTITIONS: int = 8
+    BOOKING_EXECUTOR_BATCH_SIZE: int = 32
+
+    SHOWTIME_CLEANING_BUFFER_MINS: int = 15  # a screen stays occupied this long after a showtime ends
+    MAX_BULK_SHOWTIMES: int = 5000  # slots per POST /showtimes/bulk after expanding recurrences
+
+    SEAT_STATE_CACHE_SIZE: int = 2000  # showtimes kept in memory; 0 disables the cache
+    SEAT_STATE_IDLE_SECONDS: int = 900
+    SEAT_COUNTS_TTL_SECONDS: float = 5  # seats-left counts cache per worker; 0 disables
+
+    RECOMMENDER_RANK: int = 10  # latent factors
+    RECOMMENDER_SVD_ITERATIONS: int = 4  # power iterations of the randomized SVD
+    RECOMMENDER_REFRESH_ENABLED: bool = True
+    RECOMMENDER_REFRESH_INTERVAL_SECONDS: int = 60
+    RECOMMENDER_RETRAIN_SECONDS: int = 3600  # max model age once ratings have changed
+    RECOMMENDER_DRIFT_THRESHOLD: float = 0.1  # share of ratings changed that forces a retrain
+
+    MOVIE_INDEX_SYNC_ENABLED: bool = True  # rebuild in-memory movie indexes after other workers' writes
+    MOVIE_INDEX_SYNC_INTERVAL_SECONDS: int = 30
+
+    RECOMMENDATION_STORE_ENABLED: bool = False  # serve precomputed top-N lists (see app.recommendation_store)
+    RECOMMENDATION_STORE_DIR: str = "artifacts/recommendations"  # relative to backend/
+    RECOMMENDATION_STORE_TOP_N: int = 60
+
+    RESPONSE_CACHE_BACKEND: str = "memory"  # "memory" (per worker), "redis" (shared) or "none"
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+    RESPONSE_CACHE_MAX_ENTRIES: int = 5000
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    SCHEDULE_CACHE_SIZE: int = 1000  # (scope, day) schedule snapshots kept per worker; 0 disables
+    SCHEDULE_CACHE_TTL_SECONDS: int = 300
+
+    QUERY_STATS_ENABLED: bool = False  # per-request SQL counts in X-DB-* response headers; for profiling
+    DEBUG_ENDPOINTS_ENABLED: bool = False  # mounts /debug/* (query stats); keep off in production
+
+    SEAT_EVENTS_BACKEND: str = "memory"  # "memory" (single worker) or "redis"
+    REDIS_URL: str = "redis://localhost:6379/0"
 
     @property
     def database_url(self) -> str:
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return (
             f"mysql+pymysql://{self.DB_USER}:{self.DB_PASSWORD}"
             f"@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
@@ -0,0 +1,265 @@
+"""Item-item similarity index: top-K neighbour lists per movie.
+
+Each movie gets a feature row made of two L2-normalised parts:
+
+* content: one-hot ``genre:`` / ``lang:`` tokens from ``Movie.genre`` and
+  ``Movie.language`` ("Action/Tech" -> ``genre:action``, ``genre:tech``)
+* co-rating: the movie's row of the recommender's item factors scaled by
+  the singular values, i.e. its rating column compressed to ``rank`` dims
+
+weighted so that a dot product is ``CONTENT_WEIGHT * content cosine +
+RATING_WEIGHT * co-rating cosine``. Neighbour lists are computed in blocks
+with ``argpartition``; a lookup is a dict hit plus a K-element slice.
+Movie writes patch only the lists they can affect.
+
+Requests never train the model: until ``sync`` has run with a trained one
+(the first pass of ``index_sync`` at startup), the index is built from the
+content part alone. ``sync`` rebuilds it when the model was retrained or
+the shared movie change counter shows writes this worker did not patch in.
+"""
+from __future__ import annotations
+import re
+import threading
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .models import Movie
+
+TOP_K = 20
+CONTENT_WEIGHT = 0.4
+RATING_WEIGHT = 0.6
+BLOCK_MOVIES = 1024
+
+_TOKEN_SPLIT = re.compile(r"[/,|&;]+")
+
+
+def split_values(value: str | None) -> list[str]:
+    # "Action/Tech" -> ["action", "tech"]
+    parts = (part.strip().lower() for part in _TOKEN_SPLIT.split(value or ""))
+    return list(dict.fromkeys(part for part in parts if part))
+
+
+def movie_tokens(genre: str | None, language: str | None) -> list[str]:
+    return [
+        f"{prefix}:{part}"
+        for prefix, value in (("genre", genre), ("lang", language))
+        for part in split_values(value)
+    ]
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._model = None
+        # movie_change_counter the index reflects; None until known
+        self._movie_changes: int | None = None
+        self._ids: list[int] = []
+        self._row: dict[int, int] = {}
+        self._tokens: dict[str, int] = {}
+        self._content = np.zeros((0, 0), dtype=np.float32)
+        self._latent = np.zeros((0, 0), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._features = np.zeros((0, 0), dtype=np.float32)
+        self._nbr_rows = np.zeros((0, TOP_K), dtype=np.int64)
+        self._nbr_scores = np.zeros((0, TOP_K), dtype=np.float32)
+        self._publish()
+
+    def _publish(self):
+        # Readers take one consistent snapshot without locking; writers build
+        # new arrays and swap this tuple last
+        self._lookup = (list(self._ids), self._row, self._alive, self._nbr_rows, self._nbr_scores)
+
+    # -- building -------------------------------------------------------
+
+    def ensure(self, db: Session) -> "SimilarityIndex":
+        # First use before the startup sync: build with whatever model is
+        # already trained (none = content only) rather than train one here
+        from .recommender import model_cache
+
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self._rebuild(db, model_cache.model)
+        return self
+
+    def sync(self, db: Session) -> bool:
+        # Background only: trains the model if needed, then rebuilds when it
+        # or the movies changed since the last build
+        from .crud import get_movie_changes
+        from .recommender import model_cache
+
+        model = model_cache.get(db)
+        if self._built and model is self._model and get_movie_changes(db) == self._movie_changes:
+            return False
+        with self._lock:
+            self._rebuild(db, model)
+        return True
+
+    def _rebuild(self, db: Session, model):
+        from .crud import get_movie_changes
+
+        # Counter first: a write landing between the two reads is in the
+        # snapshot and only costs one extra rebuild
+        changes = get_movie_changes(db)
+        movies = db.execute(select(Movie.id, Movie.genre, Movie.language)).all()
+        self.build(movies, model, changes)
+
+    def build(self, movies, model=None, changes: int | None = None):
+        # movies: iterable of (id, genre, language); changes: the
+        # movie_change_counter they were read at
+        with self._lock:
+            self._model = model
+            self._movie_changes = changes
+            self._ids = [m[0] for m in movies]
+            self._row = {mid: i for i, mid in enumerate(self._ids)}
+            self._tokens = {}
+            token_rows = [movie_tokens(m[1], m[2]) for m in movies]
+            for tokens in token_rows:
+                for token in tokens:
+                    self._tokens.setdefault(token, len(self._tokens))
+            self._content = np.zeros((len(self._ids), len(self._tokens)), dtype=np.float32)
+            for i, tokens in enumerate(token_rows):
+                self._content[i, [self._tokens[t] for t in tokens]] = 1.0
+            self._latent = np.stack([self._latent_for(mid) for mid in self._ids]) if self._ids else (
+                np.zeros((0, self._latent_width()), dtype=np.float32)
+            )
+            self._alive = np.ones(len(self._ids), dtype=bool)
+            self._features = self._combine(self._content, self._latent)
+            self._nbr_rows = np.full((len(self._ids), TOP_K), -1, dtype=np.int64)
+            self._nbr_scores = np.full((len(self._ids), TOP_K), -np.inf, dtype=np.float32)
+            self._recompute(np.arange(len(self._ids)))
+            self._built = True
+            self._publish()
+
+    def _latent_width(self) -> int:
+        return self._model.item_factors.shape[1] if self._model is not None else 0
+
+    def _latent_for(self, movie_id: int):
+        model = self._model
+        vector = np.zeros(self._latent_width(), dtype=np.float32)
+        if model is not None and movie_id in model.movie_idx:
+            vector[:] = model.item_factors[model.movie_idx[movie_id]]
+            if model.sigma is not None:
+                vector *= model.sigma
+        return vector
+
+    @staticmethod
+    def _combine(content, latent):
+        return np.hstack([
+            np.sqrt(CONTENT_WEIGHT) * _normalize_rows(content),
+            np.sqrt(RATING_WEIGHT) * _normalize_rows(latent),
+        ]).astype(np.float32)
+
+    def _recompute(self, rows):
+        # Full top-K for the given rows against every live movie
+        k = min(TOP_K, max(len(self._ids) - 1, 0))
+        for lo in range(0, len(rows), BLOCK_MOVIES):
+            block_rows = rows[lo:lo + BLOCK_MOVIES]
+            scores = self._features[block_rows] @ self._features.T
+            scores[:, ~self._alive] = -np.inf
+            scores[np.arange(len(block_rows)), block_rows] = -np.inf
+            self._nbr_rows[block_rows] = -1
+            self._nbr_scores[block_rows] = -np.inf
+            if k == 0:
+                continue
+            idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            vals = np.take_along_axis(scores, idx, axis=1)
+            ranked = np.argsort(-vals, axis=1, kind="stable")
+            idx = np.take_along_axis(idx, ranked, axis=1)
+            vals = np.take_along_axis(vals, ranked, axis=1)
+            # Zero similarity is not a neighbour
+            keep = vals > 0
+            self._nbr_rows[block_rows, :k] = np.where(keep, idx, -1)
+            self._nbr_scores[block_rows, :k] = np.where(keep, vals, -np.inf)
+
+    # -- incremental updates ---------------------------------------------
+
+    def upsert_movie(self, movie_id: int, genre: str | None, language: str | None, changes: int | None = None):
+        with self._lock:
+            if not self._built:
+                return
+            self._note_change(changes)
+            tokens = movie_tokens(genre, language)
+            new_tokens = [t for t in tokens if t not in self._tokens]
+            for token in new_tokens:
+                self._tokens[token] = len(self._tokens)
+            if new_tokens:
+                self._content = np.hstack([
+                    self._content, np.zeros((len(self._ids), len(new_tokens)), dtype=np.float32)
+                ])
+            content = np.zeros(len(self._tokens), dtype=np.float32)
+            content[[self._tokens[t] for t in tokens]] = 1.0
+
+            row = self._row.get(movie_id)
+            if row is None:
+                row = len(self._ids)
+                self._ids.append(movie_id)
+                self._row = {**self._row, movie_id: row}
+                self._content = np.vstack([self._content, content])
+                self._latent = np.vstack([self._latent, self._latent_for(movie_id)])
+                self._alive = np.append(self._alive, True)
+                self._nbr_rows = np.vstack([self._nbr_rows, np.full((1, TOP_K), -1, dtype=np.int64)])
+                self._nbr_scores = np.vstack([self._nbr_scores, np.full((1, TOP_K), -np.inf, dtype=np.float32)])
+            else:
+                self._content[row] = content
+                self._alive = self._alive.copy()
+                self._alive[row] = True
+            # Cheap to redo in full; only the affected neighbour lists are recomputed below
+            self._features = self._combine(self._content, self._latent)
+            self._refresh_around(row)
+
+    def remove_movie(self, movie_id: int, changes: int | None = None):
+        with self._lock:
+            if not self._built:
+                return
+            self._note_change(changes)
+            row = self._row.get(movie_id)
+            if row is None:
+                return
+            self._alive = self._alive.copy()
+            self._alive[row] = False
+            self._refresh_around(row)
+
+    def _note_change(self, changes: int | None):
+        # changes: the counter value this worker's own write committed at.
+        # Directly after the last known value means no other worker wrote in
+        # between, so the patch keeps the index current without a resync
+        if changes is not None and self._movie_changes is not None and changes == self._movie_changes + 1:
+            self._movie_changes = changes
+
+    def _refresh_around(self, row: int):
+        # Lists that contained the movie, or whose weakest entry it now beats
+        scores = self._features @ self._features[row]
+        holds = (self._nbr_rows == row).any(axis=1)
+        weakest = np.where(self._nbr_rows[:, -1] >= 0, self._nbr_scores[:, -1], 0)
+        beats = self._alive[row] & (scores > weakest)
+        affected = np.flatnonzero((holds | beats) & self._alive)
+        affected = affected[affected != row]
+        rows = np.append(affected, row) if self._alive[row] else affected
+        self._nbr_rows = self._nbr_rows.copy()
+        self._nbr_scores = self._nbr_scores.copy()
+        self._recompute(rows)
+        if not self._alive[row]:
+            self._nbr_rows[row] = -1
+            self._nbr_scores[row] = -np.inf
+        self._publish()
+
+    # -- lookups --------------------------------------------------------
+
+    def neighbors(self, movie_id: int, limit: int = TOP_K) -> list[tuple[int, float]]:
+        ids, row_map, alive, all_rows, all_scores = self._lookup
+        row = row_map.get(movie_id)
+        if row is None or not alive[row]:
+            return []
+        nbr_rows = all_rows[row, :limit]
+        nbr_scores = all_scores[row, :limit]
+        return [(ids[r], float(s)) for r, s in zip(nbr_rows, nbr_scores) if r >= 0]
+
+
+similarity_index = SimilarityIndex()
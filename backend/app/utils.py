@@ -3,3 +3,9 @@ from datetime import datetime, timezone
 def utcnow() -> datetime:
     # naive UTC datetime (consistent with MySQL DATETIME without timezone)
     return datetime.utcnow()
+
+def to_naive_utc(dt: datetime) -> datetime:
+    # Client timestamps may carry an offset ("...Z"); stored and compared as naive UTC
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,262 @@
+"""Offline recommender evaluation: quality and cost on one report.
+
+Generates a synthetic ratings dataset (or loads ``user_id,movie_id,score``
+rows from a CSV), holds out a share of every user's ratings, trains through
+``app.recommender.train_model`` and reports:
+
+* RMSE of the fold-in predictions on the held-out ratings
+* precision@k / recall@k of the batch top-N (held-out ratings >= 4 count as
+  relevant), next to a most-popular baseline
+* training time and peak traced memory
+* serving latency of the on-the-fly path and of a precomputed snapshot
+
+Run from the ``backend`` directory::
+
+    python -m benchmarks.recommender_eval --ratings 1000000
+    python -m benchmarks.recommender_eval --ratings 100000 --max-rmse 1.1 --min-precision 0.05
+
+The ``--max-*`` / ``--min-*`` gates make the command exit non-zero on a
+quality or speed regression, so it can run before a deploy.
+"""
+from __future__ import annotations
+import argparse
+import csv
+import json
+import resource
+import statistics
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from app.recommender import RecommenderModel, train_model, _top_from_model
+from app.recommendation_store import Snapshot, compute_top_n, write_snapshot
+from app.settings import settings
+from .onsale import percentile
+
+RELEVANT_SCORE = 4
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline recommender evaluation")
+    parser.add_argument("--ratings", type=int, default=100_000, help="Synthetic ratings to generate (10k-10M)")
+    parser.add_argument("--users", type=int, help="Default: ratings / 40")
+    parser.add_argument("--movies", type=int, default=5000)
+    parser.add_argument("--csv", help="Load user_id,movie_id,score rows instead of generating them")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Share of each user's ratings held out")
+    parser.add_argument("--k", type=int, default=10, help="Cut-off for precision@k / recall@k")
+    parser.add_argument("--rank", type=int, default=settings.RECOMMENDER_RANK)
+    parser.add_argument("--iterations", type=int, default=settings.RECOMMENDER_SVD_ITERATIONS)
+    parser.add_argument("--serving-samples", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_out", help="Also write the report to this file")
+    parser.add_argument("--max-rmse", type=float)
+    parser.add_argument("--min-precision", type=float)
+    parser.add_argument("--max-train-seconds", type=float)
+    return parser.parse_args(argv)
+
+
+def synthetic_ratings(n_ratings: int, n_users: int, n_movies: int, rng) -> np.ndarray:
+    # Hidden tastes + per-user bias + noise; a Zipf tail of movie popularity
+    rank = 8
+    taste_u = rng.standard_normal((n_users, rank)).astype(np.float32)
+    taste_m = rng.standard_normal((n_movies, rank)).astype(np.float32)
+    bias_u = rng.normal(0, 0.5, n_users).astype(np.float32)
+    ui = rng.integers(0, n_users, n_ratings)
+    mi = (rng.zipf(1.2, n_ratings) - 1) % n_movies
+    # Drop duplicate (user, movie) pairs: a user rates a movie once
+    _, first = np.unique(ui.astype(np.int64) * n_movies + mi, return_index=True)
+    ui, mi = ui[first], mi[first]
+    raw = 3 + bias_u[ui] + (taste_u[ui] * taste_m[mi]).sum(axis=1) / np.sqrt(rank) + rng.normal(0, 0.5, len(ui))
+    scores = np.clip(np.rint(raw), 1, 5)
+    return np.column_stack([ui + 1, mi + 1, scores]).astype(np.int64)
+
+
+def load_csv(path: str) -> np.ndarray:
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        rows = [r for r in reader if r and r[0].strip().lstrip("-").isdigit()]
+    return np.array(rows, dtype=np.int64).reshape(-1, 3)
+
+
+def split_holdout(rows: np.ndarray, fraction: float, rng):
+    # Per user, so every test user still has training ratings to fold in
+    order = rng.permutation(len(rows))
+    rows = rows[order]
+    rows = rows[np.argsort(rows[:, 0], kind="stable")]
+    _, starts, counts = np.unique(rows[:, 0], return_index=True, return_counts=True)
+    position = np.arange(len(rows)) - np.repeat(starts, counts)
+    n_test = np.floor(counts * fraction).astype(np.int64)
+    n_test[counts < 2] = 0
+    is_test = position < np.repeat(n_test, counts)
+    return rows[~is_test], rows[is_test]
+
+
+def fold_in(model: RecommenderModel, train: np.ndarray, user_ids: np.ndarray):
+    # Per-user (mean, vector) from training ratings, exactly as predict() does
+    model_ids = np.asarray(model.movie_ids, dtype=np.int64)
+    mi = np.searchsorted(model_ids, train[:, 1])
+    known = (mi < len(model_ids)) & (model_ids[np.minimum(mi, len(model_ids) - 1)] == train[:, 1])
+    ui = np.searchsorted(user_ids, train[known, 0])
+    mi, scores = mi[known], train[known, 2].astype(np.float64)
+    counts = np.bincount(ui, minlength=len(user_ids))
+    means = np.bincount(ui, weights=scores, minlength=len(user_ids)) / np.maximum(counts, 1)
+    centered = scores - means[ui]
+    k = model.item_factors.shape[1]
+    vectors = np.zeros((len(user_ids), k))
+    for j in range(k):
+        vectors[:, j] = np.bincount(ui, weights=centered * model.item_factors[mi, j], minlength=len(user_ids))
+    return means, vectors
+
+
+def rmse(model: RecommenderModel, train: np.ndarray, test: np.ndarray) -> float:
+    user_ids = np.unique(train[:, 0])
+    means, vectors = fold_in(model, train, user_ids)
+    model_ids = np.asarray(model.movie_ids, dtype=np.int64)
+    ui = np.searchsorted(user_ids, test[:, 0])
+    mi = np.searchsorted(model_ids, test[:, 1])
+    known = (mi < len(model_ids)) & (model_ids[np.minimum(mi, len(model_ids) - 1)] == test[:, 1])
+    # Movies never seen in training fall back to the user's mean
+    pred = means[ui].copy()
+    pred[known] += (vectors[ui[known]] * model.item_factors[mi[known]]).sum(axis=1)
+    pred = np.clip(pred, 1, 5)
+    return float(np.sqrt(np.mean((pred - test[:, 2]) ** 2)))
+
+
+def ranking_metrics(top_users: np.ndarray, top_movies: np.ndarray, test: np.ndarray, k: int) -> dict:
+    relevant = test[test[:, 2] >= RELEVANT_SCORE]
+    rel_by_user: dict[int, set[int]] = {}
+    for user_id, movie_id in relevant[:, :2].tolist():
+        rel_by_user.setdefault(user_id, set()).add(movie_id)
+    row = {int(u): i for i, u in enumerate(top_users)}
+    precisions, recalls = [], []
+    for user_id, rel in rel_by_user.items():
+        i = row.get(user_id)
+        recommended = top_movies[i, :k].tolist() if i is not None else []
+        hits = len(rel.intersection(recommended))
+        precisions.append(hits / k)
+        recalls.append(hits / len(rel))
+    return {
+        f"precision@{k}": round(statistics.fmean(precisions), 4) if precisions else 0.0,
+        f"recall@{k}": round(statistics.fmean(recalls), 4) if recalls else 0.0,
+        "evaluated_users": len(precisions),
+    }
+
+
+def popularity_top(train: np.ndarray, k: int):
+    # Most-rated movies each user has not rated yet
+    popular = np.bincount(train[:, 1]).argsort()[::-1][: k * 5]
+    rated: dict[int, set[int]] = {}
+    for user_id, movie_id in train[:, :2].tolist():
+        rated.setdefault(user_id, set()).add(movie_id)
+    users = np.array(sorted(rated), dtype=np.int64)
+    top = np.full((len(users), k), -1, dtype=np.int64)
+    for i, user_id in enumerate(users.tolist()):
+        picks = [m for m in popular.tolist() if m not in rated[user_id]][:k]
+        top[i, :len(picks)] = picks
+    return users, top
+
+
+def latency(values: list[float]) -> dict:
+    return {
+        "p50_ms": round(percentile(values, 50), 4),
+        "p99_ms": round(percentile(values, 99), 4),
+        "mean_ms": round(statistics.fmean(values), 4),
+    }
+
+
+def serving_latency(model: RecommenderModel, train: np.ndarray, top, samples: int, k: int, rng) -> dict:
+    user_ids = np.unique(train[:, 0])
+    sample = rng.choice(user_ids, size=min(samples, len(user_ids)), replace=False)
+    order = np.argsort(train[:, 0], kind="stable")
+    sorted_rows = train[order]
+    starts = np.searchsorted(sorted_rows[:, 0], sample)
+    ends = np.searchsorted(sorted_rows[:, 0], sample, side="right")
+    ratings = [dict(sorted_rows[s:e, 1:].tolist()) for s, e in zip(starts, ends)]
+
+    on_the_fly = []
+    for user_ratings in ratings:
+        t0 = time.perf_counter()
+        _top_from_model(model, user_ratings, k)
+        on_the_fly.append((time.perf_counter() - t0) * 1000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.RECOMMENDATION_STORE_DIR = tmp
+        snapshot = Snapshot(write_snapshot(model, *top))
+        precomputed = []
+        for user_id in sample.tolist():
+            t0 = time.perf_counter()
+            snapshot.lookup(user_id, k)
+            precomputed.append((time.perf_counter() - t0) * 1000)
+        del snapshot
+    return {"on_the_fly": latency(on_the_fly), "precomputed": latency(precomputed)}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = np.random.default_rng(args.seed)
+
+    if args.csv:
+        rows = load_csv(args.csv)
+    else:
+        rows = synthetic_ratings(args.ratings, args.users or max(args.ratings // 40, 10), args.movies, rng)
+    train, test = split_holdout(rows, args.holdout, rng)
+
+    settings.RECOMMENDER_RANK = args.rank
+    settings.RECOMMENDER_SVD_ITERATIONS = args.iterations
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    model = train_model(None, version=1, rows=train)
+    train_s = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if model is None:
+        raise SystemExit("Not enough ratings to train a model")
+
+    t0 = time.perf_counter()
+    top = compute_top_n(model, train, args.k)
+    batch_s = time.perf_counter() - t0
+
+    report = {
+        "config": {
+            "ratings": len(rows),
+            "train_ratings": len(train),
+            "test_ratings": len(test),
+            "users": int(len(np.unique(rows[:, 0]))),
+            "movies": int(len(np.unique(rows[:, 1]))),
+            "rank": args.rank,
+            "iterations": args.iterations,
+            "source": args.csv or "synthetic",
+            "seed": args.seed,
+        },
+        "quality": {
+            "rmse": round(rmse(model, train, test), 4),
+            **ranking_metrics(top[0], top[1], test, args.k),
+            "popularity_baseline": ranking_metrics(*popularity_top(train, args.k), test, args.k),
+        },
+        "cost": {
+            "train_seconds": round(train_s, 3),
+            "train_peak_traced_mb": round(peak / 2**20, 1),
+            "process_max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "batch_top_n_seconds": round(batch_s, 3),
+        },
+        "serving": serving_latency(model, train, top, args.serving_samples, args.k, rng),
+    }
+    print(json.dumps(report, indent=2))
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if args.max_rmse is not None and report["quality"]["rmse"] > args.max_rmse:
+        failures.append(f"rmse {report['quality']['rmse']} > {args.max_rmse}")
+    precision = report["quality"][f"precision@{args.k}"]
+    if args.min_precision is not None and precision < args.min_precision:
+        failures.append(f"precision@{args.k} {precision} < {args.min_precision}")
+    if args.max_train_seconds is not None and train_s > args.max_train_seconds:
+        failures.append(f"train_seconds {train_s:.3f} > {args.max_train_seconds}")
+    if failures:
+        raise SystemExit("Regression gate failed: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Movie search index benchmark.
+
+Builds the index behind ``GET /movies/search`` over a synthetic catalogue
+(no database needed) and reports build time, traced memory, query latency
+per query kind and incremental update latency. Run from the ``backend``
+directory::
+
+    python -m benchmarks.search --movies 100000
+    python -m benchmarks.search --movies 100000 --max-p99-ms 1.0
+
+``--max-p99-ms`` makes the command exit non-zero when any query kind's p99
+exceeds the budget. The build runs under ``tracemalloc``, which makes it
+several times slower than the startup build.
+"""
+from __future__ import annotations
+import argparse
+import itertools
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from app.search_index import SearchIndex, tokenize
+from .onsale import percentile
+
+SYLLABLES = [
+    "ka", "ri", "mo", "ten", "sa", "lor", "vi", "na", "dra", "gon", "el", "ta", "mir", "os", "quin",
+    "ber", "ul", "zan", "ho", "pe", "shi", "ra", "cor", "dex", "lu", "fa", "nym", "tro", "bel", "ix",
+]
+GENRES = ["Action", "Comedy", "Drama", "Horror", "Sci-Fi", "Romance", "Thriller", "Animation", "Documentary", "Tech"]
+LANGUAGES = ["English", "Sinhala", "Tamil", "Hindi", "Korean", "French"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Movie search index benchmark")
+    parser.add_argument("--movies", type=int, default=100_000)
+    parser.add_argument("--vocabulary", type=int, default=30_000, help="Distinct synthetic words")
+    parser.add_argument("--queries", type=int, default=5000, help="Queries per kind")
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_out", help="Also write the report to this file")
+    parser.add_argument("--max-p99-ms", type=float)
+    return parser.parse_args(argv)
+
+
+def synthetic_catalogue(args, rng: random.Random):
+    words = set()
+    while len(words) < args.vocabulary:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    words = sorted(words)
+    # Zipf-like word popularity: a few words appear in many titles
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    rng.shuffle(weights)
+    cum_weights = list(itertools.accumulate(weights))
+
+    def phrase(n):
+        return " ".join(rng.choices(words, cum_weights=cum_weights, k=n))
+
+    movies = []
+    for movie_id in range(1, args.movies + 1):
+        movies.append((
+            movie_id,
+            phrase(rng.randint(1, 5)).title(),
+            phrase(rng.randint(15, 40)) + ".",
+            "/".join(rng.sample(GENRES, rng.randint(1, 2))),
+            rng.choice(LANGUAGES),
+        ))
+    return movies
+
+
+def typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(len(word) - 1)
+    if rng.random() < 0.5:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]  # swap neighbours
+    return word[:i] + word[i + 1:]  # drop a letter
+
+
+def make_queries(movies, count: int, rng: random.Random) -> dict[str, list[str]]:
+    titles = [tokenize(m[1]) for m in rng.sample(movies, min(count, len(movies)))]
+    long_words = [[w for w in t if len(w) >= 5] or t for t in titles]
+    return {
+        "word": [rng.choice(t) + " " for t in titles],
+        "prefix": [rng.choice(t)[:3] for t in titles],
+        "two_words": [" ".join(t[:2]) for t in titles],
+        "typo": [typo(rng.choice(w), rng) + " " for w in long_words],
+        "typo_prefix": [typo(rng.choice(w), rng)[:5] for w in long_words],
+    }
+
+
+def latency(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50), 4),
+        "p99_ms": round(percentile(values, 99), 4),
+        "mean_ms": round(statistics.fmean(values), 4),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    movies = synthetic_catalogue(args, rng)
+    queries = make_queries(movies, args.queries, rng)
+
+    index = SearchIndex()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    index.build(movies)
+    build_s = time.perf_counter() - t0
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # First touch of a term sorts its postings; measure steady state
+    for kind_queries in queries.values():
+        for q in kind_queries:
+            index.search(q)
+
+    results = {}
+    for kind, kind_queries in queries.items():
+        timings, empty = [], 0
+        for q in kind_queries:
+            t0 = time.perf_counter()
+            hits = index.search(q, 10)
+            timings.append((time.perf_counter() - t0) * 1000)
+            empty += not hits
+        results[kind] = {**latency(timings), "empty_results": empty}
+
+    updates = []
+    for i in range(args.updates):
+        movie_id, title, description, genre, language = rng.choice(movies)
+        t0 = time.perf_counter()
+        index.upsert_movie(movie_id, title + " Redux", description, genre, language)
+        updates.append((time.perf_counter() - t0) * 1000)
+
+    report = {
+        "config": {"movies": args.movies, "vocabulary": args.vocabulary, "seed": args.seed},
+        "index": {**index.stats(), "build_seconds": round(build_s, 3), "traced_mb": round(traced / 2**20, 1)},
+        "queries": results,
+        "upsert_movie": latency(updates),
+    }
+    print(json.dumps(report, indent=2))
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.max_p99_ms is not None:
+        slow = [f"{kind} p99 {r['p99_ms']}ms" for kind, r in results.items() if r["p99_ms"] > args.max_p99_ms]
+        if slow:
+            raise SystemExit(f"Latency gate failed (> {args.max_p99_ms}ms): " + "; ".join(slow))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Item-similarity index benchmark.
+
+Builds the index used by ``GET /movies/{id}/similar`` and the cold-start
+recommender over a synthetic catalogue (no database needed), then reports
+build time, lookup latency and incremental update latency. Run from the
+``backend`` directory::
+
+    python -m benchmarks.similarity --movies 5000 --ratings 500000
+"""
+from __future__ import annotations
+import argparse
+import json
+import statistics
+import time
+import numpy as np
+from app.factorization import RatingMatrix, randomized_svd
+from app.recommender import RecommenderModel
+from app.similarity_index import SimilarityIndex
+from .onsale import percentile
+
+GENRES = ["Action", "Comedy", "Drama", "Horror", "Sci-Fi", "Romance", "Thriller", "Animation", "Documentary", "Tech"]
+LANGUAGES = ["English", "Sinhala", "Tamil", "Hindi", "Korean", "French"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Item-similarity index benchmark")
+    parser.add_argument("--movies", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--ratings", type=int, default=500_000)
+    parser.add_argument("--rank", type=int, default=10)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_out", help="Also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def synthetic_catalogue(args, rng):
+    movies = []
+    for movie_id in range(1, args.movies + 1):
+        genres = rng.choice(GENRES, size=rng.integers(1, 3), replace=False)
+        movies.append((movie_id, "/".join(genres), str(rng.choice(LANGUAGES))))
+
+    # Ratings driven by hidden user/movie tastes so co-rating structure exists
+    taste_u = rng.standard_normal((args.users, 5)).astype(np.float32)
+    taste_m = rng.standard_normal((args.movies, 5)).astype(np.float32)
+    ui = rng.integers(0, args.users, args.ratings)
+    mi = (rng.zipf(1.3, args.ratings) - 1) % args.movies  # a few blockbusters get most ratings
+    scores = np.clip(np.rint(3 + (taste_u[ui] * taste_m[mi]).sum(axis=1) / 2), 1, 5)
+    return movies, RatingMatrix(ui, mi, scores, args.users, args.movies)
+
+
+def timed_ms(fn, *a) -> float:
+    t0 = time.perf_counter()
+    fn(*a)
+    return (time.perf_counter() - t0) * 1000
+
+
+def latency(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50), 4),
+        "p99_ms": round(percentile(values, 99), 4),
+        "mean_ms": round(statistics.fmean(values), 4),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = np.random.default_rng(args.seed)
+    movies, ratings = synthetic_catalogue(args, rng)
+
+    t0 = time.perf_counter()
+    sigma, factors = randomized_svd(ratings.centered(), args.rank)
+    model = RecommenderModel(1, [m[0] for m in movies], factors, ratings.nnz, sigma.astype(np.float32))
+    train_s = time.perf_counter() - t0
+
+    index = SimilarityIndex()
+    t0 = time.perf_counter()
+    index.build(movies, model)
+    build_s = time.perf_counter() - t0
+
+    lookup_ids = rng.integers(1, args.movies + 1, args.lookups).tolist()
+    lookups = [timed_ms(index.neighbors, movie_id, 10) for movie_id in lookup_ids]
+
+    next_id = args.movies + 1
+    inserts, updates, removals = [], [], []
+    for _ in range(args.updates):
+        inserts.append(timed_ms(index.upsert_movie, next_id, str(rng.choice(GENRES)), str(rng.choice(LANGUAGES))))
+        next_id += 1
+        target = int(rng.integers(1, args.movies + 1))
+        updates.append(timed_ms(index.upsert_movie, target, str(rng.choice(GENRES)), str(rng.choice(LANGUAGES))))
+        removals.append(timed_ms(index.remove_movie, int(rng.integers(1, args.movies + 1))))
+
+    report = {
+        "config": {"movies": args.movies, "users": args.users, "ratings": ratings.nnz, "rank": args.rank},
+        "train_seconds": round(train_s, 3),
+        "index_build_seconds": round(build_s, 3),
+        "lookup": latency(lookups),
+        "insert_movie": latency(inserts),
+        "update_movie": latency(updates),
+        "remove_movie": latency(removals),
+    }
+    print(json.dumps(report, indent=2))
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+import pytest
+
+# Settings are read at import time: point the app at a throwaway SQLite
+# database and keep the background loops off before anything imports it
+_DB_DIR = tempfile.mkdtemp(prefix="movietickets-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ["LOCK_REAPER_ENABLED"] = "false"
+os.environ["RECOMMENDER_REFRESH_ENABLED"] = "false"
+os.environ["MOVIE_INDEX_SYNC_ENABLED"] = "false"
+os.environ["BOOKING_EXECUTOR_ENABLED"] = "false"
+os.environ["SEAT_EVENTS_BACKEND"] = "memory"
+os.environ["RESPONSE_CACHE_BACKEND"] = "memory"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.db import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.query_stats import instrument  # noqa: E402
+from app.search_index import search_index  # noqa: E402
+
+instrument(engine)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        assert c.post("/admin/seed").status_code == 200
+        # Wait for the startup index build so its queries don't land in a budget
+        db = SessionLocal()
+        try:
+            search_index.ensure(db)
+        finally:
+            db.close()
+        yield c
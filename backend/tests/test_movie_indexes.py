@@ -0,0 +1,73 @@
+from app import crud, recommender
+from app.db import SessionLocal
+from app.index_sync import sync_movie_indexes
+from app.models import Movie
+from app.search_index import search_index
+from app.similarity_index import similarity_index
+
+
+def _first_movie(client):
+    return client.get("/showtimes/1/seats").json()["movie"]
+
+
+def test_similar_movies_never_train_the_model(client, monkeypatch):
+    def no_training(*args, **kwargs):
+        raise AssertionError("trained in a request")
+
+    monkeypatch.setattr(recommender, "train_model", no_training)
+    monkeypatch.setattr(similarity_index, "_built", False)
+    response = client.get(f"/movies/{_first_movie(client)['id']}/similar")
+    assert response.status_code == 200
+
+
+def test_sync_picks_up_movies_written_by_other_workers(client):
+    movie = _first_movie(client)
+    sync_movie_indexes()
+    assert sync_movie_indexes() == []
+
+    # Written straight to the database, as another worker would
+    db = SessionLocal()
+    try:
+        twin = Movie(title="Twin", duration_mins=90, genre=movie["genre"], language=movie["language"])
+        db.add(twin)
+        crud.bump_movie_changes(db)
+        db.commit()
+        twin_id = twin.id
+    finally:
+        db.close()
+    assert twin_id not in [mid for mid, _ in similarity_index.neighbors(movie["id"])]
+
+    assert "similarity" in sync_movie_indexes()
+    assert twin_id in [mid for mid, _ in similarity_index.neighbors(movie["id"])]
+
+
+def test_own_movie_writes_need_no_resync(client):
+    sync_movie_indexes()
+    response = client.post("/movies", json={"title": "Patched locally", "genre": "Drama"})
+    assert response.status_code == 201
+    assert sync_movie_indexes() == []
+
+
+def test_search_drops_movies_deleted_by_other_workers(client):
+    # The shortest title ranks first
+    titles = ["Zanzibar", "Zanzibar nights", "Zanzibar mornings"]
+    ids = [client.post("/movies", json={"title": title}).json()["id"] for title in titles]
+    sync_movie_indexes()
+    hits = client.get("/movies/search", params={"q": "zanzibar", "limit": 2}).json()
+    assert hits[0]["movie"]["id"] == ids[0]
+
+    # Deleted straight in the database, as another worker would
+    db = SessionLocal()
+    try:
+        db.delete(db.get(Movie, ids[0]))
+        crud.bump_movie_changes(db)
+        db.commit()
+    finally:
+        db.close()
+
+    # Not synced yet: the stale hit is filtered out and the page refilled
+    hits = client.get("/movies/search", params={"q": "zanzibar", "limit": 2}).json()
+    assert {hit["movie"]["id"] for hit in hits} == set(ids[1:])
+
+    assert "search" in sync_movie_indexes()
+    assert ids[0] not in [mid for mid, _ in search_index.search("zanzibar", 3)]
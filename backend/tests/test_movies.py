@@ -0,0 +1,36 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from app.utils import utcnow
+
+
+@pytest.fixture
+def local_clock_ahead_of_utc(monkeypatch):
+    # Code that reads the local wall clock instead of UTC is 5.5 hours off here
+    monkeypatch.setenv("TZ", "Asia/Colombo")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def _movie_showing_at(client, screen_id, start_time):
+    movie = client.post("/movies", json={"title": f"Showing {start_time:%H:%M}", "duration_mins": 60}).json()
+    response = client.post("/showtimes", json={
+        "movie_id": movie["id"], "screen_id": screen_id, "price": "10.00", "start_time": start_time.isoformat(),
+    })
+    assert response.status_code == 201, response.text
+    return movie["id"]
+
+
+def test_showing_within_days_window_is_utc(client, local_clock_ahead_of_utc):
+    screen_id = client.get("/showtimes/1/seats").json()["screen"]["id"]
+    now = utcnow().replace(microsecond=0)
+    inside = _movie_showing_at(client, screen_id, now + timedelta(days=1, minutes=-10))
+    outside = _movie_showing_at(client, screen_id, now + timedelta(days=1, minutes=70))
+
+    ids = {m["id"] for m in client.get("/movies", params={"showing_within_days": 1}).json()}
+    assert inside in ids
+    assert outside not in ids
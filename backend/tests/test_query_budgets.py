@@ -0,0 +1,32 @@
+from app.query_stats import query_budget
+from app.seat_state import seat_state_cache
+
+
+def test_my_ratings_joins_movies(client):
+    for movie_id in (1, 2):
+        assert client.post("/ratings", json={"movie_id": movie_id, "score": 4}).status_code == 200
+    with query_budget(max_queries=2, max_repeats=0):
+        response = client.get("/ratings/me")
+    assert response.status_code == 200
+    assert len(response.json()) >= 2
+
+
+def test_seat_map_cold_and_cached(client):
+    showtime_id = 1
+    seat_id = client.get(f"/showtimes/{showtime_id}/seats").json()["seats"][0]["seat"]["id"]
+    assert client.post(f"/showtimes/{showtime_id}/lock-seats", json={"seat_ids": [seat_id]}).status_code == 200
+    seat_state_cache.clear()
+
+    # Showtime with screen/theater, the seat rows, then the movie
+    with query_budget(max_queries=3, max_repeats=0):
+        response = client.get(f"/showtimes/{showtime_id}/seats")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    # Cached: the seat_version check and the movie, which is never cached
+    with query_budget(max_queries=2):
+        response = client.get(f"/showtimes/{showtime_id}/seats")
+    assert response.status_code == 200
+    with query_budget(max_queries=2):
+        response = client.get(f"/showtimes/{showtime_id}/seats", headers={"If-None-Match": etag})
+    assert response.status_code == 304
@@ -0,0 +1,55 @@
+from app import crud
+from app.db import SessionLocal
+from app.rating_import import RatingImport
+
+
+def _movie_ids(client, count):
+    return [m["id"] for m in client.get("/movies").json()][:count]
+
+
+def test_failed_chunk_keeps_committed_chunks_and_bumps_the_counter_once(client, monkeypatch):
+    first, second = _movie_ids(client, 2)
+    real = crud.bulk_upsert_ratings
+    calls = []
+
+    def flaky(db, rows):
+        calls.append(crud.get_rating_changes(db))
+        if len(calls) == 2:
+            raise RuntimeError("boom")
+        return real(db, rows)
+
+    monkeypatch.setattr(crud, "bulk_upsert_ratings", flaky)
+    db = SessionLocal()
+    try:
+        before = crud.get_rating_changes(db)
+        job = RatingImport(db, "csv", chunk_size=2)
+        job.feed([f"1,{first},4", f"1,{second},5", f"1,{first},3", f"1,{second},2"])
+        report = job.finish()
+        after = crud.get_rating_changes(db)
+    finally:
+        db.close()
+
+    assert report["written"] == 2
+    assert report["chunks"] == [
+        {"first_line": 1, "last_line": 2, "written": 2, "error": None},
+        {"first_line": 3, "last_line": 4, "written": 0, "error": "RuntimeError"},
+    ]
+    assert report["failed"].startswith("lines 3-4")
+    # Not bumped chunk by chunk, only once the import ended
+    assert calls == [before, before]
+    assert after == before + 2
+
+
+def test_bulk_endpoint_reports_partial_failure_as_multi_status(client, monkeypatch):
+    def broken(db, rows):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(crud, "bulk_upsert_ratings", broken)
+    movie_id = _movie_ids(client, 1)[0]
+    response = client.post(
+        "/ratings/bulk", content=f"1,{movie_id},4\n", headers={"content-type": "text/csv"},
+    )
+    assert response.status_code == 207
+    body = response.json()
+    assert body["written"] == 0
+    assert body["chunks"] == [{"first_line": 1, "last_line": 1, "written": 0, "error": "RuntimeError"}]
@@ -0,0 +1,46 @@
+import asyncio
+
+from app.routers.showtimes import stream_seat_events
+from app.seat_events import broadcaster
+from app.seat_state import seat_state_cache
+
+
+class _Request:
+    def __init__(self, polls: int):
+        self.polls = polls
+
+    async def is_disconnected(self):
+        self.polls -= 1
+        return self.polls < 0
+
+
+def _event(version: int) -> dict:
+    return {"event": "locked", "showtime_id": 1, "version": version, "status": "LOCKED",
+            "seat_ids": [], "locked_until": None}
+
+
+def test_stream_subscribes_before_hello_and_always_unsubscribes(client):
+    async def run():
+        response = await stream_seat_events(1, _Request(polls=2))
+        # Nothing is subscribed until the body is iterated
+        assert broadcaster.subscriber_count(1) == 0
+        body = response.body_iterator
+        await body.__anext__()  # retry
+        hello = await body.__anext__()
+        assert hello.startswith("event: hello")
+        assert broadcaster.subscriber_count(1) == 1
+        version = int(hello.splitlines()[1].removeprefix("id: "))
+
+        # Already covered by hello's version, then a newer change
+        broadcaster.publish(_event(version))
+        broadcaster.publish(_event(version + 1))
+        await asyncio.sleep(0.05)
+        rest = [chunk async for chunk in body]
+        assert [c.splitlines()[1] for c in rest if c.startswith("event:")] == [f"id: {version + 1}"]
+        assert broadcaster.subscriber_count(1) == 0
+
+    try:
+        asyncio.run(run())
+    finally:
+        # The made-up events must not linger in the cached seat state
+        seat_state_cache.clear()
@@ -0,0 +1,103 @@
+import time
+
+import pytest
+from sqlalchemy import delete, update
+
+from app.db import SessionLocal
+from app.models import Movie, ShowtimeSeat
+from app.utils import utcnow
+
+
+def _screen_and_movie(client):
+    showtime = client.get("/showtimes/1/seats").json()
+    return showtime["screen"]["id"], showtime["movie"]["id"]
+
+
+def test_create_showtime_accepts_utc_offsets(client):
+    screen_id, movie_id = _screen_and_movie(client)
+    body = {"movie_id": movie_id, "screen_id": screen_id, "price": "10.00"}
+
+    # What the frontend sends: new Date(...).toISOString()
+    response = client.post("/showtimes", json={**body, "start_time": "2031-03-01T10:30:00.000Z"})
+    assert response.status_code == 201, response.text
+    assert response.json()["start_time"] == "2031-03-01T10:30:00"
+
+    # The same instant with another offset overlaps it
+    response = client.post("/showtimes", json={**body, "start_time": "2031-03-01T12:30:00+02:00"})
+    assert response.status_code == 409
+    assert response.json()["detail"]["conflicts"]
+
+
+def test_bulk_showtimes_accept_utc_offsets(client):
+    screen_id, movie_id = _screen_and_movie(client)
+    slot = {"movie_id": movie_id, "screen_id": screen_id, "price": "10.00", "start_time": "2031-04-01T10:30:00Z"}
+    response = client.post("/showtimes/bulk", json={"slots": [slot]})
+    assert response.status_code == 201, response.text
+
+    recurrence = {
+        "movie_id": movie_id,
+        "screen_ids": [screen_id],
+        "start_date": "2031-04-01",
+        "end_date": "2031-04-01",
+        "times": ["11:00:00Z"],
+        "price": "10.00",
+    }
+    response = client.post("/showtimes/bulk", json={"recurrences": [recurrence]})
+    assert response.status_code == 409
+    assert response.json()["detail"]["conflicts"]
+
+
+def test_availability_reports_zeros_without_seat_inventory(client):
+    screen_id, movie_id = _screen_and_movie(client)
+    response = client.post("/showtimes", json={
+        "movie_id": movie_id, "screen_id": screen_id, "price": "10.00", "start_time": "2031-05-01T10:00:00",
+    })
+    showtime_id = response.json()["id"]
+    db = SessionLocal()
+    try:
+        db.execute(delete(ShowtimeSeat).where(ShowtimeSeat.showtime_id == showtime_id))
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.get("/showtimes/availability", params=[("ids", showtime_id), ("ids", 999999)])
+    assert response.status_code == 200
+    assert response.json() == [
+        {"showtime_id": showtime_id, "total": 0, "available": 0, "locked": 0, "booked": 0},
+    ]
+
+
+def test_seat_map_reflects_movie_edits_from_other_workers(client):
+    first = client.get("/showtimes/1/seats")
+    etag = first.headers["etag"]
+    movie_id = first.json()["movie"]["id"]
+
+    # Written straight to the database, as another worker would
+    db = SessionLocal()
+    try:
+        db.execute(update(Movie).where(Movie.id == movie_id).values(title="Retitled elsewhere"))
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.get("/showtimes/1/seats", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["movie"]["title"] == "Retitled elsewhere"
+    assert response.headers["etag"] != etag
+    assert response.json()["version"] == first.json()["version"]
+
+
+@pytest.mark.parametrize("tz", ["Etc/GMT-14", "Etc/GMT+12"])
+def test_schedule_defaults_to_the_utc_day(client, monkeypatch, tz):
+    # UTC+14 and UTC-12: at any hour one of them is on another date than UTC
+    monkeypatch.setenv("TZ", tz)
+    time.tzset()
+    try:
+        before = utcnow().date()
+        response = client.get("/showtimes/schedule")
+        after = utcnow().date()
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+    assert response.status_code == 200
+    assert response.json()["date_from"] in (before.isoformat(), after.isoformat())
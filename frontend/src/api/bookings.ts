@@ -1,5 +1,5 @@
 import { api } from './client'
-import type { Booking } from './types'
+import type { Booking, BookingSummary, BookingSummaryPage } from './types'
 
 export async function createBooking(showtimeId: number, seatIds: number[]): Promise<Booking> {
   const { data } = await api.post<Booking>('/bookings', { showtime_id: showtimeId, seat_ids: seatIds })
@@ -10,3 +10,10 @@ export async function fetchMyBookings(): Promise<Booking[]> {
   const { data } = await api.get<Booking[]>('/bookings/me')
   return data
 }
+
+export async function fetchMyBookingSummaries(cursor?: string | null, limit = 20): Promise<BookingSummaryPage> {
+  const res = await api.get<BookingSummary[]>('/bookings/me/summary', {
+    params: { limit, ...(cursor ? { cursor } : {}) },
+  })
+  return { items: res.data, nextCursor: res.headers['x-next-cursor'] ?? null }
+}
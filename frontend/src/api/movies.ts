@@ -1,5 +1,5 @@
 import { api } from './client'
-import type { Movie, Showtime } from './types'
+import type { Movie, MovieSearchResult, Showtime, SimilarMovie } from './types'
 
 export type MovieInput = {
   title: string
@@ -21,6 +21,12 @@ export async function fetchMovies(): Promise<Movie[]> {
   return data
 }
 
+// The last word is matched as a prefix unless q ends in a space; small typos are tolerated
+export async function searchMovies(q: string, limit = 50): Promise<MovieSearchResult[]> {
+  const { data } = await api.get<MovieSearchResult[]>('/movies/search', { params: { q, limit } })
+  return data
+}
+
 export async function fetchMovie(movieId: number): Promise<Movie> {
   const { data } = await api.get<Movie>(`/movies/${movieId}`)
   return data
@@ -39,3 +45,8 @@ export async function fetchShowtimes(movieId: number, date: string): Promise<Sho
   const { data } = await api.get<Showtime[]>(`/movies/${movieId}/showtimes`, { params: { date } })
   return data
 }
+
+export async function fetchSimilarMovies(movieId: number, limit = 6): Promise<SimilarMovie[]> {
+  const { data } = await api.get<SimilarMovie[]>(`/movies/${movieId}/similar`, { params: { limit } })
+  return data
+}
@@ -15,11 +15,19 @@ export async function fetchMyRatingForMovie(movieId: number) {
   return data
 }
 
-export async function fetchMovieStats(movieId: number): Promise<{ movie_id: number; avg_score: number; count: number }> {
+export type MovieStats = { movie_id: number; avg_score: number; count: number; histogram: number[] }
+
+export async function fetchMovieStats(movieId: number): Promise<MovieStats> {
   const { data } = await api.get(`/ratings/movie/${movieId}/stats`)
   return data
 }
 
+// Stats for every rated movie in one request (used by the movie list)
+export async function fetchAllMovieStats(): Promise<MovieStats[]> {
+  const { data } = await api.get('/ratings/stats')
+  return data
+}
+
 export async function deleteRating(movieId: number) {
   const { data } = await api.delete(`/ratings/movie/${movieId}`)
   return data
@@ -1,5 +1,5 @@
-import { api } from './client'
-import type { Screen, SeatMap, Showtime } from './types'
+import { api, API_BASE } from './client'
+import type { Schedule, Screen, SeatAvailability, SeatEvent, SeatMap, SeatMapDelta, Showtime } from './types'
 
 export type ShowtimeInput = {
   movie_id: number
@@ -13,16 +13,99 @@ export async function createShowtime(payload: ShowtimeInput): Promise<Showtime>
   return data
 }
 
+export type ShowtimeRecurrence = {
+  movie_id: number
+  screen_ids: number[]
+  start_date: string  // YYYY-MM-DD
+  end_date: string  // inclusive
+  times: string[]  // HH:MM
+  weekdays?: number[]  // 0 = Monday; omit for every day
+  price: number
+}
+
+// All or nothing: a 409 lists every slot that overlaps an occupied screen
+export async function createShowtimesBulk(
+  payload: { slots?: ShowtimeInput[]; recurrences?: ShowtimeRecurrence[] },
+): Promise<{ created: number; showtime_ids: number[] }> {
+  const { data } = await api.post('/showtimes/bulk', payload)
+  return data
+}
+
 export async function fetchScreens(): Promise<Screen[]> {
   const { data } = await api.get<Screen[]>('/showtimes/screens')
   return data
 }
 
+export type ScheduleParams = {
+  city?: string
+  theater_id?: number
+  date_from?: string  // YYYY-MM-DD (a UTC day), defaults to today in UTC
+  date_to?: string  // inclusive, at most 14 days after date_from
+}
+
+// Every movie's showtimes for a city/theater in one request
+export async function fetchSchedule(params: ScheduleParams = {}): Promise<Schedule> {
+  const { data } = await api.get<Schedule>('/showtimes/schedule', { params })
+  return data
+}
+
+// Seat counts for many showtimes in one request (briefly cached server-side)
+export async function fetchAvailability(showtimeIds: number[]): Promise<SeatAvailability[]> {
+  if (showtimeIds.length === 0) return []
+  const { data } = await api.get<SeatAvailability[]>('/showtimes/availability', {
+    params: { ids: showtimeIds },
+    paramsSerializer: { indexes: null },  // ids=1&ids=2
+  })
+  return data
+}
+
+export function availabilityLabel(a: SeatAvailability | undefined): string | null {
+  if (!a || a.total === 0) return null
+  if (a.available === 0) return 'Sold out'
+  if (a.available <= Math.max(5, a.total * 0.1)) return `Almost full • ${a.available} left`
+  return `${a.available} left`
+}
+
 export async function fetchSeatMap(showtimeId: number): Promise<SeatMap> {
   const { data } = await api.get<SeatMap>(`/showtimes/${showtimeId}/seats`)
   return data
 }
 
+// Polls only the seats that changed since `prev` was fetched and merges them in.
+export async function refreshSeatMap(prev: SeatMap): Promise<SeatMap> {
+  const { data } = await api.get<SeatMapDelta>(`/showtimes/${prev.showtime_id}/seats`, {
+    params: { since_version: prev.version },
+  })
+  if (data.seats.length === 0) return prev
+  const changed = new Map(data.seats.map(s => [s.seat_id, s]))
+  return {
+    ...prev,
+    version: data.version,
+    seats: prev.seats.map(s => {
+      const c = changed.get(s.seat.id)
+      return c ? { ...s, status: c.status, locked_until: c.locked_until } : s
+    }),
+  }
+}
+
+export function seatEventsUrl(showtimeId: number): string {
+  return `${API_BASE}/showtimes/${showtimeId}/seats/events`
+}
+
+// Applies a pushed seat event; returns null when events were missed and the map must be refetched.
+export function applySeatEvent(prev: SeatMap, ev: SeatEvent): SeatMap | null {
+  if (ev.version <= prev.version) return prev
+  if (ev.version !== prev.version + 1) return null
+  const changed = new Set(ev.seat_ids)
+  return {
+    ...prev,
+    version: ev.version,
+    seats: prev.seats.map(s =>
+      changed.has(s.seat.id) ? { ...s, status: ev.status, locked_until: ev.locked_until } : s
+    ),
+  }
+}
+
 export async function lockSeats(showtimeId: number, seatIds: number[]): Promise<{ showtime_id: number; locked_seat_ids: number[]; lock_ttl_seconds: number }> {
   const { data } = await api.post(`/showtimes/${showtimeId}/lock-seats`, { seat_ids: seatIds })
   return data
@@ -9,6 +9,16 @@ export type Movie = {
   release_date?: string | null
 }
 
+export type SimilarMovie = {
+  movie: Movie
+  similarity: number
+}
+
+export type MovieSearchResult = {
+  movie: Movie
+  score: number
+}
+
 export type Theater = {
   id: number
   name: string
@@ -35,6 +45,27 @@ export type Showtime = {
   screen?: Screen | null
 }
 
+export type ScheduleDay = {
+  date: string
+  showtimes: number
+  movies: number
+}
+
+export type Schedule = {
+  date_from: string
+  date_to: string
+  days: ScheduleDay[]
+  movies: { movie: Movie; showtimes: Showtime[] }[]
+}
+
+export type SeatAvailability = {
+  showtime_id: number
+  total: number
+  available: number
+  locked: number
+  booked: number
+}
+
 export type Seat = {
   id: number
   screen_id: number
@@ -51,6 +82,7 @@ export type ShowtimeSeat = {
 
 export type SeatMap = {
   showtime_id: number
+  version: number
   screen: Screen
   seats: ShowtimeSeat[]
   price: string
@@ -59,6 +91,28 @@ export type SeatMap = {
   movie: Movie
 }
 
+export type SeatState = {
+  seat_id: number
+  status: ShowtimeSeat['status']
+  locked_until?: string | null
+}
+
+export type SeatMapDelta = {
+  showtime_id: number
+  version: number
+  since_version: number
+  seats: SeatState[]
+}
+
+export type SeatEvent = {
+  event: 'locked' | 'booked' | 'released'
+  showtime_id: number
+  version: number
+  status: ShowtimeSeat['status']
+  seat_ids: number[]
+  locked_until?: string | null
+}
+
 export type Booking = {
   id: number
   user_id: number
@@ -69,3 +123,29 @@ export type Booking = {
   created_at: string
   seats: { seat: Seat }[]
 }
+
+// One row of the booking history, as written when the booking was made
+export type BookingSummary = {
+  id: number
+  status: string
+  created_at: string | null
+  total_amount: string
+  showtime_id: number
+  start_time: string
+  price: string
+  movie_id: number
+  movie_title: string
+  poster_url?: string | null
+  genre?: string | null
+  language?: string | null
+  duration_mins: number
+  screen_name: string
+  theater_name?: string | null
+  theater_city?: string | null
+  seats: string[]
+}
+
+export type BookingSummaryPage = {
+  items: BookingSummary[]
+  nextCursor: string | null
+}
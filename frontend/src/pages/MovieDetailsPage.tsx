@@ -1,7 +1,8 @@
 import React, { useMemo, useState } from 'react'
 import { useParams, Link } from 'react-router-dom'
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
-import { fetchMovie, fetchShowtimes } from '../api/movies'
+import { fetchMovie, fetchShowtimes, fetchSimilarMovies } from '../api/movies'
+import { availabilityLabel, fetchAvailability } from '../api/showtimes'
 import { posterSrc } from '../api/client'
 import { rateMovie, fetchMyRatingForMovie, fetchMovieStats } from '../api/ratings'
 
@@ -60,6 +61,30 @@ function StarRating({ movieId }: { movieId: number }) {
   )
 }
 
+function MoreLikeThis({ movieId }: { movieId: number }) {
+  const similarQ = useQuery({ queryKey: ['similar', movieId], queryFn: () => fetchSimilarMovies(movieId) })
+  const similar = similarQ.data ?? []
+  if (similar.length === 0) return null
+
+  return (
+    <div className="section" style={{marginTop: 14}}>
+      <div className="h2">More like this</div>
+      <div className="row" style={{marginTop: 10, gap: 12}}>
+        {similar.map(({ movie }) => (
+          <Link key={movie.id} to={`/movies/${movie.id}`} style={{width: 100}}>
+            <img
+              src={posterSrc(movie.poster_url)}
+              alt={movie.title}
+              style={{width: 100, height: 150, objectFit:'cover', borderRadius: 12, border:'1px solid rgba(255,255,255,0.10)'}}
+            />
+            <div className="small" style={{marginTop: 4, lineHeight: 1.3}}>{movie.title}</div>
+          </Link>
+        ))}
+      </div>
+    </div>
+  )
+}
+
 export default function MovieDetailsPage() {
   const params = useParams()
   const movieId = Number(params.id)
@@ -70,6 +95,17 @@ export default function MovieDetailsPage() {
 
   const movie = movieQ.data
   const showtimes = showtimesQ.data ?? []
+  const showtimeIds = showtimes.map(st => st.id)
+  const availabilityQ = useQuery({
+    queryKey: ['availability', showtimeIds],
+    queryFn: () => fetchAvailability(showtimeIds),
+    enabled: showtimeIds.length > 0,
+    refetchInterval: 30_000,
+  })
+  const availabilityById = useMemo(
+    () => new Map((availabilityQ.data ?? []).map(a => [a.showtime_id, a])),
+    [availabilityQ.data],
+  )
 
   const theaterName = useMemo(() => showtimes[0]?.screen?.theater?.name, [showtimes])
 
@@ -128,9 +164,11 @@ export default function MovieDetailsPage() {
                 {showtimes.map(st => {
                   const start = new Date(st.start_time)
                   const label = start.toLocaleString([], { hour: '2-digit', minute: '2-digit' })
+                  const seatsLeft = availabilityLabel(availabilityById.get(st.id))
                   return (
                     <Link key={st.id} to={`/showtimes/${st.id}/seats`} className="btn">
                       {label} • Rs {st.price}
+                      {seatsLeft && <span className="small" style={{display: 'block', opacity: 0.75}}>{seatsLeft}</span>}
                     </Link>
                   )
                 })}
@@ -138,6 +176,8 @@ export default function MovieDetailsPage() {
             )}
           </div>
 
+          <MoreLikeThis movieId={movieId} />
+
           <div className="small" style={{marginTop: 12, opacity: 0.8}}>
             <Link to="/">← Back to movies</Link>
           </div>
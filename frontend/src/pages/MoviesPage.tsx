@@ -1,19 +1,34 @@
 import React, { useMemo, useState } from 'react'
-import { useQuery } from '@tanstack/react-query'
-import { fetchMovies } from '../api/movies'
+import { keepPreviousData, useQuery } from '@tanstack/react-query'
+import { fetchMovies, searchMovies } from '../api/movies'
+import { fetchAllMovieStats } from '../api/ratings'
 import { posterSrc } from '../api/client'
 import { Link } from 'react-router-dom'
 
 export default function MoviesPage() {
   const { data, isLoading, error } = useQuery({ queryKey: ['movies'], queryFn: fetchMovies })
+  const statsQ = useQuery({ queryKey: ['moviestats'], queryFn: fetchAllMovieStats })
   const [q, setQ] = useState('')
+  // Ranked, typo-tolerant results from the backend index; the previous
+  // results stay on screen while the next keystroke's request is in flight
+  const search = q.trimStart()
+  const searchQ = useQuery({
+    queryKey: ['moviesearch', search],
+    queryFn: () => searchMovies(search),
+    enabled: search.trim() !== '',
+    placeholderData: keepPreviousData,
+  })
+
+  const statsById = useMemo(
+    () => new Map((statsQ.data ?? []).map(s => [s.movie_id, s])),
+    [statsQ.data],
+  )
 
   const filtered = useMemo(() => {
     if (!data) return []
-    const qq = q.trim().toLowerCase()
-    if (!qq) return data
-    return data.filter(m => m.title.toLowerCase().includes(qq) || (m.genre ?? '').toLowerCase().includes(qq))
-  }, [data, q])
+    if (!search.trim()) return data
+    return (searchQ.data ?? []).map(r => r.movie)
+  }, [data, search, searchQ.data])
 
   if (isLoading) return <div className="section">Loading movies…</div>
   if (error) return <div className="section">Failed to load movies. Make sure backend is running and seeded.</div>
@@ -22,31 +37,39 @@ export default function MoviesPage() {
     <>
       <div className="row" style={{justifyContent:'space-between'}}>
         <h1 className="h1">Movies</h1>
-        <input className="input" value={q} onChange={(e)=>setQ(e.target.value)} placeholder="Search title / genre…" />
+        <input className="input" value={q} onChange={(e)=>setQ(e.target.value)} placeholder="Search title / genre / language…" />
       </div>
 
       <div className="cardgrid">
-        {filtered.map(movie => (
-          <div key={movie.id} className="card">
-            <Link to={`/movies/${movie.id}`}>
-              <img src={posterSrc(movie.poster_url)} alt={movie.title} />
-            </Link>
-            <div className="cardbody">
-              <Link to={`/movies/${movie.id}`} style={{fontWeight: 700}}>{movie.title}</Link>
-              <div className="row">
-                {movie.genre && <span className="badge">{movie.genre}</span>}
-                {movie.language && <span className="badge">{movie.language}</span>}
-                <span className="badge">{movie.duration_mins} mins</span>
-              </div>
-              <div className="small" style={{opacity:0.8, lineHeight:1.35}}>
-                {(movie.description ?? '').slice(0, 90)}{(movie.description ?? '').length > 90 ? '…' : ''}
-              </div>
-              <Link to={`/movies/${movie.id}/show`} className="btn" style={{marginTop: 6, textAlign:'center', background:'rgba(76,175,80,0.22)', borderColor:'rgba(76,175,80,0.5)', fontWeight: 600, fontSize: 13}}>
-                Book Now
+        {filtered.map(movie => {
+          const stats = statsById.get(movie.id)
+          return (
+            <div key={movie.id} className="card">
+              <Link to={`/movies/${movie.id}`}>
+                <img src={posterSrc(movie.poster_url)} alt={movie.title} />
               </Link>
+              <div className="cardbody">
+                <Link to={`/movies/${movie.id}`} style={{fontWeight: 700}}>{movie.title}</Link>
+                <div className="row">
+                  {movie.genre && <span className="badge">{movie.genre}</span>}
+                  {movie.language && <span className="badge">{movie.language}</span>}
+                  <span className="badge">{movie.duration_mins} mins</span>
+                  {stats && stats.count > 0 && (
+                    <span className="badge">
+                      <span style={{ color: '#ffc107' }}>★</span> {stats.avg_score.toFixed(1)} ({stats.count})
+                    </span>
+                  )}
+                </div>
+                <div className="small" style={{opacity:0.8, lineHeight:1.35}}>
+                  {(movie.description ?? '').slice(0, 90)}{(movie.description ?? '').length > 90 ? '…' : ''}
+                </div>
+                <Link to={`/movies/${movie.id}/show`} className="btn" style={{marginTop: 6, textAlign:'center', background:'rgba(76,175,80,0.22)', borderColor:'rgba(76,175,80,0.5)', fontWeight: 600, fontSize: 13}}>
+                  Book Now
+                </Link>
+              </div>
             </div>
-          </div>
-        ))}
+          )
+        })}
       </div>
     </>
   )
@@ -1,15 +1,20 @@
 import React from 'react'
-import { useQuery } from '@tanstack/react-query'
-import { fetchMyBookings } from '../api/bookings'
+import { useInfiniteQuery } from '@tanstack/react-query'
+import { fetchMyBookingSummaries } from '../api/bookings'
 import { posterSrc } from '../api/client'
 
 export default function MyBookingsPage() {
-  const { data, isLoading, error } = useQuery({ queryKey: ['mybookings'], queryFn: fetchMyBookings })
+  const { data, isLoading, error, fetchNextPage, hasNextPage, isFetchingNextPage } = useInfiniteQuery({
+    queryKey: ['mybookings'],
+    queryFn: ({ pageParam }) => fetchMyBookingSummaries(pageParam),
+    initialPageParam: null as string | null,
+    getNextPageParam: lastPage => lastPage.nextCursor,
+  })
 
   if (isLoading) return <div className="section">Loading bookings…</div>
   if (error) return <div className="section">Failed to load bookings.</div>
 
-  const bookings = data ?? []
+  const bookings = data?.pages.flatMap(p => p.items) ?? []
 
   return (
     <>
@@ -20,25 +25,24 @@ export default function MyBookingsPage() {
       ) : (
         <div className="booking-list">
           {bookings.map(b => {
-            const movie = b.movie
-            const startDate = new Date(b.showtime.start_time)
+            const startDate = new Date(b.start_time)
             const dateStr = startDate.toLocaleDateString([], { weekday: 'short', year: 'numeric', month: 'short', day: 'numeric' })
             const timeStr = startDate.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })
-            const seats = b.seats.map(s => `${s.seat.seat_row}${s.seat.seat_col}`).join(', ')
+            const seats = b.seats.join(', ')
             const seatCount = b.seats.length
-            const pricePerSeat = Number(b.showtime.price)
+            const pricePerSeat = Number(b.price)
             const totalAmount = Number(b.total_amount)
-            const theater = b.showtime.screen?.theater?.name ?? ''
-            const theaterCity = b.showtime.screen?.theater?.city ?? ''
-            const screen = b.showtime.screen?.name ?? ''
+            const theater = b.theater_name ?? ''
+            const theaterCity = b.theater_city ?? ''
+            const screen = b.screen_name
             const isConfirmed = b.status === 'CONFIRMED'
 
             return (
               <div key={b.id} className="booking-card">
                 <div className="booking-card-left">
                   <img
-                    src={posterSrc(movie?.poster_url)}
-                    alt={movie?.title ?? 'Movie'}
+                    src={posterSrc(b.poster_url)}
+                    alt={b.movie_title}
                     className="booking-poster"
                   />
                 </div>
@@ -46,11 +50,11 @@ export default function MyBookingsPage() {
                 <div className="booking-card-right">
                   <div className="booking-card-top">
                     <div style={{flex: 1, minWidth: 0}}>
-                      <div className="booking-movie-title">{movie?.title ?? 'Unknown Movie'}</div>
+                      <div className="booking-movie-title">{b.movie_title}</div>
                       <div className="booking-meta">
-                        {movie?.genre && <span className="badge">{movie.genre}</span>}
-                        {movie?.language && <span className="badge">{movie.language}</span>}
-                        {movie?.duration_mins && <span className="badge">{movie.duration_mins} mins</span>}
+                        {b.genre && <span className="badge">{b.genre}</span>}
+                        {b.language && <span className="badge">{b.language}</span>}
+                        {b.duration_mins > 0 && <span className="badge">{b.duration_mins} mins</span>}
                       </div>
                     </div>
                     <div className="booking-id-badge">
@@ -86,7 +90,7 @@ export default function MyBookingsPage() {
                     </div>
                     <div className="booking-detail-item">
                       <span className="booking-detail-label">Booked on</span>
-                      <span className="booking-detail-value">{new Date(b.created_at).toLocaleDateString()}</span>
+                      <span className="booking-detail-value">{b.created_at ? new Date(b.created_at).toLocaleDateString() : ''}</span>
                     </div>
                   </div>
 
@@ -106,6 +110,11 @@ export default function MyBookingsPage() {
               </div>
             )
           })}
+          {hasNextPage && (
+            <button className="btn" onClick={() => fetchNextPage()} disabled={isFetchingNextPage}>
+              {isFetchingNextPage ? 'Loading…' : 'Load more'}
+            </button>
+          )}
         </div>
       )}
     </>
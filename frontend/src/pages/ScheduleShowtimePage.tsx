@@ -124,7 +124,9 @@ export default function ScheduleShowtimePage() {
 
               {mutation.isError && (
                 <div style={{ color: '#f44336', fontSize: 14 }}>
-                  {(mutation.error as Error)?.message ?? 'Failed to schedule showtime.'}
+                  {(mutation.error as any)?.response?.status === 409
+                    ? 'This screen is already in use at that time (including cleaning time between shows).'
+                    : (mutation.error as Error)?.message ?? 'Failed to schedule showtime.'}
                 </div>
               )}
 
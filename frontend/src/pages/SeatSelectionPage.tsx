@@ -1,11 +1,11 @@
-import React, { useMemo, useState } from 'react'
+import React, { useEffect, useMemo, useState } from 'react'
 import { useNavigate, useParams } from 'react-router-dom'
 import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query'
-import { fetchSeatMap } from '../api/showtimes'
+import { applySeatEvent, fetchSeatMap, refreshSeatMap, seatEventsUrl } from '../api/showtimes'
 import { lockSeats } from '../api/showtimes'
 import { createBooking } from '../api/bookings'
 import { posterSrc } from '../api/client'
-import type { Booking, ShowtimeSeat } from '../api/types'
+import type { Booking, SeatEvent, SeatMap, ShowtimeSeat } from '../api/types'
 
 function sortSeats(a: ShowtimeSeat, b: ShowtimeSeat) {
   if (a.seat.seat_row === b.seat.seat_row) return a.seat.seat_col - b.seat.seat_col
@@ -17,12 +17,38 @@ export default function SeatSelectionPage() {
   const showtimeId = Number(params.id)
   const qc = useQueryClient()
   const nav = useNavigate()
+  const [live, setLive] = useState(false)
+
+  useEffect(() => {
+    if (!Number.isFinite(showtimeId)) return
+    const key = ['seatmap', showtimeId]
+    const es = new EventSource(seatEventsUrl(showtimeId))
+    const onSeatEvent = (e: MessageEvent) => {
+      const ev: SeatEvent = JSON.parse(e.data)
+      const prev = qc.getQueryData<SeatMap>(key)
+      if (!prev) return
+      const next = applySeatEvent(prev, ev)
+      if (next) qc.setQueryData(key, next)
+      else qc.invalidateQueries({ queryKey: key })
+    }
+    es.addEventListener('hello', () => setLive(true))
+    es.addEventListener('locked', onSeatEvent)
+    es.addEventListener('booked', onSeatEvent)
+    es.addEventListener('released', onSeatEvent)
+    es.addEventListener('resync', () => qc.invalidateQueries({ queryKey: key }))
+    es.onerror = () => setLive(false)
+    return () => es.close()
+  }, [showtimeId, qc])
 
   const { data, isLoading, error } = useQuery({
     queryKey: ['seatmap', showtimeId],
-    queryFn: () => fetchSeatMap(showtimeId),
+    queryFn: () => {
+      const prev = qc.getQueryData<SeatMap>(['seatmap', showtimeId])
+      return prev ? refreshSeatMap(prev) : fetchSeatMap(showtimeId)
+    },
     enabled: Number.isFinite(showtimeId),
-    refetchInterval: 5000,
+    // Pushed events keep the map current; polling is only a fallback
+    refetchInterval: live ? 30000 : 5000,
   })
 
   const [selected, setSelected] = useState<number[]>([])
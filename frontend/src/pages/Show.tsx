@@ -2,6 +2,7 @@ import React, { useMemo, useState } from 'react'
 import { useParams, Link } from 'react-router-dom'
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import { fetchMovie, fetchShowtimes } from '../api/movies'
+import { availabilityLabel, fetchAvailability } from '../api/showtimes'
 import { posterSrc } from '../api/client'
 import { rateMovie, fetchMyRatingForMovie, fetchMovieStats } from '../api/ratings'
 
@@ -70,6 +71,17 @@ export default function ShowPage() {
 
   const movie = movieQ.data
   const showtimes = showtimesQ.data ?? []
+  const showtimeIds = showtimes.map(st => st.id)
+  const availabilityQ = useQuery({
+    queryKey: ['availability', showtimeIds],
+    queryFn: () => fetchAvailability(showtimeIds),
+    enabled: showtimeIds.length > 0,
+    refetchInterval: 30_000,
+  })
+  const availabilityById = useMemo(
+    () => new Map((availabilityQ.data ?? []).map(a => [a.showtime_id, a])),
+    [availabilityQ.data],
+  )
 
   const theaterName = useMemo(() => showtimes[0]?.screen?.theater?.name, [showtimes])
 
@@ -124,9 +136,11 @@ export default function ShowPage() {
                 {showtimes.map(st => {
                   const start = new Date(st.start_time)
                   const label = start.toLocaleString([], { hour: '2-digit', minute: '2-digit' })
+                  const seatsLeft = availabilityLabel(availabilityById.get(st.id))
                   return (
                     <Link key={st.id} to={`/showtimes/${st.id}/seats`} className="btn">
                       {label} • Rs {st.price}
+                      {seatsLeft && <span className="small" style={{display: 'block', opacity: 0.75}}>{seatsLeft}</span>}
                     </Link>
                   )
                 })}